@@ -23,6 +23,12 @@ import time
 from gi.repository import GObject, Gst, GstBase
 from loguru import logger
 
+try:
+    # Share the calibrated clock of desktop_env, so subtitles match the timestamps of frames and events
+    from desktop_env.clock import time_ns
+except ImportError:
+    time_ns = time.time_ns
+
 # Initialize GObject and Gst
 
 Gst.init(None)
@@ -109,17 +115,18 @@ class UtcTimestampSrc(GstBase.BaseSrc):
         clock.id_unref(clock_id)
 
     def do_fill(self, offset, length, buf):
+        # Pace on the monotonic clock, so that a wall clock step does not stall or burst the output
         if self.past_time is None:
-            self.past_time = time.time_ns()
+            self.past_time = time.monotonic_ns()
 
-        to_sleep = max(0, self.interval - (time.time_ns() - self.past_time) / 1e9)
+        to_sleep = max(0, self.interval - (time.monotonic_ns() - self.past_time) / 1e9)
         time.sleep(to_sleep)
         self.past_time = self.past_time + self.interval * 1e9
 
         # Set buffer duration
         buf.duration = self.interval * Gst.SECOND
         # Get the current UTC time in nanoseconds
-        current_time = time.time_ns()
+        current_time = time_ns()
         utc_time = datetime.datetime.fromtimestamp(current_time / 1e9).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
         # Set buffer PTS
         pts_time = self.get_clock().get_time() - self.get_base_time()
@@ -7,10 +7,8 @@ For more information, run `examples/recorder.py` with `--help` option.
 import time
 from typing import Optional
 
-import orjson
 import typer
 from loguru import logger
-from pydantic import BaseModel
 from tqdm import tqdm
 from typing_extensions import Annotated
 
@@ -24,33 +22,6 @@ logger.add(lambda msg: tqdm.write(msg, end=""), colorize=True)
 logger.enable("desktop_env")  # it's optional to enable the logger; just for debugging
 
 
-class BagEvent(BaseModel):
-    timestamp_ns: int
-    event_src: str
-    event_data: bytes
-
-
-def write_event_into_jsonl(event, source=None):
-    # you can find where the event is coming from. e.g. where the calling this function
-    # frame = inspect.currentframe().f_back
-
-    with open("event.jsonl", "ab") as f:
-        if isinstance(event, BaseModel):
-            event_data = event.model_dump_json().encode("utf-8")
-        else:
-            event_data = orjson.dumps(event)
-        bag_event = BagEvent(timestamp_ns=time.time_ns(), event_src=source, event_data=event_data)
-        f.write(bag_event.model_dump_json().encode("utf-8") + b"\n")
-
-
-def window_publisher_callback(event):
-    write_event_into_jsonl(event, source="window_publisher")
-
-
-def control_publisher_callback(event):
-    write_event_into_jsonl(event, source="control_publisher")
-
-
 def main(
     file_location: Annotated[str, typer.Argument(help="The location of the output file, use `.mkv` extension.")],
     *,
@@ -61,6 +32,10 @@ def main(
         Optional[str], typer.Option(help="The name of the window to capture, substring of window name is supported")
     ] = None,
     monitor_idx: Annotated[Optional[int], typer.Option(help="The index of the monitor to capture")] = None,
+    segment_duration: Annotated[
+        Optional[float],
+        typer.Option(help="Split the recording into FILE_LOCATION_00000.mkv, ... of this many seconds"),
+    ] = None,
 ):
     assert file_location.endswith(".mkv"), "The output file must have `.mkv` extension."
     args = DesktopArgs(
@@ -74,19 +49,13 @@ def main(
                     record_timestamp=record_timestamp,
                     window_name=window_name,
                     monitor_idx=monitor_idx,
+                    segment_duration=segment_duration,
                 ),
             },
-            {
-                "module": "desktop_env.window_publisher.WindowPublisher",
-                "args": {"callback": window_publisher_callback},
-            },
-            {
-                "module": "desktop_env.control_publisher.ControlPublisher",
-                "args": {
-                    "keyboard_callback": control_publisher_callback,
-                    "mouse_callback": control_publisher_callback,
-                },
-            },
+            {"module": "desktop_env.window_publisher.WindowPublisher", "args": {}},
+            {"module": "desktop_env.control_publisher.ControlPublisher", "args": {}},
+            # Writes the events of the publishers above into `event.jsonl`, in batches from a background thread
+            {"module": "desktop_env.event_writer.EventWriter", "args": {"path": "event.jsonl"}},
         ]
     )
     desktop = Desktop.from_args(args)
@@ -0,0 +1,49 @@
+"""
+This example demonstrates how to use the `Replayer` submodule to replay the keyboard and mouse events recorded by
+`examples/recorder.py`.
+
+For more information, run `examples/replay.py` with `--help` option.
+"""
+
+from typing import Optional
+
+import typer
+from loguru import logger
+from typing_extensions import Annotated
+
+from desktop_env import Desktop, DesktopArgs
+from desktop_env.replayer import ReplayArgs
+
+logger.enable("desktop_env")
+
+
+def main(
+    path: Annotated[str, typer.Argument(help="The recorded `event.jsonl`, or binary event log directory")],
+    *,
+    speed: Annotated[float, typer.Option(help="Replay speed multiplier")] = 1.0,
+    start: Annotated[Optional[float], typer.Option(help="Seconds from the first event to start at")] = None,
+    end: Annotated[Optional[float], typer.Option(help="Seconds from the first event to end at")] = None,
+    skip_idle: Annotated[Optional[float], typer.Option(help="Shorten idle gaps to this many seconds")] = None,
+):
+    args = DesktopArgs(
+        submodules=[
+            {
+                "module": "desktop_env.replayer.Replayer",
+                "args": ReplayArgs(path=path, speed=speed, start=start, end=end, skip_idle=skip_idle),
+            }
+        ]
+    )
+    desktop = Desktop.from_args(args)
+
+    try:
+        desktop.start_free_threaded()
+        desktop.join()  # returns when the replay is over
+    except KeyboardInterrupt:
+        desktop.stop()
+        desktop.join()
+    finally:
+        desktop.close()
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -1,23 +1,22 @@
 """ZType game agent that uses a Vision Language Model (VLM) to detect and type words.
 This script performs screen capture and simulates keyboard input to automatically play the typing game."""
 
+import base64
 import threading
 import time
 from queue import Empty, Full, Queue
 
-import cv2
 import requests
 from loguru import logger
 from openai import OpenAI
-from PIL import Image
 from tqdm import tqdm
 
 from desktop_env import Desktop, DesktopArgs
-from desktop_env.msg import FrameStamped
+from desktop_env.msg import CompressedFrameStamped
 from desktop_env.threading import AbstractThread
-from desktop_env.utils import char_to_vk, when_active
+from desktop_env.utils import when_active
 from desktop_env.windows_capture import construct_pipeline
-from utils import Rate, from_image_to_b64
+from utils import Rate
 
 # Configure loguru with tqdm to handle progress bars and logging together.
 logger.remove()
@@ -37,7 +36,7 @@ frame_queue = Queue(maxsize=1)
 frame_lock = threading.Lock()  # Thread lock for frame queue access
 
 
-def on_frame_arrived(frame: FrameStamped):
+def on_frame_arrived(frame: CompressedFrameStamped):
     """Callback when a new frame arrives from the screen capture."""
     with frame_lock:
         if frame_queue.full():
@@ -76,21 +75,17 @@ IMPORTANT: Don't add any additional explanation - just respond with the word pos
         self.stop_event = threading.Event()
         self.last_word = None  # Stores the last word detected to avoid repeats
 
-    def process_frame(self, frame: FrameStamped):
+    def process_frame(self, frame: CompressedFrameStamped):
         """Process a single frame through the VLM to detect words."""
 
+        # The frame already arrives as a 448x448 JPEG image, as required by the VLM (see `construct_pipeline` below)
         # Save the frame for debugging purposes if DEBUG is True
         if DEBUG:
-            frame_rgb = cv2.cvtColor(frame.frame_arr, cv2.COLOR_BGRA2RGB)
-            debug_image = Image.fromarray(frame_rgb)
-            debug_image.save("debug_frame.png")
-            logger.debug("Saved debug frame to debug_frame.png")  # Adjusted to debug level
+            with open("debug_frame.jpg", "wb") as f:
+                f.write(frame.data)
+            logger.debug("Saved debug frame to debug_frame.jpg")  # Adjusted to debug level
 
-        # Convert frame to RGB PIL image and resize it for the VLM
-        frame_rgb = cv2.cvtColor(frame.frame_arr, cv2.COLOR_BGRA2RGB)
-        pil_image = Image.fromarray(frame_rgb)
-        pil_image = pil_image.resize((448, 448))  # Resizing as required by the VLM
-        base64_image = from_image_to_b64(pil_image).decode("utf-8")
+        base64_image = base64.b64encode(frame.data).decode("utf-8")
 
         # Add instruction to ignore the last word detected, if any
         last_word_instruction = ""
@@ -109,7 +104,7 @@ IMPORTANT: Don't add any additional explanation - just respond with the word pos
                         "role": "user",
                         "content": [
                             {"type": "text", "text": current_prompt},
-                            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{base64_image}"}},
+                            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}},
                         ],
                     }
                 ],
@@ -169,18 +164,13 @@ class ZtypeActor(AbstractThread):
 
     @when_active(ZTYPE_WINDOW_NAME)
     def type_word(self, word: str):
-        """Type a word character by character with natural delays."""
+        """Type a word with natural delays, as one action sequence injected by the desktop's action thread."""
         logger.info(f"Typing word: {word}")  # Adjusted to info level
-        for char in word.lower():
-            try:
-                vk = char_to_vk(char)
-                # Simulate natural typing with small delays between key presses
-                self.desktop.keyboard.press(vk)
-                time.sleep(0.05)  # Delay between key press and release
-                self.desktop.keyboard.release(vk)
-                time.sleep(0.05)  # Delay between characters
-            except Exception as e:
-                logger.warning(f"Error typing character '{char}': {e}")
+        try:
+            # Each key is held for 50 ms, with 50 ms between characters
+            return self.desktop.type_text(word.lower(), interval=0.05, hold=0.05)
+        except ValueError as e:
+            logger.warning(f"Error typing word '{word}': {e}")
 
     def start(self):
         """Main loop for receiving words from the queue and typing them."""
@@ -191,7 +181,9 @@ class ZtypeActor(AbstractThread):
                 if time.time() - timestamp > self.word_timeout:
                     logger.info(f"Skipping old word: {word}")  # Adjusted to info level
                     continue
-                self.type_word(word)
+                typing = self.type_word(word)
+                if typing is not None:
+                    typing.result()  # wait for the word to be typed, so that the next word is checked for age then
             except Empty:
                 continue  # No word available, continue looping
 
@@ -216,6 +208,10 @@ if __name__ == "__main__":
                     "pipeline_description": construct_pipeline(
                         window_name=ZTYPE_WINDOW_NAME,
                         framerate="4/1",  # Reduced framerate because VLM does not require high-frequency input, but you may specify 60+ fps
+                        # Resizing and JPEG encoding are done inside the pipeline, not in Python
+                        width=448,
+                        height=448,
+                        output_format="jpeg",
                     ),
                 },
             }
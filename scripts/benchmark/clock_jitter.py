@@ -0,0 +1,81 @@
+"""
+Measure the error and cost of `desktop_env.clock` against reading the wall clock for every event.
+
+- error: how far a converted timestamp falls outside the reference (wall clock) time it stands for. Every conversion
+  is bracketed by two reads of the reference clock; a timestamp between them has no measurable error, one outside
+  counts its distance to the nearest read. Measured against the real wall clock, and against a reference which drifts
+  away from the monotonic clock by `DRIFT_PPM`, like a system clock which NTP slews or a different oscillator.
+- cost: nanoseconds per timestamp.
+
+The script exits with an error if the max error exceeds `MAX_ERROR_NS` in either case, so it can be used as a check on
+a new platform.
+
+Usage: python scripts/benchmark/clock_jitter.py
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from desktop_env.clock import Clock
+
+NUM_EVENTS = 200_000
+DURATION = 3.0  # seconds of conversions against the drifting reference
+DRIFT_PPM = 200.0  # 200 us per second, beyond what NTP slews (500 ppm max, usually < 50 ppm)
+RECALIBRATE_INTERVAL = 0.1
+MAX_ERROR_NS = 50_000  # 50 us
+
+
+class DriftingReference:
+    """The wall clock, running `ppm` parts per million faster than the monotonic clock."""
+
+    def __init__(self, ppm: float):
+        self.rate = ppm * 1e-6
+        self.start_ns = time.monotonic_ns()
+
+    def __call__(self) -> int:
+        return time.time_ns() + int((time.monotonic_ns() - self.start_ns) * self.rate)
+
+
+def conversion_errors(clock: Clock, reference, *, duration: float = 0.0) -> np.ndarray:
+    """Error of `clock.monotonic_to_utc_ns` against `reference` read around each conversion, in nanoseconds."""
+    errors = []
+    deadline = time.monotonic() + duration
+    while len(errors) < NUM_EVENTS or time.monotonic() < deadline:
+        before = reference()
+        converted = clock.monotonic_to_utc_ns(time.monotonic_ns())
+        after = reference()
+        errors.append(max(before - converted, converted - after, 0))
+    return np.array(errors, dtype=np.int64)
+
+
+def cost_ns(fn) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(NUM_EVENTS):
+        fn()
+    return (time.perf_counter_ns() - start) / NUM_EVENTS
+
+
+def report(name: str, errors: np.ndarray) -> int:
+    p99, worst = np.percentile(errors, 99), errors.max()
+    print(f"{name:22s} error p99 {p99 / 1e3:8.2f} us, max {worst / 1e3:8.2f} us over {len(errors)} timestamps")
+    return int(worst)
+
+
+if __name__ == "__main__":
+    clock = Clock(recalibrate_interval=RECALIBRATE_INTERVAL)
+    worst = {"wall clock": report("wall clock", conversion_errors(clock, time.time_ns))}
+
+    reference = DriftingReference(DRIFT_PPM)
+    drifting = Clock(reference, recalibrate_interval=RECALIBRATE_INTERVAL)
+    name = f"drifting {DRIFT_PPM:.0f} ppm"
+    worst[name] = report(name, conversion_errors(drifting, reference, duration=DURATION))
+    print(f"{'':22s} tracked drift {drifting.drift * 1e6:.1f} ppm")
+
+    print(f"wall       {cost_ns(time.time_ns):8.1f} ns per timestamp")
+    print(f"calibrated {cost_ns(clock.time_ns):8.1f} ns per timestamp")
+    failed = {name: error for name, error in worst.items() if error > MAX_ERROR_NS}
+    if failed:
+        details = ", ".join(f"{name}: {error / 1e3:.2f} us" for name, error in failed.items())
+        sys.exit(f"Calibrated clock erred by more than {MAX_ERROR_NS / 1e3:.0f} us ({details})")
@@ -0,0 +1,99 @@
+"""
+Compare frame delivery before/after `FrameHandle` on a `videotestsrc` pipeline.
+
+- before: map the buffer, build a validated `FrameStamped`, unmap on return. A consumer which keeps the frame
+  (e.g. the `frame_queue` of `examples/typing_agent`) has to copy it out.
+- after: deliver a `FrameHandle` which stays mapped while the consumer holds it. Nothing is copied.
+
+Usage: python scripts/benchmark/frame_handle.py [WIDTH] [HEIGHT]
+"""
+
+import gi
+
+gi.require_version("Gst", "1.0")
+import sys
+import threading
+import time
+
+import numpy as np
+from gi.repository import Gst
+
+from desktop_env.msg import FrameHandle, FrameStamped
+from desktop_env.windows_capture import WindowsCapture
+
+Gst.init(None)
+
+WIDTH, HEIGHT = (int(sys.argv[1]), int(sys.argv[2])) if len(sys.argv) == 3 else (1920, 1080)
+DURATION = 5  # in seconds
+PIPELINE = (
+    "videotestsrc is-live=true pattern=ball ! "
+    f"video/x-raw,format=BGRA,width={WIDTH},height={HEIGHT},framerate=240/1 ! "
+    "appsink name=appsink max-buffers=1 drop=true"
+)
+
+
+class Consumer:
+    """Keeps the latest frame, like `examples/typing_agent` does."""
+
+    def __init__(self):
+        self.latest = None
+        self.frames = 0
+        self.bytes_copied = 0
+        self.lock = threading.Lock()
+
+
+def run_before() -> Consumer:
+    consumer = Consumer()
+    pipeline = Gst.parse_launch(PIPELINE)
+    appsink = pipeline.get_by_name("appsink")
+    appsink.set_property("emit-signals", True)
+
+    def on_new_sample(sink):
+        sample = sink.emit("pull-sample")
+        buf = sample.get_buffer()
+        structure = sample.get_caps().get_structure(0)
+        width, height = structure.get_value("width"), structure.get_value("height")
+        result, mapinfo = buf.map(Gst.MapFlags.READ)
+        try:
+            frame_arr = np.frombuffer(mapinfo.data, dtype=np.uint8).reshape((height, width, 4))
+            message = FrameStamped(frame_arr=frame_arr, timestamp_ns=time.time_ns())
+            # The buffer is unmapped on return, so the frame must be copied to be kept
+            kept = FrameStamped(frame_arr=message.frame_arr.copy(), timestamp_ns=message.timestamp_ns)
+            with consumer.lock:
+                consumer.latest = kept
+                consumer.frames += 1
+                consumer.bytes_copied += kept.frame_arr.nbytes
+        finally:
+            buf.unmap(mapinfo)
+        return Gst.FlowReturn.OK
+
+    appsink.connect("new-sample", on_new_sample)
+    pipeline.set_state(Gst.State.PLAYING)
+    time.sleep(DURATION)
+    pipeline.set_state(Gst.State.NULL)
+    return consumer
+
+
+def run_after() -> Consumer:
+    consumer = Consumer()
+
+    def on_frame_arrived(frame: FrameHandle):
+        with consumer.lock:
+            consumer.latest = frame  # the previous handle is released when it is replaced
+            consumer.frames += 1
+
+    capture = WindowsCapture(on_frame_arrived, pipeline_description=PIPELINE)
+    capture.start_free_threaded()
+    time.sleep(DURATION)
+    capture.stop_join_close()
+    return consumer
+
+
+if __name__ == "__main__":
+    frame_size = WIDTH * HEIGHT * 4
+    print(f"videotestsrc {WIDTH}x{HEIGHT} BGRA ({frame_size / 1e6:.2f} MB/frame), {DURATION} s per run")
+    for name, run in (("before (FrameStamped + copy)", run_before), ("after (FrameHandle)", run_after)):
+        consumer = run()
+        fps = consumer.frames / DURATION
+        copied = consumer.bytes_copied / max(consumer.frames, 1)
+        print(f"{name:30s} {fps:8.1f} frames/s, {copied / 1e6:6.2f} MB copied per frame")
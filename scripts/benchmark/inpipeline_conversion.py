@@ -0,0 +1,80 @@
+"""
+Compare pixel format conversion and resizing in Python against doing it inside the pipeline, on Linux `videotestsrc`.
+
+- python: receive 1920x1080 BGRA frames, then `cv2.cvtColor(BGRA→RGB)` and a PIL resize to 448x448, like
+  `examples/typing_agent` did.
+- pipeline: receive 448x448 RGB frames converted by `videoscale`/`videoconvert` inside the pipeline.
+
+Usage: python scripts/benchmark/inpipeline_conversion.py
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+import psutil
+from PIL import Image
+
+from desktop_env.msg import FrameHandle
+from desktop_env.windows_capture import WindowsCapture
+from desktop_env.windows_capture.gst_pipeline import appsink_branch
+
+DURATION = 10  # in seconds
+SOURCE = "videotestsrc is-live=true pattern=ball ! video/x-raw,format=BGRA,width=1920,height=1080,framerate=30/1 ! "
+PIPELINES = {
+    "python": SOURCE + "tee name=t " + appsink_branch("appsink"),
+    "pipeline": SOURCE + "tee name=t " + appsink_branch("appsink", width=448, height=448, format="RGB"),
+}
+
+process = psutil.Process()
+
+
+def monitor_process_usage(stop_event, cpu_usage, interval=0.1):
+    process.cpu_percent(interval=None)
+    while not stop_event.is_set():
+        time.sleep(interval)
+        cpu_usage.append(process.cpu_percent(interval=None))
+
+
+def run(name: str) -> dict:
+    received = {"frames": 0, "bytes": 0}
+
+    def on_frame_arrived(frame: FrameHandle):
+        with frame:
+            frame_arr = frame.frame_arr
+            received["frames"] += 1
+            received["bytes"] += frame_arr.nbytes
+            if name == "python":
+                frame_rgb = cv2.cvtColor(frame_arr, cv2.COLOR_BGRA2RGB)
+                image = Image.fromarray(frame_rgb).resize((448, 448))
+            else:
+                image = Image.fromarray(frame_arr)
+            np.asarray(image)
+
+    cpu_usage = []
+    stop_event = threading.Event()
+    monitor_thread = threading.Thread(target=monitor_process_usage, args=(stop_event, cpu_usage))
+
+    capture = WindowsCapture(on_frame_arrived, pipeline_description=PIPELINES[name])
+    capture.start_free_threaded()
+    monitor_thread.start()
+    time.sleep(DURATION)
+    stop_event.set()
+    monitor_thread.join()
+    capture.stop_join_close()
+
+    return {
+        "fps": received["frames"] / DURATION,
+        "cpu": np.mean(cpu_usage),
+        "bytes_per_frame": received["bytes"] / max(received["frames"], 1),
+    }
+
+
+if __name__ == "__main__":
+    for name in PIPELINES:
+        result = run(name)
+        print(
+            f"{name:10s} {result['fps']:6.1f} frames/s, CPU {result['cpu']:6.1f}%, "
+            f"{result['bytes_per_frame'] / 1e3:8.1f} KB per frame delivered to Python"
+        )
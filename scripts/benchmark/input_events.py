@@ -0,0 +1,87 @@
+"""
+Compare the cost of input events as pydantic models and as lightweight slotted events, on the listener thread.
+
+- construct: create the event, as the pynput listener callbacks do for every input.
+- listener: `KeyboardListenerFactory.on_press` / `MouseListenerFactory.on_move` with a callback which keeps the event.
+- serialize: encode the event as a JSONL record of the `EventWriter`, on its background thread.
+- bytes/event: memory held by each kept event, measured with `tracemalloc`.
+
+Usage: python scripts/benchmark/input_events.py [NUM_EVENTS]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from loguru import logger
+from pynput.keyboard import KeyCode
+
+from desktop_env.control_publisher.callback_factory import KeyboardListenerFactory, MouseListenerFactory
+from desktop_env.control_publisher.msg import KeyboardEvent, MouseEvent, RawKeyboardEvent, RawMouseEvent
+from desktop_env.event_writer.event_log import encode_json_record
+
+NUM_EVENTS = int(sys.argv[1]) if len(sys.argv) == 2 else 200_000
+KEY = KeyCode.from_char("a")
+
+
+def rate(fn, n: int = NUM_EVENTS) -> float:
+    """Calls of `fn(i)` per second."""
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return n / (time.perf_counter() - start)
+
+
+def bytes_per_event(make, n: int = NUM_EVENTS) -> float:
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    kept = [make(i) for i in range(n)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # The list itself holds one pointer per event
+    return (after - before) / len(kept) - 8
+
+
+def run(name: str, make, listener_factory, listener_call) -> None:
+    kept = []
+    factory = listener_factory(kept.append)
+    listener = rate(lambda i: listener_call(factory, i))
+    events = [make(i) for i in range(NUM_EVENTS)]
+    serialize = rate(lambda i: encode_json_record((0, "control_publisher", events[i])))
+    print(
+        f"{name:<18} construct {rate(make) / 1e3:8.0f}k/s  listener {listener / 1e3:8.0f}k/s  "
+        f"serialize {serialize / 1e3:8.0f}k/s  {bytes_per_event(make):6.0f} bytes/event"
+    )
+
+
+def main():
+    logger.remove()  # the listeners log every key press at debug level
+    print(f"{NUM_EVENTS} events")
+    run(
+        "KeyboardEvent",
+        lambda i: KeyboardEvent(event_type="on_press", event_data=i & 0xFF),
+        lambda callback: KeyboardListenerFactory(callback, lightweight=False),
+        lambda factory, i: factory.on_press(KEY),
+    )
+    run(
+        "RawKeyboardEvent",
+        lambda i: RawKeyboardEvent(event_type="on_press", event_data=i & 0xFF),
+        lambda callback: KeyboardListenerFactory(callback, lightweight=True),
+        lambda factory, i: factory.on_press(KEY),
+    )
+    run(
+        "MouseEvent",
+        lambda i: MouseEvent(event_type="on_move", event_data=(i & 0x7FF, i & 0x3FF)),
+        lambda callback: MouseListenerFactory(callback, lightweight=False),
+        lambda factory, i: factory.on_move(i & 0x7FF, i & 0x3FF),
+    )
+    run(
+        "RawMouseEvent",
+        lambda i: RawMouseEvent(event_type="on_move", event_data=(i & 0x7FF, i & 0x3FF)),
+        lambda callback: MouseListenerFactory(callback, lightweight=True),
+        lambda factory, i: factory.on_move(i & 0x7FF, i & 0x3FF),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,10 @@
 import time
 
-import orjson
 from loguru import logger
-from pydantic import BaseModel
 from tqdm import tqdm
 
 from desktop_env import Desktop, DesktopArgs
 from desktop_env.msg import FrameStamped
-from desktop_env.windows_capture import construct_pipeline
 
 # how to use loguru with tqdm: https://github.com/Delgan/loguru/issues/135
 logger.remove()
@@ -32,33 +29,6 @@ def on_frame_arrived(frame: FrameStamped):
         on_frame_arrived.last_printed = now
 
 
-class BagEvent(BaseModel):
-    timestamp_ns: int
-    event_src: str
-    event_data: bytes
-
-
-def write_event_into_jsonl(event, source=None):
-    # you can find where the event is coming from. e.g. where the calling this function
-    # frame = inspect.currentframe().f_back
-
-    with open("event.jsonl", "ab") as f:
-        if isinstance(event, BaseModel):
-            event_data = event.model_dump_json().encode("utf-8")
-        else:
-            event_data = orjson.dumps(event)
-        bag_event = BagEvent(timestamp_ns=time.time_ns(), event_src=source, event_data=event_data)
-        f.write(bag_event.model_dump_json().encode("utf-8") + b"\n")
-
-
-def window_publisher_callback(event):
-    write_event_into_jsonl(event, source="window_publisher")
-
-
-def control_publisher_callback(event):
-    write_event_into_jsonl(event, source="control_publisher")
-
-
 if __name__ == "__main__":
     # Example 1. Capture the entire screen and discard all other events
     args = DesktopArgs(
@@ -67,7 +37,7 @@ if __name__ == "__main__":
                 "module": "desktop_env.windows_capture.WindowsCapture",
                 "args": {
                     "on_frame_arrived": on_frame_arrived,
-                    "pipeline_description": construct_pipeline(monitor_idx=0),
+                    "monitor_idx": 0,
                 },
             }
         ]
@@ -75,28 +45,20 @@ if __name__ == "__main__":
     # Example 2. Capture a specific window and save all events into a JSONL file
     args = DesktopArgs(
         submodules=[
-            {
-                "module": "desktop_env.window_publisher.WindowPublisher",
-                "args": {"callback": window_publisher_callback},
-            },
+            {"module": "desktop_env.window_publisher.WindowPublisher", "args": {}},
             {
                 "module": "desktop_env.windows_capture.WindowsCapture",
                 "args": {
                     "on_frame_arrived": on_frame_arrived,
-                    "pipeline_description": construct_pipeline(
-                        window_name=None,  # you may specify the substring of the window name
-                        monitor_idx=None,  # you may specify the monitor index
-                        framerate="60/1",
-                    ),
-                },
-            },
-            {
-                "module": "desktop_env.control_publisher.ControlPublisher",
-                "args": {
-                    "keyboard_callback": control_publisher_callback,
-                    "mouse_callback": control_publisher_callback,
+                    # Set as fields rather than a pipeline, so a `Recorder` of the same source can share the capture
+                    "window_name": None,  # you may specify the substring of the window name
+                    "monitor_idx": None,  # you may specify the monitor index
+                    "framerate": "60/1",
                 },
             },
+            {"module": "desktop_env.control_publisher.ControlPublisher", "args": {}},
+            # Writes the events of the publishers above into `event.jsonl`, in batches from a background thread
+            {"module": "desktop_env.event_writer.EventWriter", "args": {"path": "event.jsonl"}},
         ]
     )
     args.to_yaml("desktop_args.yaml")
@@ -5,7 +5,6 @@ from tqdm import tqdm
 
 from desktop_env import Desktop, DesktopArgs
 from desktop_env.msg import FrameStamped
-from desktop_env.windows_capture import construct_pipeline
 
 # how to use loguru with tqdm: https://github.com/Delgan/loguru/issues/135
 logger.remove()
@@ -38,11 +37,9 @@ if __name__ == "__main__":
                 "module": "desktop_env.windows_capture.WindowsCapture",
                 "args": {
                     "on_frame_arrived": on_frame_arrived,
-                    "pipeline_description": construct_pipeline(
-                        window_name=None,  # you may specify a substring of the window name
-                        monitor_idx=None,  # you may specify the monitor index
-                        framerate="60/1",
-                    ),
+                    "window_name": None,  # you may specify a substring of the window name
+                    "monitor_idx": None,  # you may specify the monitor index
+                    "framerate": "60/1",
                 },
             },
             {"module": "desktop_env.window_publisher.WindowPublisher", "args": {"callback": on_event}},
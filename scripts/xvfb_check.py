@@ -0,0 +1,145 @@
+"""
+Check the Linux X11 paths against an Xvfb server: monitor and window lookup with python-xlib, and capture of the
+screen, a monitor and a window with `ximagesrc`, and replay of event logs with XTest.
+
+Needs Xvfb and GStreamer with the base and good plugins. Exits with an error if a check fails. The server is started
+by `xvfb-run`, as pynput connects to the display when desktop_env is imported.
+
+Usage: xvfb-run -a -s "-screen 0 640x480x24" python scripts/xvfb_check.py
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import orjson
+from loguru import logger
+
+SCREEN = (640, 480)
+WINDOW_TITLE = "desktop-env xvfb check"
+WINDOW_RECT = (40, 30, 360, 270)  # (left, top, right, bottom)
+REPLAY_MOVES = 50  # one every 10 ms
+MAX_MEAN_REPLAY_ERROR_US = 2000  # loose, as CI machines are shared
+
+
+def open_window(title: str, rect: tuple[int, int, int, int]):
+    """Map a white window, and list it in `_NET_CLIENT_LIST` as a window manager would; Xvfb runs none."""
+    from Xlib import Xatom, display
+
+    x_display = display.Display()
+    screen = x_display.screen()
+    left, top, right, bottom = rect
+    window = screen.root.create_window(
+        left, top, right - left, bottom - top, 0, screen.root_depth, background_pixel=screen.white_pixel
+    )
+    window.change_property(
+        x_display.intern_atom("_NET_WM_NAME"), x_display.intern_atom("UTF8_STRING"), 8, title.encode()
+    )
+    window.map()
+    screen.root.change_property(x_display.intern_atom("_NET_CLIENT_LIST"), Xatom.WINDOW, 32, [window.id])
+    x_display.sync()
+    return x_display, window
+
+
+def capture_one(**kwargs) -> np.ndarray:
+    """Capture one frame of `construct_pipeline(**kwargs)` with `ximagesrc`."""
+    from desktop_env.windows_capture import WindowsCapture, construct_pipeline
+
+    capture = WindowsCapture(pipeline_description=construct_pipeline(backend="ximagesrc", **kwargs), verbose=False)
+    capture.start_free_threaded()
+    try:
+        frame = capture.pull(timeout=5.0)
+        if frame is None:
+            raise AssertionError(f"No frame captured within 5 seconds ({kwargs})")
+        with frame:
+            return frame.frame_arr.copy()
+    finally:
+        capture.stop_join_close()
+
+
+def check_lookup():
+    from desktop_env.window_publisher.utils import get_monitor_rect, get_window_by_title
+
+    assert get_monitor_rect(0) == (0, 0, *SCREEN), get_monitor_rect(0)
+    window = get_window_by_title(WINDOW_TITLE.split()[-1].upper())  # matched case-insensitively
+    assert window.title == WINDOW_TITLE, window.title
+    assert window.rect == WINDOW_RECT, window.rect
+
+
+def check_capture():
+    width, height = SCREEN
+    screen = capture_one()
+    assert screen.shape == (height, width, 4), screen.shape
+    monitor = capture_one(monitor_idx=0, framerate="10/1")
+    assert monitor.shape == (height, width, 4), monitor.shape
+
+    left, top, right, bottom = WINDOW_RECT
+    window = capture_one(window_name=WINDOW_TITLE)
+    assert window.shape == (bottom - top, right - left, 4), window.shape
+    assert np.all(window[..., :3] == 255), "the window is not captured as it is drawn"
+    assert np.array_equal(screen[top:bottom, left:right, :3], window[..., :3]), "the window differs on the screen"
+
+    cropped = capture_one(crop=(left, top, right, bottom))
+    assert cropped.shape == window.shape, cropped.shape
+
+
+def write_event_log(path: Path, *, legacy: bool) -> tuple[int, int]:
+    """Write moves across the screen and a key press, as `EventWriter` does or, with `legacy`, with the event as a
+    JSON string, as logs recorded before it did. Returns the last cursor position."""
+    from desktop_env.control_publisher.msg import KeyboardEvent, MouseEvent
+
+    start = time.time_ns()
+    events = [KeyboardEvent(event_type="on_press", event_data=0x41, event_time=start)]
+    for i in range(REPLAY_MOVES):
+        position = (i * SCREEN[0] // REPLAY_MOVES, i * SCREEN[1] // REPLAY_MOVES)
+        events.append(MouseEvent(event_type="on_move", event_data=position, event_time=start + (i + 1) * 10_000_000))
+    events.append(KeyboardEvent(event_type="on_release", event_data=0x41, event_time=events[-1].event_time))
+    with open(path, "wb") as file:
+        for event in events:
+            data = event.model_dump_json() if legacy else event.model_dump()
+            file.write(orjson.dumps({"timestamp_ns": event.event_time, "event_src": "check", "event_data": data}))
+            file.write(b"\n")
+    return position
+
+
+def check_replay():
+    from Xlib import display
+
+    from desktop_env.replayer import Replayer
+
+    x_display = display.Display()
+    with tempfile.TemporaryDirectory() as directory:
+        for legacy in (False, True):
+            path = Path(directory) / f"event_{'legacy' if legacy else 'nested'}.jsonl"
+            position = write_event_log(path, legacy=legacy)
+            replayer = Replayer(str(path))
+            replayer.start()
+            stats = replayer.stats
+            assert stats.injected == REPLAY_MOVES + 2 and stats.failed == 0, f"{path.name}: {stats}"
+            assert stats.mean_error_us < MAX_MEAN_REPLAY_ERROR_US, f"{path.name}: {stats}"
+            pointer = x_display.screen().root.query_pointer()
+            assert (pointer.root_x, pointer.root_y) == position, (
+                f"{path.name}: cursor at {pointer.root_x, pointer.root_y}"
+            )
+    x_display.close()
+
+
+CHECKS = {"lookup": check_lookup, "capture": check_capture, "replay": check_replay}
+
+
+if __name__ == "__main__":
+    failed = []
+    x_display, window = open_window(WINDOW_TITLE, WINDOW_RECT)
+    time.sleep(0.1)  # let the server draw the window before it is captured
+    for name, check in CHECKS.items():
+        try:
+            check()
+            logger.info(f"{name}: ok")
+        except Exception as e:
+            logger.exception(f"{name}: failed")
+            failed.append(f"{name}: {type(e).__name__}: {e}")
+    x_display.close()
+    if failed:
+        sys.exit("Xvfb checks failed:\n" + "\n".join(failed))
@@ -0,0 +1,16 @@
+"""
+Frame-aligned action index of a recording: for every video frame, its UTC timestamp, the keys and mouse buttons held,
+the cursor position, and what changed since the previous frame, aligned from the event log recorded along.
+
+The index is a directory holding `frames.npy`, a NumPy structured array of `FRAME_DTYPE` which is memory-mapped on
+read, `keys.npy`, the vk of each key bit, and `header.json`.
+
+Usage:
+    python -m desktop_env.action_index build output.mkv --events event.jsonl --output output.index
+    python -m desktop_env.action_index show output.index
+
+Reading the frame timestamps of a recording needs GStreamer; aligning and reading an index only need NumPy.
+"""
+
+from .align import FRAME_DTYPE, MAX_KEYS, align_frames, load_input_events
+from .index import ActionIndex, build_action_index, write_action_index
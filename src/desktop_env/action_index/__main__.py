@@ -0,0 +1,47 @@
+from pathlib import Path
+from typing import Optional
+
+import typer
+from loguru import logger
+from typing_extensions import Annotated
+
+from .index import ActionIndex, build_action_index
+
+app = typer.Typer(help="Align recorded video frames with the keyboard and mouse events recorded along.")
+
+
+@app.command()
+def build(
+    recordings: Annotated[list[Path], typer.Argument(help="The matroska files of the recording, in order")],
+    events: Annotated[Path, typer.Option(help="The recorded `event.jsonl`, or binary event log directory")],
+    output: Annotated[Path, typer.Option(help="The index directory to write")],
+    source: Annotated[
+        Optional[list[str]], typer.Option(help="Event sources to align, every keyboard and mouse event by default")
+    ] = None,
+):
+    """Write the frame-aligned action index of a recording."""
+    logger.enable("desktop_env")
+    index = build_action_index(recordings, events, output, sources=source)
+    print(index)
+
+
+@app.command()
+def show(
+    path: Annotated[Path, typer.Argument(help="The index directory")],
+    count: Annotated[int, typer.Option(help="Frames to print")] = 10,
+    start: Annotated[int, typer.Option(help="First frame to print")] = 0,
+):
+    """Print frames of an action index."""
+    index = ActionIndex(path)
+    print(index)
+    for number in range(start, min(start + count, len(index))):
+        frame = index.frames[number]
+        print(
+            f"{number:8d} {frame['timestamp_ns']} ({frame['x']:5d}, {frame['y']:5d}) d=({frame['dx']}, {frame['dy']}) "
+            f"buttons={frame['buttons']:#04x} keys={index.keys_of(frame['keys'])} "
+            f"pressed={index.keys_of(frame['keys_pressed'])} scroll=({frame['scroll_dx']}, {frame['scroll_dy']})"
+        )
+
+
+if __name__ == "__main__":
+    app()
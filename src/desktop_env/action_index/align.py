@@ -0,0 +1,190 @@
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from ..event_writer.event_log import (
+    KEYBOARD_DTYPE,
+    KEYBOARD_EVENT_TYPES,
+    MOUSE_DTYPE,
+    MOUSE_EVENT_TYPES,
+    EventLog,
+    _mouse_fields,
+)
+from ..replayer.replayer import iter_recorded_events
+
+# Keys are numbered in the order of their vk, up to this many per index
+MAX_KEYS = 256
+KEY_BYTES = MAX_KEYS // 8
+
+# One record per video frame. Key bit i is `key_vks[i]` of the index, little-endian within each byte, i.e. the bit
+# `keys[i // 8] >> (i % 8) & 1`; button bit i is `MOUSE_BUTTONS[i]`. Deltas are zero for the first frame.
+FRAME_DTYPE = np.dtype(
+    [
+        ("timestamp_ns", "<i8"),  # UTC, of the shared `desktop_env.clock`
+        ("pts_ns", "<i8"),  # presentation time in its recording
+        ("keys", "u1", KEY_BYTES),  # keys held at the frame
+        ("keys_pressed", "u1", KEY_BYTES),  # keys pressed since the previous frame, even if released already
+        ("keys_released", "u1", KEY_BYTES),
+        ("buttons", "u1"),  # mouse buttons held at the frame
+        ("buttons_pressed", "u1"),
+        ("buttons_released", "u1"),
+        ("_pad", "u1"),
+        ("x", "<i4"),  # cursor position at the frame
+        ("y", "<i4"),
+        ("dx", "<i4"),  # cursor movement since the previous frame
+        ("dy", "<i4"),
+        ("scroll_dx", "<i4"),  # scrolled since the previous frame
+        ("scroll_dy", "<i4"),
+    ]
+)
+
+_ON_PRESS = KEYBOARD_EVENT_TYPES.index("on_press")
+_ON_CLICK = MOUSE_EVENT_TYPES.index("on_click")
+_ON_SCROLL = MOUSE_EVENT_TYPES.index("on_scroll")
+
+
+def load_input_events(path: Union[str, Path], sources: Optional[list[str]] = None) -> tuple[np.ndarray, np.ndarray]:
+    """The keyboard and mouse records of an `EventWriter` log, as arrays of `KEYBOARD_DTYPE` and `MOUSE_DTYPE` sorted
+    by `event_time`.
+
+    Binary logs are read as they are. JSONL logs are parsed and encoded like the binary writer does, with `source` and
+    `timestamp_ns` left to zero. A log with records but no keyboard or mouse event raises a `ValueError`.
+    """
+    path = Path(path)
+    if path.is_dir():
+        log = EventLog(path)
+        keyboard, mouse = log.keyboard, log.mouse
+        if sources is not None:
+            codes = [code for code, source in enumerate(log.sources) if source in sources]
+            keyboard = keyboard[np.isin(keyboard["source"], codes)]
+            mouse = mouse[np.isin(mouse["source"], codes)]
+    else:
+        keyboard_rows, mouse_rows = [], []
+        for event in iter_recorded_events(path, sources):
+            if event.device_name == "keyboard":
+                event_type = KEYBOARD_EVENT_TYPES.index(event.event_type)
+                keyboard_rows.append((0, event.event_time, 0, event_type, 0, event.event_data))
+            else:
+                mouse_rows.append((0, event.event_time, 0, *_mouse_fields(event)))
+        keyboard = np.array(keyboard_rows, dtype=KEYBOARD_DTYPE)
+        mouse = np.array(mouse_rows, dtype=MOUSE_DTYPE)
+    if len(keyboard) == 0 and len(mouse) == 0 and _has_records(path):
+        # Every frame would be indexed with nothing held, which is more likely a log this reader doesn't understand
+        selected = "" if sources is None else f" of the sources {sources}"
+        raise ValueError(f"{path} has records but no keyboard or mouse events{selected}.")
+    keyboard = keyboard[np.argsort(keyboard["event_time"], kind="stable")]
+    mouse = mouse[np.argsort(mouse["event_time"], kind="stable")]
+    return keyboard, mouse
+
+
+def _has_records(path: Path) -> bool:
+    if path.is_dir():
+        return len(EventLog(path)) > 0
+    with open(path, "rb") as file:
+        return any(line.strip() for line in file)
+
+
+def _scatter_bits(frames: np.ndarray, bits: np.ndarray, count: int, nbytes: int) -> np.ndarray:
+    """A bitset of `nbytes` per frame for `count` frames, with the bit `bits[i]` of the frame `frames[i]` set."""
+    out = np.zeros((count, nbytes), dtype=np.uint8)
+    cells = np.unique(frames.astype(np.int64) * (nbytes * 8) + bits)
+    if len(cells) == 0:
+        return out
+    # Bits of the same byte are OR-ed together, the bytes are set at once
+    byte_cells = cells >> 3
+    starts = np.flatnonzero(np.diff(byte_cells, prepend=-1))
+    values = np.left_shift(1, cells & 7).astype(np.uint8)
+    out.reshape(-1)[byte_cells[starts]] = np.bitwise_or.reduceat(values, starts)
+    return out
+
+
+def _bit_states(
+    times: np.ndarray, bits: np.ndarray, pressed: np.ndarray, timestamps_ns: np.ndarray, nbytes: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The held bits at every frame, and the bits pressed and released since the previous frame.
+
+    Each event counts for the first frame at or after it, i.e. the frame whose interval `(previous, frame]` holds it.
+    Presses and releases up to the first frame are left out of the deltas.
+    """
+    count = len(timestamps_ns)
+    frames = np.searchsorted(timestamps_ns, times, side="left")
+    kept = frames < count  # events after the last frame
+    frames, bits, pressed = frames[kept], bits[kept].astype(np.int64), pressed[kept].astype(bool)
+    since = frames > 0
+    pressed_since = _scatter_bits(frames[since & pressed], bits[since & pressed], count, nbytes)
+    released_since = _scatter_bits(frames[since & ~pressed], bits[since & ~pressed], count, nbytes)
+
+    # The state of a bit at a frame is its last event up to the frame. The held bitsets are the running XOR of the
+    # frames at which a bit's state differs from its state at the previous frame it had events at.
+    order = np.argsort(bits, kind="stable")  # grouped by bit, still in time order
+    frames, bits, pressed = frames[order], bits[order], pressed[order]
+    last = np.ones(len(bits), dtype=bool)
+    last[:-1] = (bits[1:] != bits[:-1]) | (frames[1:] != frames[:-1])
+    frames, bits, state = frames[last], bits[last], pressed[last]
+    previous = np.zeros(len(state), dtype=bool)
+    previous[1:] = (bits[1:] == bits[:-1]) & state[:-1]
+    flips = state != previous
+    held = np.bitwise_xor.accumulate(_scatter_bits(frames[flips], bits[flips], count, nbytes), axis=0)
+    return held, pressed_since, released_since
+
+
+def align_frames(
+    timestamps_ns: np.ndarray,
+    keyboard: np.ndarray,
+    mouse: np.ndarray,
+    *,
+    pts_ns: Optional[np.ndarray] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Align the input state to video frames.
+
+    Every field is computed for all frames at once: events are joined to frames with binary searches of the sorted
+    timestamps, key and button states are scattered as bit flips and accumulated with a running XOR, and scrolls are
+    summed with a cumulative sum, so the cost grows with the number of frames plus the number of events.
+
+    Args:
+        timestamps_ns: UTC timestamps of the frames, sorted.
+        keyboard: Keyboard records of `KEYBOARD_DTYPE`, sorted by `event_time`.
+        mouse: Mouse records of `MOUSE_DTYPE`, sorted by `event_time`.
+        pts_ns: Presentation times of the frames, stored as they are.
+
+    Returns:
+        The frames, of `FRAME_DTYPE`, and the vk of each key bit.
+    """
+    timestamps_ns = np.asarray(timestamps_ns, dtype=np.int64)
+    if np.any(np.diff(timestamps_ns) < 0):
+        raise ValueError("Frame timestamps must be sorted.")
+    frames = np.zeros(len(timestamps_ns), dtype=FRAME_DTYPE)
+    frames["timestamp_ns"] = timestamps_ns
+    frames["pts_ns"] = -1 if pts_ns is None else pts_ns
+
+    # Keys, one bit per distinct vk
+    key_vks, key_bits = np.unique(keyboard["vk"], return_inverse=True)
+    if len(key_vks) > MAX_KEYS:
+        raise ValueError(f"The log has {len(key_vks)} distinct keys, more than the {MAX_KEYS} an index can hold.")
+    pressed = keyboard["event_type"] == _ON_PRESS
+    frames["keys"], frames["keys_pressed"], frames["keys_released"] = _bit_states(
+        keyboard["event_time"], key_bits, pressed, timestamps_ns, KEY_BYTES
+    )
+
+    if len(mouse) == 0:
+        return frames, key_vks.astype(np.int64)
+
+    # Cursor, at the last event at or before the frame, or at the first event for the frames before it
+    last = np.maximum(np.searchsorted(mouse["event_time"], timestamps_ns, side="right") - 1, 0)
+    x, y = mouse["x"][last], mouse["y"][last]
+    frames["x"], frames["y"] = x, y
+    frames["dx"], frames["dy"] = np.diff(x, prepend=x[:1]), np.diff(y, prepend=y[:1])
+
+    # Buttons
+    clicks = mouse[mouse["event_type"] == _ON_CLICK]
+    states = _bit_states(clicks["event_time"], clicks["button"], clicks["pressed"], timestamps_ns, 1)
+    frames["buttons"], frames["buttons_pressed"], frames["buttons_released"] = (state[:, 0] for state in states)
+
+    # Scroll, summed over the events of each frame interval
+    scrolls = mouse[mouse["event_type"] == _ON_SCROLL]
+    count = np.searchsorted(scrolls["event_time"], timestamps_ns, side="right")
+    for field in ("dx", "dy"):
+        total = np.concatenate([[0], np.cumsum(scrolls[field], dtype=np.int64)])[count]
+        frames[f"scroll_{field}"] = np.diff(total, prepend=total[:1])
+    return frames, key_vks.astype(np.int64)
@@ -0,0 +1,134 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+import numpy as np
+from loguru import logger
+
+from .align import FRAME_DTYPE, align_frames, load_input_events
+
+FORMAT_NAME = "desktop-env-action-index"
+FORMAT_VERSION = 1
+
+
+def write_action_index(
+    path: Union[str, os.PathLike],
+    frames: np.ndarray,
+    key_vks: np.ndarray,
+    *,
+    recordings: Sequence[tuple[str, int]] = (),
+    event_log: Optional[str] = None,
+) -> None:
+    """Write an action index directory: `frames.npy`, `keys.npy` and `header.json`.
+
+    Args:
+        path: The directory to write, created if needed.
+        frames: Frames of `FRAME_DTYPE`.
+        key_vks: The vk of each key bit.
+        recordings: (path, frame count) of the recordings the frames are from, in order.
+        event_log: The event log the frames are aligned with.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    out = np.lib.format.open_memmap(path / "frames.npy", mode="w+", dtype=FRAME_DTYPE, shape=frames.shape)
+    out[:] = frames
+    out.flush()
+    del out
+    np.save(path / "keys.npy", np.asarray(key_vks, dtype=np.int64))
+    header = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "recordings": [{"path": str(recording), "frames": count} for recording, count in recordings],
+        "event_log": event_log,
+        "dtype": [list(field) for field in FRAME_DTYPE.descr],
+    }
+    (path / "header.json").write_text(json.dumps(header, indent=2))
+
+
+def build_action_index(
+    recordings: Sequence[Union[str, os.PathLike]],
+    event_log: Union[str, os.PathLike],
+    output: Union[str, os.PathLike],
+    *,
+    sources: Optional[list[str]] = None,
+) -> "ActionIndex":
+    """Align the frames of `recordings` with the keyboard and mouse events of `event_log` and write the index.
+
+    Args:
+        recordings: The matroska files of a recording, e.g. its segments, in order.
+        event_log: The JSONL file, or binary event log directory, recorded along.
+        output: The index directory to write.
+        sources: The event sources to align. If None, every keyboard and mouse event is used.
+    """
+    from .recording import read_frame_timestamps  # needs GStreamer
+
+    started = time.perf_counter()
+    pts, timestamps, counts = [], [], []
+    for recording in recordings:
+        recording_pts, recording_timestamps = read_frame_timestamps(recording)
+        pts.append(recording_pts)
+        timestamps.append(recording_timestamps)
+        counts.append((str(recording), len(recording_pts)))
+    pts, timestamps = np.concatenate(pts), np.concatenate(timestamps)
+    read = time.perf_counter()
+
+    keyboard, mouse = load_input_events(event_log, sources)
+    order = np.argsort(timestamps, kind="stable")  # segments may overlap by a frame
+    frames, key_vks = align_frames(timestamps[order], keyboard, mouse, pts_ns=pts[order])
+    write_action_index(output, frames, key_vks, recordings=counts, event_log=str(event_log))
+    logger.info(
+        f"Indexed {len(frames)} frames against {len(keyboard)} keyboard and {len(mouse)} mouse events into {output} "
+        f"(read {read - started:.1f}s, aligned {time.perf_counter() - read:.1f}s)"
+    )
+    return ActionIndex(output)
+
+
+class ActionIndex:
+    """Reads an action index. The frames are memory-mapped as a NumPy structured array of `FRAME_DTYPE`.
+
+        index = ActionIndex("session.index")
+        frame = index.frames[index.frame_at(timestamp_ns)]
+        held = index.keys_of(frame["keys"])
+
+    Attributes:
+        frames: Records of `FRAME_DTYPE`, one per video frame in time order.
+        key_vks: The vk of each key bit of the frames.
+        recordings: (path, frame count) of the indexed recordings, in order.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = Path(path)
+        header = json.loads((self.path / "header.json").read_text())
+        if header.get("format") != FORMAT_NAME or header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{self.path} is not a {FORMAT_NAME} of version {FORMAT_VERSION}.")
+        self.recordings: list[tuple[str, int]] = [(item["path"], item["frames"]) for item in header["recordings"]]
+        self.event_log: Optional[str] = header["event_log"]
+        self.frames = np.load(self.path / "frames.npy", mmap_mode="r")
+        if self.frames.dtype != FRAME_DTYPE:
+            raise ValueError(f"The frames of {self.path} have an unknown layout.")
+        self.key_vks = np.load(self.path / "keys.npy")
+
+    def frame_at(self, timestamp_ns: Union[int, np.ndarray]) -> Union[int, np.ndarray]:
+        """The index of the last frame at or before `timestamp_ns`, or -1 before the first frame."""
+        return np.searchsorted(self.frames["timestamp_ns"], timestamp_ns, side="right") - 1
+
+    def keys_of(self, bits: np.ndarray) -> list[int]:
+        """The vks of a key bitset, e.g. `frame["keys"]`."""
+        flags = np.unpackbits(np.asarray(bits, dtype=np.uint8), bitorder="little")[: len(self.key_vks)]
+        return self.key_vks[flags.astype(bool)].tolist()
+
+    def key_mask(self, vk: int) -> np.ndarray:
+        """Whether `vk` is held, for every frame."""
+        bit = np.flatnonzero(self.key_vks == vk)
+        if len(bit) == 0:
+            return np.zeros(len(self.frames), dtype=bool)
+        bit = int(bit[0])
+        return (self.frames["keys"][:, bit >> 3] >> (bit & 7) & 1).astype(bool)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.path}, frames={len(self.frames)}, keys={len(self.key_vks)})"
@@ -0,0 +1,92 @@
+import gi
+
+gi.require_version("Gst", "1.0")
+import re
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+from gi.repository import Gst
+
+Gst.init(None)
+
+# The text of a `utctimestampsrc` subtitle is the UTC time in nanoseconds
+UTC_NS_PATTERN = re.compile(rb"\d{16,}")
+
+
+def _demux_pipeline(path: Path) -> tuple[Gst.Pipeline, list[int], list[tuple[int, int]]]:
+    """A pipeline which demuxes `path` without decoding, collecting the video PTS and the (PTS, UTC) of subtitles."""
+    pipeline = Gst.Pipeline.new()
+    src = Gst.ElementFactory.make("filesrc")
+    src.set_property("location", str(path))
+    demux = Gst.ElementFactory.make("matroskademux")
+    pipeline.add(src)
+    pipeline.add(demux)
+    src.link(demux)
+
+    video_pts: list[int] = []
+    subtitles: list[tuple[int, int]] = []
+
+    def on_sample(sink, collect) -> Gst.FlowReturn:
+        sample = sink.emit("pull-sample")
+        if sample is not None:
+            collect(sample.get_buffer())
+        return Gst.FlowReturn.OK
+
+    def collect_frame(buffer: Gst.Buffer) -> None:
+        if buffer.pts != Gst.CLOCK_TIME_NONE:
+            video_pts.append(buffer.pts)
+
+    def collect_subtitle(buffer: Gst.Buffer) -> None:
+        match = UTC_NS_PATTERN.search(buffer.extract_dup(0, buffer.get_size()))
+        if match is not None and buffer.pts != Gst.CLOCK_TIME_NONE:
+            subtitles.append((buffer.pts, int(match.group())))
+
+    def on_pad_added(element, pad) -> None:
+        name = pad.get_name()
+        if name.startswith("video_") or name.startswith("subtitle_"):
+            sink = Gst.ElementFactory.make("appsink")
+            sink.set_property("sync", False)
+            sink.set_property("emit-signals", True)
+            sink.connect("new-sample", on_sample, collect_frame if name.startswith("video_") else collect_subtitle)
+        else:
+            sink = Gst.ElementFactory.make("fakesink")
+            sink.set_property("sync", False)
+        pipeline.add(sink)
+        sink.sync_state_with_parent()
+        pad.link(sink.get_static_pad("sink"))
+
+    demux.connect("pad-added", on_pad_added)
+    return pipeline, video_pts, subtitles
+
+
+def read_frame_timestamps(path: Union[str, Path]) -> tuple[np.ndarray, np.ndarray]:
+    """The presentation time and UTC timestamp of every video frame of a recording, in presentation order.
+
+    Frames are demuxed, not decoded. Their UTC timestamps are interpolated from the `utctimestampsrc` subtitles of
+    the recording, i.e. each frame gets the UTC offset of the subtitles around it; frames outside the subtitles get
+    the offset of the nearest one.
+
+    Returns:
+        The PTS and the UTC timestamps of the frames, in nanoseconds.
+    """
+    path = Path(path)
+    pipeline, video_pts, subtitles = _demux_pipeline(path)
+    pipeline.set_state(Gst.State.PLAYING)
+    try:
+        bus = pipeline.get_bus()
+        message = bus.timed_pop_filtered(Gst.CLOCK_TIME_NONE, Gst.MessageType.EOS | Gst.MessageType.ERROR)
+        if message.type == Gst.MessageType.ERROR:
+            error, debug = message.parse_error()
+            raise RuntimeError(f"Failed to read {path}: {error.message} ({debug})")
+    finally:
+        pipeline.set_state(Gst.State.NULL)
+
+    if not subtitles:
+        raise ValueError(f"{path} has no UTC timestamp subtitles. Record it with `record_timestamp=True`.")
+    pts = np.sort(np.array(video_pts, dtype=np.int64))
+    subtitle_pts, subtitle_utc = np.array(sorted(subtitles), dtype=np.int64).T
+    offsets = subtitle_utc - subtitle_pts
+    # Interpolate the drift from the first offset, as UTC nanoseconds lose precision in float64
+    drift = np.interp(pts, subtitle_pts, offsets - offsets[0])
+    return pts, pts + offsets[0] + np.round(drift).astype(np.int64)
@@ -0,0 +1,202 @@
+"""
+Batched input actions. A sequence of actions is compiled once, i.e. keys and buttons are resolved to pynput objects
+and delays to offsets from the start of the sequence, then injected from a dedicated thread with precise timing.
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from queue import SimpleQueue
+from typing import Any, Callable, Literal, NamedTuple, Optional, Sequence, Union
+
+import pynput
+from loguru import logger
+from pydantic import BaseModel
+
+from .clock import sleep_until
+from .utils.keymap import KEY_TO_VK, char_to_vk, vk_to_key
+
+ActionKind = Literal["key_press", "key_release", "mouse_move", "mouse_press", "mouse_release", "scroll", "wait"]
+
+
+class Action(NamedTuple):
+    """One input injection, `delay` seconds after the previous action of its sequence.
+
+    - key_press, key_release: `args` is `(vk,)`.
+    - mouse_move: `(x, y)`.
+    - mouse_press, mouse_release: `(button,)`, e.g. `("left",)`.
+    - scroll: `(dx, dy)`.
+    - wait: `()`, only delays the next action.
+    """
+
+    kind: ActionKind
+    args: tuple = ()
+    delay: float = 0.0
+
+
+class ActionResult(BaseModel):
+    actions: int = 0  # injected actions
+    elapsed_sec: float = 0.0
+    mean_error_us: float = 0.0  # mean lateness of the injections against their schedule
+    max_error_us: float = 0.0
+
+
+class _Step(NamedTuple):
+    offset_ns: int  # from the start of the sequence
+    inject: Optional[Callable[..., None]]
+    args: tuple
+    # (key or button, its release function) for a press, (key or button, None) for a release. A failed sequence
+    # releases what it still holds
+    held: Optional[tuple[Any, Optional[Callable[[Any], None]]]]
+
+
+def key_vk(key: Union[int, str]) -> int:
+    """The virtual key code of a vk, a character (e.g. "c") or a name of `pynput.keyboard.Key` (e.g. "ctrl")."""
+    if isinstance(key, int):
+        return key
+    if len(key) == 1:
+        return char_to_vk(key)
+    special = getattr(pynput.keyboard.Key, key, None)
+    if special is None or special not in KEY_TO_VK:
+        raise ValueError(f"Unsupported key: {key}")
+    return KEY_TO_VK[special]
+
+
+def _raise_thread_priority() -> None:
+    """Best effort, so that other busy threads of the machine delay the injections less."""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), 2)  # THREAD_PRIORITY_HIGHEST
+        elif sys.platform.startswith("linux"):
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), -10)  # needs CAP_SYS_NICE
+    except (OSError, AttributeError) as e:
+        logger.debug(f"Could not raise the priority of the action thread: {e}")
+
+
+class ActionExecutor:
+    """Injects action sequences from a dedicated thread, one sequence after another.
+
+    `submit` compiles a sequence in the calling thread, so that invalid actions raise right away, and returns a
+    `Future` resolved with an `ActionResult` once the sequence is injected. If an injection fails, the keys and
+    buttons still held by the sequence are released and the future is resolved with the exception.
+
+    Args:
+        mouse: The `MouseController` to inject with.
+        keyboard: The `KeyboardController` to inject with.
+        spin: Seconds spun in a busy loop before each action, after sleeping.
+    """
+
+    def __init__(self, mouse, keyboard, *, spin: float = 0.002):
+        self.mouse = mouse
+        self.keyboard = keyboard
+        self.spin_ns = int(spin * 1e9)
+        self._queue: SimpleQueue = SimpleQueue()
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def compile(self, actions: Sequence[Action]) -> list[_Step]:
+        keyboard, mouse = self.keyboard.controller, self.mouse.controller
+        steps, offset_ns = [], 0
+        for action in actions:
+            kind, args = action.kind, tuple(action.args)
+            offset_ns += int(action.delay * 1e9)
+            if kind in ("key_press", "key_release"):
+                key = vk_to_key(key_vk(args[0]))
+                if kind == "key_press":
+                    steps.append(_Step(offset_ns, keyboard.press, (key,), (key, keyboard.release)))
+                else:
+                    steps.append(_Step(offset_ns, keyboard.release, (key,), (key, None)))
+            elif kind in ("mouse_press", "mouse_release"):
+                button = getattr(pynput.mouse.Button, args[0] if args else "left")
+                if kind == "mouse_press":
+                    steps.append(_Step(offset_ns, mouse.press, (button,), (button, mouse.release)))
+                else:
+                    steps.append(_Step(offset_ns, mouse.release, (button,), (button, None)))
+            elif kind == "mouse_move":
+                steps.append(_Step(offset_ns, self.mouse.move, args, None))
+            elif kind == "scroll":
+                steps.append(_Step(offset_ns, mouse.scroll, args, None))
+            elif kind == "wait":
+                steps.append(_Step(offset_ns, None, (), None))
+            else:
+                raise ValueError(f"Unknown action: {kind}")
+        return steps
+
+    def submit(self, actions: Sequence[Action]) -> "Future[ActionResult]":
+        if self._closed.is_set():
+            raise RuntimeError("The action executor is closed.")
+        steps = self.compile(actions)
+        future: Future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="desktop_env-actions", daemon=True)
+                self._thread.start()
+        self._queue.put((future, steps))
+        return future
+
+    def _run(self) -> None:
+        _raise_thread_priority()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, steps = item
+            if self._closed.is_set():
+                future.cancel()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self._execute(steps))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def _execute(self, steps: list[_Step]) -> ActionResult:
+        held: dict[Any, Callable[[Any], None]] = {}  # key or button -> its release function
+        errors_ns = []
+        started_ns = time.perf_counter_ns()
+        try:
+            for step in steps:
+                deadline_ns = started_ns + step.offset_ns
+                sleep_until(deadline_ns, spin_ns=self.spin_ns, interrupt=self._closed)
+                if self._closed.is_set():
+                    raise RuntimeError("The action executor was closed during the sequence.")
+                if step.inject is None:
+                    continue
+                errors_ns.append(time.perf_counter_ns() - deadline_ns)
+                step.inject(*step.args)
+                if step.held is not None:
+                    target, release = step.held
+                    if release is not None:
+                        held[target] = release
+                    else:
+                        held.pop(target, None)
+        except BaseException:
+            for target, release in reversed(held.items()):
+                try:
+                    release(target)
+                except Exception as e:
+                    logger.warning(f"Failed to release {target} after a failed action sequence: {e}")
+            raise
+        return ActionResult(
+            actions=len(errors_ns),
+            elapsed_sec=(time.perf_counter_ns() - started_ns) / 1e9,
+            mean_error_us=sum(errors_ns) / len(errors_ns) / 1e3 if errors_ns else 0.0,
+            max_error_us=max(errors_ns) / 1e3 if errors_ns else 0.0,
+        )
+
+    def close(self) -> None:
+        """Interrupt the running sequence, cancel the queued ones and stop the thread."""
+        self._closed.set()
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join()
+        while not self._queue.empty():
+            item = self._queue.get()
+            if item is not None:
+                item[0].cancel()
@@ -1,8 +1,11 @@
-import platform
-from typing import Literal
+from concurrent.futures import Future
+from typing import Literal, Sequence, Union
 
 import pynput
 
+from .actions import Action, ActionExecutor, ActionResult
+from .utils.keymap import char_to_vks, vk_to_key
+
 
 class MouseController:
     def __init__(self):
@@ -29,48 +32,67 @@ class KeyboardController:
         self.controller = pynput.keyboard.Controller()
 
     def press(self, key: int) -> None:
-        if platform.system() == "Darwin":
-            # Special key handling for Mac OS
-            special_keys = {
-                58: pynput.keyboard.Key.alt,  # Option
-                55: pynput.keyboard.Key.cmd,  # Command
-                59: pynput.keyboard.Key.ctrl,  # Control
-                56: pynput.keyboard.Key.shift,  # Shift
-                36: pynput.keyboard.Key.enter,  # Return
-                49: pynput.keyboard.Key.space,  # Space
-                51: pynput.keyboard.Key.backspace,  # Delete
-                117: pynput.keyboard.Key.delete,  # Forward Delete
-                48: pynput.keyboard.Key.tab,  # Tab
-                53: pynput.keyboard.Key.esc,  # Escape
-            }
-            if key in special_keys:
-                self.controller.press(special_keys[key])
-                return
-        key_code = pynput.keyboard.KeyCode.from_vk(key)
-        self.controller.press(key_code)
+        self.controller.press(vk_to_key(key))
 
     def release(self, key: int) -> None:
-        if platform.system() == "Darwin":
-            special_keys = {
-                58: pynput.keyboard.Key.alt,  # Option
-                55: pynput.keyboard.Key.cmd,  # Command
-                59: pynput.keyboard.Key.ctrl,  # Control
-                56: pynput.keyboard.Key.shift,  # Shift
-                36: pynput.keyboard.Key.enter,  # Return
-                49: pynput.keyboard.Key.space,  # Space
-                51: pynput.keyboard.Key.backspace,  # Delete
-                117: pynput.keyboard.Key.delete,  # Forward Delete
-                48: pynput.keyboard.Key.tab,  # Tab
-                53: pynput.keyboard.Key.esc,  # Escape
-            }
-            if key in special_keys:
-                self.controller.release(special_keys[key])
-                return
-        key_code = pynput.keyboard.KeyCode.from_vk(key)
-        self.controller.release(key_code)
+        self.controller.release(vk_to_key(key))
 
 
 class ActorMixin:
+    """Injects keyboard and mouse input.
+
+    `self.mouse` and `self.keyboard` inject single events from the calling thread. `execute`, `type_text`, `hotkey`
+    and `drag_path` compile a whole action sequence and inject it from the thread of `self.actions` with precise
+    timing; they return a `Future` right away, resolved with an `ActionResult` once the sequence is done.
+    """
+
     def __init__(self):
         self.mouse = MouseController()
         self.keyboard = KeyboardController()
+        self.actions = ActionExecutor(self.mouse, self.keyboard)
+
+    def execute(self, actions: Sequence[Action]) -> "Future[ActionResult]":
+        """Inject a sequence of actions. Sequences are injected one after another, in the order of the calls."""
+        return self.actions.submit(actions)
+
+    def type_text(self, text: str, *, interval: float = 0.03, hold: float = 0.01) -> "Future[ActionResult]":
+        """Type `text`, pressing shift where a character needs it.
+
+        Args:
+            text: The text to type, of the characters of the US layout and whitespace.
+            interval: Seconds between the releases of a character and the press of the next one.
+            hold: Seconds each key is held.
+        """
+        actions = []
+        for index, char in enumerate(text):
+            vks = char_to_vks(char)
+            for i, vk in enumerate(vks):
+                actions.append(Action("key_press", (vk,), interval if index > 0 and i == 0 else 0.0))
+            for i, vk in enumerate(reversed(vks)):
+                actions.append(Action("key_release", (vk,), hold if i == 0 else 0.0))
+        return self.execute(actions)
+
+    def hotkey(self, *keys: Union[int, str], hold: float = 0.02) -> "Future[ActionResult]":
+        """Press `keys` in order and release them in reverse order, e.g. `hotkey("ctrl", "c")`.
+
+        Keys are virtual key codes, characters or names of `pynput.keyboard.Key`.
+        """
+        actions = [Action("key_press", (key,)) for key in keys]
+        actions += [Action("key_release", (key,), hold if i == 0 else 0.0) for i, key in enumerate(reversed(keys))]
+        return self.execute(actions)
+
+    def drag_path(
+        self,
+        points: Sequence[tuple[int, int]],
+        *,
+        button: Literal["left", "right", "middle"] = "left",
+        duration: float = 0.3,
+    ) -> "Future[ActionResult]":
+        """Press `button` at the first point, move through the others evenly over `duration` seconds, and release."""
+        if len(points) < 2:
+            raise ValueError("A drag path needs at least two points.")
+        step = duration / (len(points) - 1)
+        actions = [Action("mouse_move", tuple(points[0])), Action("mouse_press", (button,))]
+        actions += [Action("mouse_move", tuple(point), step) for point in points[1:]]
+        actions.append(Action("mouse_release", (button,)))
+        return self.execute(actions)
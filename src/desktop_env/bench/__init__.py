@@ -0,0 +1,10 @@
+"""
+Screen capture benchmark of desktop-env against other Python screen capture libraries.
+
+Usage:
+    python -m desktop_env.bench run --xvfb 1920x1080 --output bench.json
+    python -m desktop_env.bench compare baseline.json bench.json
+"""
+
+from .backends import BACKENDS
+from .harness import BenchReport, BenchResult, Regression, compare_reports, run_backend, run_benchmark, xvfb_display
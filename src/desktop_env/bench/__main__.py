@@ -0,0 +1,82 @@
+import contextlib
+import sys
+from pathlib import Path
+from typing import Optional
+
+import typer
+from typing_extensions import Annotated
+
+from .backends import BACKENDS
+from .harness import BenchReport, compare_reports, run_benchmark, xvfb_display
+
+app = typer.Typer(help="Benchmark desktop-env against other Python screen capture libraries.")
+
+
+def print_report(report: BenchReport):
+    print(f"{report.platform}, Python {report.python}, DISPLAY={report.display}, target {report.framerate} FPS")
+    columns = (
+        ("FPS", 7),
+        ("p50 ms", 8),
+        ("p95 ms", 8),
+        ("p99 ms", 8),
+        ("CPU %", 7),
+        ("RSS MB", 8),
+        ("copied/frame", 13),
+    )
+    print(f"{'backend':18s} " + " ".join(f"{column:>{width}s}" for column, width in columns))
+    for name, result in report.results.items():
+        if result.error is not None:
+            print(f"{name:18s} skipped: {result.error}")
+            continue
+        latency = result.latency
+        p50, p95, p99 = (latency.p50_ms, latency.p95_ms, latency.p99_ms) if latency else (float("nan"),) * 3
+        print(
+            f"{name:18s} {result.fps:7.1f} {p50:8.2f} {p95:8.2f} {p99:8.2f} {result.cpu_percent:7.1f} "
+            f"{result.rss_mb:8.1f} {result.bytes_copied_per_frame / 1e6:10.2f} MB"
+        )
+
+
+@app.command()
+def run(
+    backend: Annotated[
+        Optional[list[str]], typer.Option(help=f"Backends to run, all by default. One of {', '.join(BACKENDS)}")
+    ] = None,
+    duration: Annotated[float, typer.Option(help="Seconds to run each backend")] = 10.0,
+    framerate: Annotated[int, typer.Option(help="Target framerate, the same for every backend")] = 60,
+    xvfb: Annotated[
+        Optional[str], typer.Option(help="Run on a private Xvfb server of this size, e.g. 1920x1080 (Linux only)")
+    ] = None,
+    output: Annotated[Optional[Path], typer.Option(help="Write the report as JSON to this file")] = None,
+):
+    """Run the backends one by one, each in a fresh process, and report latency, FPS, CPU, memory and copies."""
+    backends = backend or list(BACKENDS)
+    for name in backends:
+        if name not in BACKENDS:
+            raise typer.BadParameter(f"Unknown backend {name}, choose from {', '.join(BACKENDS)}")
+    with xvfb_display(xvfb) if xvfb is not None else contextlib.nullcontext():
+        report = run_benchmark(backends, duration=duration, framerate=framerate)
+    print_report(report)
+    if output is not None:
+        output.write_text(report.model_dump_json(indent=2))
+
+
+@app.command()
+def compare(
+    baseline: Annotated[Path, typer.Argument(help="The stored baseline report")],
+    current: Annotated[Path, typer.Argument(help="The report to check")],
+    tolerance: Annotated[float, typer.Option(help="Allowed relative change before a metric is flagged")] = 0.1,
+):
+    """Flag metrics which regressed against the baseline. Exits with 1 if any did."""
+    baseline_report = BenchReport.model_validate_json(baseline.read_text())
+    current_report = BenchReport.model_validate_json(current.read_text())
+    print_report(current_report)
+    regressions = compare_reports(baseline_report, current_report, tolerance=tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    print("No regressions.")
+
+
+if __name__ == "__main__":
+    app()
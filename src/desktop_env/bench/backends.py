@@ -0,0 +1,130 @@
+import time
+from typing import Callable
+
+# Called once per frame with the latency of the frame and the bytes copied into Python memory to produce it
+FrameRecorder = Callable[[int, int], None]
+
+
+class Backend:
+    """A screen capture method to benchmark. All backends are paced to the same target framerate."""
+
+    def __init__(self, framerate: int):
+        self.framerate = framerate
+
+    def run(self, duration: float, record: FrameRecorder) -> None:
+        raise NotImplementedError
+
+
+class PollingBackend(Backend):
+    """A library which grabs one screenshot per call. Latency is the duration of the call."""
+
+    def setup(self) -> None: ...
+
+    def grab(self) -> int:
+        """Grab a screenshot and return the number of bytes it occupies."""
+        raise NotImplementedError
+
+    def run(self, duration: float, record: FrameRecorder) -> None:
+        self.setup()
+        period = 1 / self.framerate
+        next_time = time.monotonic()
+        deadline = next_time + duration
+        while time.monotonic() < deadline:
+            start = time.perf_counter_ns()
+            nbytes = self.grab()
+            record(time.perf_counter_ns() - start, nbytes)
+            next_time += period
+            time.sleep(max(0, next_time - time.monotonic()))
+
+
+def _image_nbytes(image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+class MssBackend(PollingBackend):
+    def setup(self) -> None:
+        from mss import mss
+
+        self.sct = mss()
+        self.monitor = self.sct.monitors[1]
+
+    def grab(self) -> int:
+        return len(self.sct.grab(self.monitor).raw)
+
+
+class PillowBackend(PollingBackend):
+    def setup(self) -> None:
+        from PIL import ImageGrab
+
+        self.image_grab = ImageGrab
+
+    def grab(self) -> int:
+        return _image_nbytes(self.image_grab.grab())
+
+
+class PyautoguiBackend(PollingBackend):
+    def setup(self) -> None:
+        import pyautogui
+
+        self.pyautogui = pyautogui
+
+    def grab(self) -> int:
+        return _image_nbytes(self.pyautogui.screenshot())
+
+
+class PyscreenshotBackend(PollingBackend):
+    def setup(self) -> None:
+        import pyscreenshot
+
+        self.pyscreenshot = pyscreenshot
+
+    def grab(self) -> int:
+        return _image_nbytes(self.pyscreenshot.grab())
+
+
+class DesktopEnvBackend(Backend):
+    """`WindowsCapture` streaming at the target framerate. Latency is the age of the frame when the consumer gets it,
+    from its capture timestamp. Frames are delivered as zero-copy `FrameHandle`s, so no bytes are copied."""
+
+    mode = "pull"
+
+    def run(self, duration: float, record: FrameRecorder) -> None:
+        from ..clock import time_ns
+        from ..windows_capture import WindowsCapture, construct_pipeline
+
+        def on_frame_arrived(frame):
+            with frame:
+                record(time_ns() - frame.timestamp_ns, 0)
+
+        capture = WindowsCapture(
+            on_frame_arrived if self.mode == "push" else None,
+            pipeline_description=construct_pipeline(framerate=f"{self.framerate}/1"),
+            verbose=False,
+        )
+        capture.start_free_threaded()
+        try:
+            if self.mode == "push":
+                time.sleep(duration)
+            else:
+                deadline = time.monotonic() + duration
+                while (remaining := deadline - time.monotonic()) > 0:
+                    frame = capture.pull(timeout=remaining)
+                    if frame is None:
+                        break
+                    on_frame_arrived(frame)
+        finally:
+            capture.stop_join_close()
+
+
+class DesktopEnvPushBackend(DesktopEnvBackend):
+    mode = "push"
+
+
+BACKENDS: dict[str, type[Backend]] = {
+    "desktop-env-pull": DesktopEnvBackend,
+    "desktop-env-push": DesktopEnvPushBackend,
+    "mss": MssBackend,
+    "pillow": PillowBackend,
+    "pyautogui": PyautoguiBackend,
+    "pyscreenshot": PyscreenshotBackend,
+}
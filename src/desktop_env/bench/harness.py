@@ -0,0 +1,200 @@
+import contextlib
+import datetime
+import multiprocessing
+import os
+import platform
+import subprocess
+import threading
+import time
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+import psutil
+from pydantic import BaseModel
+
+from .backends import BACKENDS
+
+
+class LatencyStats(BaseModel):
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class BenchResult(BaseModel):
+    backend: str
+    frames: int = 0
+    duration_sec: float = 0.0
+    fps: float = 0.0
+    latency: Optional[LatencyStats] = None
+    cpu_percent: float = 0.0  # average over the run, 100% is one core
+    rss_mb: float = 0.0  # peak resident memory of the process
+    bytes_copied_per_frame: float = 0.0  # bytes copied into Python memory to produce one frame
+    error: Optional[str] = None  # set if the backend could not run, e.g. its library is not installed
+
+
+class BenchReport(BaseModel):
+    created_at: str
+    platform: str
+    python: str
+    display: Optional[str] = None
+    framerate: int
+    duration_sec: float
+    results: dict[str, BenchResult]
+
+
+class Regression(BaseModel):
+    backend: str
+    metric: str
+    baseline: float
+    current: float
+
+    def __str__(self):
+        return f"{self.backend}: {self.metric} regressed from {self.baseline:.2f} to {self.current:.2f}"
+
+
+# Compared metrics: (getter, whether higher is better, absolute change below which differences are noise)
+COMPARED_METRICS = {
+    "fps": (lambda result: result.fps, True, 1.0),
+    "latency_p95_ms": (lambda result: result.latency.p95_ms if result.latency else None, False, 0.5),
+    "cpu_percent": (lambda result: result.cpu_percent, False, 2.0),
+    "rss_mb": (lambda result: result.rss_mb, False, 5.0),
+}
+
+
+class _PeakRssMonitor:
+    def __init__(self, process, interval: float = 0.1):
+        self.process = process
+        self.interval = interval
+        self.peak = process.memory_info().rss
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop_event.set()
+        self._thread.join()
+
+
+def run_backend(name: str, *, duration: float, framerate: int) -> BenchResult:
+    """Run one backend in the current process."""
+    latencies, copied = [], [0]
+
+    def record(latency_ns: int, nbytes: int):
+        latencies.append(latency_ns)
+        copied[0] += nbytes
+
+    backend = BACKENDS[name](framerate)
+    process = psutil.Process()
+    try:
+        with _PeakRssMonitor(process) as rss:
+            cpu_before, start = process.cpu_times(), time.perf_counter()
+            backend.run(duration, record)
+            cpu_after, elapsed = process.cpu_times(), time.perf_counter() - start
+    except ImportError as e:
+        return BenchResult(backend=name, error=f"Not installed: {e.name}")
+    except Exception as e:
+        return BenchResult(backend=name, error=f"{type(e).__name__}: {e}")
+
+    cpu_time = sum(cpu_after[:4]) - sum(cpu_before[:4])  # user, system and those of waited children
+    result = BenchResult(
+        backend=name,
+        frames=len(latencies),
+        duration_sec=elapsed,
+        fps=len(latencies) / elapsed,
+        cpu_percent=100 * cpu_time / elapsed,
+        rss_mb=rss.peak / 2**20,
+        bytes_copied_per_frame=copied[0] / max(len(latencies), 1),
+    )
+    if latencies:
+        latency_ms = np.array(latencies) / 1e6
+        p50, p95, p99 = np.percentile(latency_ms, [50, 95, 99])
+        result.latency = LatencyStats(
+            mean_ms=latency_ms.mean(), p50_ms=p50, p95_ms=p95, p99_ms=p99, max_ms=latency_ms.max()
+        )
+    return result
+
+
+def _run_backend_in_child(queue, name: str, duration: float, framerate: int):
+    queue.put(run_backend(name, duration=duration, framerate=framerate).model_dump())
+
+
+def run_isolated(name: str, *, duration: float, framerate: int) -> BenchResult:
+    """Run one backend in a fresh process, so that its CPU time and memory are not mixed with other backends'."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_run_backend_in_child, args=(queue, name, duration, framerate))
+    process.start()
+    try:
+        return BenchResult.model_validate(queue.get(timeout=duration + 60))
+    except Exception as e:
+        return BenchResult(backend=name, error=f"Benchmark process failed: {e!r}")
+    finally:
+        process.join(timeout=10)
+        if process.is_alive():
+            process.kill()
+
+
+def run_benchmark(backends: Sequence[str], *, duration: float = 10.0, framerate: int = 60) -> BenchReport:
+    """Run every backend under the same conditions, one after another, each in its own process."""
+    results = {}
+    for name in backends:
+        results[name] = run_isolated(name, duration=duration, framerate=framerate)
+    return BenchReport(
+        created_at=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        platform=platform.platform(),
+        python=platform.python_version(),
+        display=os.environ.get("DISPLAY"),
+        framerate=framerate,
+        duration_sec=duration,
+        results=results,
+    )
+
+
+def compare_reports(baseline: BenchReport, current: BenchReport, *, tolerance: float = 0.1) -> list[Regression]:
+    """Find metrics which got worse than the baseline by more than `tolerance` (relative) and the noise floor."""
+    regressions = []
+    for name, result in current.results.items():
+        base = baseline.results.get(name)
+        if base is None or base.error is not None or result.error is not None:
+            continue
+        for metric, (get, higher_is_better, noise) in COMPARED_METRICS.items():
+            old, new = get(base), get(result)
+            if old is None or new is None:
+                continue
+            worse_by = old - new if higher_is_better else new - old
+            if worse_by > max(tolerance * abs(old), noise):
+                regressions.append(Regression(backend=name, metric=metric, baseline=old, current=new))
+    return regressions
+
+
+@contextlib.contextmanager
+def xvfb_display(size: str = "1920x1080") -> Iterator[str]:
+    """Start a private Xvfb server of the given size and point `DISPLAY` to it while the context is active."""
+    read_fd, write_fd = os.pipe()
+    server = subprocess.Popen(
+        ["Xvfb", "-displayfd", str(write_fd), "-screen", "0", f"{size}x24", "-nolisten", "tcp"], pass_fds=(write_fd,)
+    )
+    os.close(write_fd)
+    previous = os.environ.get("DISPLAY")
+    try:
+        with os.fdopen(read_fd) as display_file:
+            display = f":{display_file.readline().strip()}"
+        os.environ["DISPLAY"] = display
+        yield display
+    finally:
+        if previous is None:
+            os.environ.pop("DISPLAY", None)
+        else:
+            os.environ["DISPLAY"] = previous
+        server.terminate()
+        server.wait()
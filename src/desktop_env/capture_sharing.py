@@ -0,0 +1,190 @@
+from fractions import Fraction
+from typing import AsyncIterator, Iterator, NamedTuple, Optional, Union
+
+from loguru import logger
+from tqdm import tqdm
+
+from .desktop_args import SubmoduleArgs
+from .recorder import Recorder, RecorderArgs
+from .threading import AbstractThread
+from .windows_capture import WindowsCapture, WindowsCaptureArgs
+from .windows_capture.appsink_reader import AppsinkReader
+from .windows_capture.args import FrameSubscriberArgs
+from .windows_capture.gst_pipeline import resolve_backend
+from .windows_capture.metrics import CaptureMetricsSnapshot
+from .windows_capture.msg import Frame
+
+
+class SharedCapture(NamedTuple):
+    """Where the frames of a `WindowsCapture` merged into another submodule's pipeline are read from."""
+
+    host: int  # index of the submodule which owns the pipeline
+    appsink: str  # the subscriber of the host which replaces the primary appsink of the capture
+    subscribers: tuple[str, ...]  # the subscribers of the capture, moved to the host
+    verbose: bool = False  # whether the capture shows the progress bar of its frames
+
+
+def source_key(args) -> Optional[tuple]:
+    """The screen source captured by a submodule, or None if it captures nothing or can't share its capture.
+
+    A `WindowsCapture` can only share if its pipeline is constructed from its fields and is not cropped.
+    """
+    if isinstance(args, RecorderArgs):
+        if not args.record_video:
+            return None
+    elif isinstance(args, WindowsCaptureArgs):
+        if args.crop is not None:
+            logger.info("A cropped capture is not shared with other submodules")
+            return None
+        if args.pipeline_description != args.default_pipeline_description():
+            logger.info(
+                "A capture with its own `pipeline_description` is not shared with other submodules. Set its fields, "
+                "e.g. `monitor_idx` and `framerate`, instead of the pipeline to share its source."
+            )
+            return None
+    else:
+        return None
+    return (resolve_backend(args.backend), args.window_name, args.monitor_idx)
+
+
+def _guest_subscribers(
+    args: WindowsCaptureArgs, appsink: str, host_framerate: Fraction
+) -> tuple[FrameSubscriberArgs, list[FrameSubscriberArgs]]:
+    """Turn the primary appsink and the subscribers of a `WindowsCapture` into subscribers of the host."""
+    framerate = Fraction(args.framerate)
+    if framerate > host_framerate:
+        logger.warning(f"Capture at {args.framerate} FPS shares a {host_framerate} FPS source and is limited to it")
+    # The branches of the capture used to read its own, rate-limited tee
+    max_framerate = args.framerate if framerate < host_framerate else None
+    primary = FrameSubscriberArgs(
+        name=appsink,
+        on_frame_arrived=args.on_frame_arrived,
+        max_framerate=max_framerate,
+        width=args.width,
+        height=args.height,
+        interpolation=args.interpolation,
+        format=args.output_format,
+        jpeg_quality=args.jpeg_quality,
+        png_compression_level=args.png_compression_level,
+        frame_pool=args.frame_pool,
+        dispatch=args.dispatch,
+        change_detection=args.change_detection,
+        metrics=args.metrics,
+    )
+    # The metrics of the branches are collected as the capture would, not as the host does
+    subscribers = [
+        subscriber.model_copy(
+            update={
+                "max_framerate": subscriber.max_framerate or max_framerate,
+                "metrics": args.metrics if subscriber.metrics is None else subscriber.metrics,
+            }
+        )
+        for subscriber in args.subscribers
+    ]
+    return primary, subscribers
+
+
+def plan_shared_captures(submodules: list[SubmoduleArgs]) -> tuple[list[SubmoduleArgs], dict[int, SharedCapture]]:
+    """Merge the submodules which capture the same source into one pipeline.
+
+    For each source, a `Recorder` (or else the `WindowsCapture` with the highest framerate) becomes the host. The
+    other `WindowsCapture`s on the source become subscribers of the host, i.e. branches of its tee, so the source is
+    captured once. Returns the submodules with the arguments of the hosts updated, and the merged captures by index.
+    """
+    groups: dict[tuple, list[int]] = {}
+    for index, submodule in enumerate(submodules):
+        key = source_key(submodule.args)
+        if key is not None:
+            groups.setdefault(key, []).append(index)
+
+    submodules = list(submodules)
+    shared: dict[int, SharedCapture] = {}
+    for key, indices in groups.items():
+        recorders = [index for index in indices if isinstance(submodules[index].args, RecorderArgs)]
+        captures = [index for index in indices if isinstance(submodules[index].args, WindowsCaptureArgs)]
+        if recorders:
+            host = recorders[0]
+        else:
+            host = max(captures, key=lambda index: Fraction(submodules[index].args.framerate))
+        guests = [index for index in captures if index != host]
+        if not guests:
+            continue
+
+        host_args: Union[RecorderArgs, WindowsCaptureArgs] = submodules[host].args
+        host_framerate = Fraction(host_args.framerate)
+        subscribers = list(host_args.subscribers)
+        for guest in guests:
+            appsink = f"shared_capture_{guest}"
+            primary, guest_subscribers = _guest_subscribers(submodules[guest].args, appsink, host_framerate)
+            subscribers += [primary, *guest_subscribers]
+            guest_names = tuple(subscriber.name for subscriber in guest_subscribers)
+            shared[guest] = SharedCapture(host, appsink, guest_names, verbose=submodules[guest].args.verbose)
+        names = [subscriber.name for subscriber in subscribers]
+        duplicates = {name for name in names if names.count(name) > 1}
+        if duplicates:
+            raise ValueError(f"Subscribers of the captures of {key} must have distinct names, got {duplicates}")
+
+        host_args = host_args.model_copy(update={"subscribers": subscribers})
+        if isinstance(host_args, WindowsCaptureArgs):
+            host_args.pipeline_description = host_args.default_pipeline_description()
+        submodules[host] = submodules[host].model_copy(update={"args": host_args})
+        logger.info(f"Sharing the capture of {key} between submodules {[host, *guests]}")
+    return submodules, shared
+
+
+class CaptureBranch(AbstractThread):
+    """Stands in for a `WindowsCapture` which was merged into the pipeline of another submodule, the host.
+
+    It has the same frame API as `WindowsCapture`, reading from the host's subscribers. The host owns the pipeline,
+    so starting and stopping are left to it. With `verbose`, it shows the progress bar of its frames, like the
+    capture would.
+    """
+
+    def __init__(self, host: Union[WindowsCapture, Recorder], shared: SharedCapture):
+        self.host = host
+        self.shared = shared
+        self.pbar = tqdm(
+            total=None, desc="Producing Frames", unit="frames", dynamic_ncols=True, disable=not shared.verbose
+        )
+        if shared.verbose:
+            self.reader.pbar = self.pbar
+
+    @property
+    def reader(self) -> AppsinkReader:
+        return self.host.subscribers[self.shared.appsink]
+
+    @property
+    def subscribers(self) -> dict[str, AppsinkReader]:
+        return {name: self.host.subscribers[name] for name in self.shared.subscribers}
+
+    @property
+    def pool_stats(self):
+        return self.reader.pool_stats
+
+    @property
+    def dispatch_stats(self):
+        return self.reader.dispatch_stats
+
+    @property
+    def change_stats(self):
+        return self.reader.change_stats
+
+    def metrics_snapshot(self) -> dict[str, CaptureMetricsSnapshot]:
+        readers = {"appsink": self.reader, **self.subscribers}
+        snapshots = {name: reader.metrics_snapshot() for name, reader in readers.items()}
+        return {name: snapshot for name, snapshot in snapshots.items() if snapshot is not None}
+
+    def pull(self, timeout: Optional[float] = None) -> Optional[Frame]:
+        return self.reader.pull(timeout)
+
+    def latest(self, timeout: float = 0) -> Optional[Frame]:
+        return self.reader.latest(timeout)
+
+    def frames(self, timeout: Optional[float] = None) -> Iterator[Frame]:
+        return self.reader.frames(timeout)
+
+    def aframes(self, timeout: Optional[float] = None) -> AsyncIterator[Frame]:
+        return self.reader.aframes(timeout)
+
+    def close(self):
+        self.pbar.close()
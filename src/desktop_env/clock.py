@@ -0,0 +1,192 @@
+"""
+Process-wide clock which stamps every event of desktop_env in UTC nanoseconds.
+
+Instead of reading the wall clock (`time.time_ns()`) for every event, which jitters and jumps when NTP steps the
+system time, timestamps are taken from the monotonic clock and converted to UTC with a calibrated offset:
+`utc_ns = monotonic_ns + offset_ns`. The offset is measured once, then re-measured every `recalibrate_interval`
+seconds. The rate at which it drifts, as the two clocks tick at slightly different speeds, is tracked too and
+extrapolated between measurements. All submodules (capture, control publisher, window publisher, timestamp source)
+share this clock, so their timestamps are comparable with each other.
+
+Other clocks, such as GStreamer's pipeline clock, are related to the monotonic clock the same way, with a `Clock`
+whose `reference` is that clock.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional, Sequence
+
+from loguru import logger
+
+# The drift rate is stored as an integer, in units of 2**-DRIFT_SHIFT ns per ns
+DRIFT_SHIFT = 32
+
+
+def _fit_line(points: Sequence[tuple[int, int]]) -> tuple[float, float]:
+    """Least-squares (slope, value at the last point) of the line through `points`."""
+    x0, y0 = points[-1]
+    xs = [x - x0 for x, _ in points]
+    ys = [y - y0 for _, y in points]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    var = sum((x - mean_x) ** 2 for x in xs)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var if var else 0.0
+    return slope, y0 + mean_y - slope * mean_x
+
+
+class Clock:
+    """Converts monotonic timestamps to UTC with a periodically recalibrated offset and drift rate.
+
+    The offset is modelled as a line, `offset_ns + drift * (monotonic_ns - anchor_ns)`, fitted by least squares to
+    the last `window` measurements. The fit averages out the noise of single measurements, and the slope follows
+    steady drift between the clocks without lagging behind it.
+
+    Args:
+        reference: The clock to convert to, in nanoseconds. UTC (`time.time_ns`) by default.
+        recalibrate_interval: Seconds between re-measurements of the offset.
+        window: Number of measurements the line is fitted to.
+        max_error: If a new measurement is off the line by more than this many seconds, e.g. because the drift rate
+            changed, the older measurements are dropped and the offset jumps to the new one. Defaults to 100 us, or
+            twice the resolution of the wall clock if it is coarser.
+        step_threshold: If a new measurement is off by more than this many seconds, the wall clock was stepped
+            (e.g. by NTP), so the drift rate is measured anew as well.
+        num_samples: Number of readings per measurement. The reading with the smallest round trip is kept.
+    """
+
+    def __init__(
+        self,
+        reference: Callable[[], int] = time.time_ns,
+        *,
+        recalibrate_interval: float = 10.0,
+        window: int = 8,
+        max_error: Optional[float] = None,
+        step_threshold: float = 0.1,
+        num_samples: int = 16,
+    ):
+        if max_error is None:
+            max_error = max(1e-4, 2 * time.get_clock_info("time").resolution)
+        self.reference = reference
+        self.recalibrate_interval_ns = int(recalibrate_interval * 1e9)
+        self.max_error_ns = int(max_error * 1e9)
+        self.step_threshold_ns = int(step_threshold * 1e9)
+        self.num_samples = num_samples
+        self._lock = threading.Lock()
+        self._measurements: deque[tuple[int, int]] = deque(maxlen=max(window, 1))
+        measured_at, measured = self._measure()
+        self._measurements.append((measured_at, measured))
+        # (anchor_ns, offset_ns, drift in 32-bit fixed point), replaced as a whole so that readers never see a
+        # half-updated model. Integer arithmetic keeps the conversion about as cheap as adding a constant offset.
+        self._model: tuple[int, int, int] = (measured_at, measured, 0)
+        self._next_calibration_ns = time.monotonic_ns() + self.recalibrate_interval_ns
+
+    def _measure(self) -> tuple[int, int]:
+        """(monotonic time, offset) of the reading whose reference read was bracketed most tightly by two monotonic
+        reads, of `num_samples` readings. That reading is the least disturbed by preemption."""
+        best_rtt, best = None, (0, 0)
+        for _ in range(self.num_samples):
+            before = time.monotonic_ns()
+            reference = self.reference()
+            after = time.monotonic_ns()
+            rtt = after - before
+            if best_rtt is None or rtt < best_rtt:
+                middle = (before + after) // 2
+                best_rtt, best = rtt, (middle, reference - middle)
+        return best
+
+    def measure_offset(self) -> int:
+        """Measure `reference() - monotonic_ns()` once."""
+        return self._measure()[1]
+
+    def _offset_at(self, monotonic_ns: int) -> int:
+        anchor_ns, offset_ns, drift = self._model
+        return offset_ns + ((monotonic_ns - anchor_ns) * drift >> DRIFT_SHIFT)
+
+    def calibrate(self) -> None:
+        """Re-measure the offset and refit the line of the offset over time."""
+        measured_at, measured = self._measure()
+        error = measured - self._offset_at(measured_at)
+        drift = self.drift
+        if abs(error) > self.step_threshold_ns:
+            logger.warning(f"Reference clock stepped by {error / 1e6:.1f} ms, resetting the offset")
+            self._measurements.clear()
+            drift = 0.0
+        elif abs(error) > self.max_error_ns:
+            # The line no longer fits, keep its drift rate until the new measurements give one
+            self._measurements.clear()
+        self._measurements.append((measured_at, measured))
+        offset = measured
+        if len(self._measurements) > 1:
+            drift, fitted = _fit_line(self._measurements)
+            offset = int(fitted)
+        self._model = (measured_at, offset, round(drift * (1 << DRIFT_SHIFT)))
+        self._next_calibration_ns = time.monotonic_ns() + self.recalibrate_interval_ns
+
+    def _calibrate_once(self) -> None:
+        """Calibrate unless another thread is already doing it."""
+        if self._lock.acquire(blocking=False):
+            try:
+                self.calibrate()
+            finally:
+                self._lock.release()
+
+    @property
+    def offset_ns(self) -> int:
+        """Offset to add to a monotonic timestamp taken now to get a reference (UTC) timestamp."""
+        return self._offset_at(time.monotonic_ns())
+
+    @property
+    def drift(self) -> float:
+        """Nanoseconds the offset changes by per monotonic nanosecond."""
+        return self._model[2] / (1 << DRIFT_SHIFT)
+
+    def monotonic_to_utc_ns(self, monotonic_ns: int) -> int:
+        if monotonic_ns >= self._next_calibration_ns:
+            self._calibrate_once()
+        anchor_ns, offset_ns, drift = self._model  # `_offset_at`, inlined on this hot path
+        return monotonic_ns + offset_ns + ((monotonic_ns - anchor_ns) * drift >> DRIFT_SHIFT)
+
+    def reference_to_monotonic_ns(self, reference_ns: int) -> int:
+        now_ns = time.monotonic_ns()
+        if now_ns >= self._next_calibration_ns:
+            self._calibrate_once()
+        # The offset changes by a few microseconds per second at most, so it is taken at the approximate time
+        return reference_ns - self._offset_at(reference_ns - self._offset_at(now_ns))
+
+    def time_ns(self) -> int:
+        """Current reference (UTC) time in nanoseconds. Drop-in replacement of `time.time_ns()`."""
+        now_ns = time.monotonic_ns()
+        if now_ns >= self._next_calibration_ns:
+            self._calibrate_once()
+        anchor_ns, offset_ns, drift = self._model
+        return now_ns + offset_ns + ((now_ns - anchor_ns) * drift >> DRIFT_SHIFT)
+
+
+# The clock shared by every submodule
+clock = Clock()
+
+
+def time_ns() -> int:
+    """Current UTC time in nanoseconds, from the shared clock."""
+    return clock.time_ns()
+
+
+def monotonic_to_utc_ns(monotonic_ns: int) -> int:
+    """Convert a `time.monotonic_ns()` timestamp to UTC with the shared clock."""
+    return clock.monotonic_to_utc_ns(monotonic_ns)
+
+
+def sleep_until(deadline_ns: int, *, spin_ns: int = 2_000_000, interrupt: Optional[threading.Event] = None) -> None:
+    """Wait until `time.perf_counter_ns()` reaches `deadline_ns`, or `interrupt` is set.
+
+    The OS sleep overshoots by up to a few milliseconds, so it only covers the time until `spin_ns` before the
+    deadline; the rest is spent in a busy loop, which keeps the wake-up jitter well under a millisecond.
+    """
+    sleep_ns = deadline_ns - time.perf_counter_ns() - spin_ns
+    if sleep_ns > 0:
+        if interrupt is not None:
+            interrupt.wait(sleep_ns / 1e9)
+        else:
+            time.sleep(sleep_ns / 1e9)
+    while time.perf_counter_ns() < deadline_ns:
+        if interrupt is not None and interrupt.is_set():
+            return
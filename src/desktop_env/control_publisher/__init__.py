@@ -7,29 +7,57 @@ from loguru import logger
 from ..threading import AbstractThread
 from .args import ControlPublishArgs
 from .callback_factory import KeyboardListenerFactory, MouseListenerFactory
+from .move_coalescing import MouseMoveMode, MouseMoveStats, MoveCoalescer
 
 
 class ControlPublisher(AbstractThread):
     args_cls = ControlPublishArgs
+    event_callbacks = {"keyboard_callback": "control_publisher", "mouse_callback": "control_publisher"}
 
-    def __init__(self, keyboard_callback: Callable, mouse_callback: Callable):
+    def __init__(
+        self,
+        keyboard_callback: Callable,
+        mouse_callback: Callable,
+        *,
+        mouse_move_mode: MouseMoveMode = "all",
+        mouse_move_rate: float = 60.0,
+        mouse_move_angle: float = 10.0,
+        lightweight_events: bool = False,
+    ):
         self.keyboard_callback = keyboard_callback
         self.mouse_callback = mouse_callback
         self._listeners = {}
 
         # Capture keyboard events
-        factory = KeyboardListenerFactory(self.keyboard_callback)
+        factory = KeyboardListenerFactory(self.keyboard_callback, lightweight=lightweight_events)
         listener = pynput.keyboard.Listener(**factory.listeners)
         self._listeners["keyboard"] = listener
 
         # Capture mouse events
-        factory = MouseListenerFactory(self.mouse_callback)
-        listener = pynput.mouse.Listener(**factory.listeners)
+        self._mouse_factory = MouseListenerFactory(
+            self.mouse_callback,
+            move_mode=mouse_move_mode,
+            move_rate=mouse_move_rate,
+            move_angle=mouse_move_angle,
+            lightweight=lightweight_events,
+        )
+        listener = pynput.mouse.Listener(**self._mouse_factory.listeners)
         self._listeners["mouse"] = listener
 
     @classmethod
     def from_args(cls, args: ControlPublishArgs):
-        return cls(args.keyboard_callback, args.mouse_callback)
+        return cls(
+            args.keyboard_callback,
+            args.mouse_callback,
+            mouse_move_mode=args.mouse_move_mode,
+            mouse_move_rate=args.mouse_move_rate,
+            mouse_move_angle=args.mouse_move_angle,
+            lightweight_events=args.lightweight_events,
+        )
+
+    @property
+    def mouse_move_stats(self) -> MouseMoveStats:
+        return self._mouse_factory.move_stats
 
     def start(self):
         self.start_free_threaded()
@@ -43,9 +71,12 @@ class ControlPublisher(AbstractThread):
     def stop(self):
         for listener in self._listeners.values():
             listener.stop()
+        self._mouse_factory.close()
 
     def join(self):
         for listener in self._listeners.values():
             listener.join()
 
-    def close(self): ...
+    def close(self):
+        stats = self.mouse_move_stats
+        logger.info(f"Mouse moves: {stats.received} received, {stats.emitted} emitted, {stats.coalesced} coalesced")
@@ -3,9 +3,20 @@ from typing import Callable
 from pydantic import BaseModel, Field, ImportString
 
 from ..args import BaseArgs, callback_sink
+from .move_coalescing import MouseMoveMode
 from .msg import KeyboardEvent, MouseEvent
 
 
 class ControlPublishArgs(BaseArgs):
     keyboard_callback: ImportString[Callable[[KeyboardEvent], None]] = Field(callback_sink)
     mouse_callback: ImportString[Callable[[MouseEvent], None]] = Field(callback_sink)
+    # all: every move, rate: at most `mouse_move_rate` moves per second, frame: the latest position once per
+    # `1 / mouse_move_rate` seconds, simplify: the points where the trajectory turns by `mouse_move_angle` or more
+    mouse_move_mode: MouseMoveMode = "all"
+    mouse_move_rate: float = Field(60.0, gt=0, description="Moves per second of the rate and frame modes")
+    mouse_move_angle: float = Field(10.0, ge=0, le=180, description="Degrees of turn kept by the simplify mode")
+    # Deliver `RawKeyboardEvent`s and `RawMouseEvent`s instead of `KeyboardEvent`s and `MouseEvent`s. They are cheap
+    # to create on the listener thread, but they are not pydantic models: they have `model_dump()` and `to_model()`,
+    # which returns the pydantic event, and no `model_dump_json()` or `model_copy()`. In a `Desktop`, it is turned on
+    # when the callbacks are left unset and the events only go to `EventWriter`s
+    lightweight_events: bool = False
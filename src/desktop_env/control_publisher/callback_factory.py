@@ -1,13 +1,20 @@
+from contextlib import nullcontext
+from typing import Optional
+
 import pynput
 from loguru import logger
 
 from ..utils import key_to_vk
-from .msg import KeyboardEvent, MouseEvent
+from .move_coalescing import MouseMoveMode, MouseMoveStats, MoveCoalescer
+from .msg import KeyboardEvent, MouseEvent, RawKeyboardEvent, RawMouseEvent
 
 
 class KeyboardListenerFactory:
-    def __init__(self, callback):
+    """Listeners of the keyboard events. With `lightweight=True`, events are `RawKeyboardEvent`s."""
+
+    def __init__(self, callback, *, lightweight: bool = False):
         self.callback = callback
+        self.event_cls = RawKeyboardEvent if lightweight else KeyboardEvent
 
     @property
     def listeners(self):
@@ -22,30 +29,72 @@ class KeyboardListenerFactory:
         # 82 r None None
         # 67  None None
         # None None ctrl_l <162>
-        self.callback(KeyboardEvent(event_type="on_press", event_data=vk))
+        self.callback(self.event_cls(event_type="on_press", event_data=vk))
 
     def on_release(self, key):
         vk = key_to_vk(key)
         logger.debug(f"Key {key}({vk}) pressed")
-        self.callback(KeyboardEvent(event_type="on_release", event_data=vk))
+        self.callback(self.event_cls(event_type="on_release", event_data=vk))
 
 
 class MouseListenerFactory:
-    def __init__(self, callback):
+    """Listeners of the mouse events, delivered as `RawMouseEvent`s if `lightweight=True`.
+
+    Moves are coalesced according to `move_mode`, see `MoveCoalescer`.
+    """
+
+    def __init__(
+        self,
+        callback,
+        *,
+        move_mode: MouseMoveMode = "all",
+        move_rate: float = 60.0,
+        move_angle: float = 10.0,
+        lightweight: bool = False,
+    ):
         self.callback = callback
+        self.event_cls = RawMouseEvent if lightweight else MouseEvent
+        self.coalescer: Optional[MoveCoalescer] = None
+        if move_mode != "all":
+            self.coalescer = MoveCoalescer(self._emit_move, move_mode, rate=move_rate, angle=move_angle)
+        self._move_stats = MouseMoveStats()
+
+    @property
+    def move_stats(self) -> MouseMoveStats:
+        return self.coalescer.stats if self.coalescer is not None else self._move_stats.model_copy()
 
     @property
     def listeners(self):
         return {"on_move": self.on_move, "on_click": self.on_click, "on_scroll": self.on_scroll}
 
+    def _emit_move(self, x, y, event_time: int):
+        logger.trace(f"Mouse moved to ({x}, {y})")
+        self.callback(self.event_cls(event_type="on_move", event_data=(x, y), event_time=event_time))
+
+    def _flushed(self):
+        # Clicks and scrolls come after the pending move
+        return self.coalescer.flushed() if self.coalescer is not None else nullcontext()
+
     def on_move(self, x, y):
+        if self.coalescer is not None:
+            self.coalescer.move(x, y)
+            return
+        self._move_stats.received += 1
+        self._move_stats.emitted += 1
         logger.trace(f"Mouse moved to ({x}, {y})")
-        self.callback(MouseEvent(event_type="on_move", event_data=(x, y)))
+        self.callback(self.event_cls(event_type="on_move", event_data=(x, y)))
 
     def on_click(self, x, y, button: pynput.mouse.Button, pressed):
         logger.debug(f"Mouse {'pressed' if pressed else 'released'} at ({x}, {y}) with {button.name}")
-        self.callback(MouseEvent(event_type="on_click", event_data=(x, y, button.name, pressed)))
+        with self._flushed():
+            self.callback(self.event_cls(event_type="on_click", event_data=(x, y, button.name, pressed)))
 
     def on_scroll(self, x, y, dx, dy):
         logger.debug(f"Mouse scrolled at ({x}, {y}) with ({dx}, {dy})")
-        self.callback(MouseEvent(event_type="on_scroll", event_data=(x, y, dx, dy)))
+        with self._flushed():
+            self.callback(self.event_cls(event_type="on_scroll", event_data=(x, y, dx, dy)))
+
+    def close(self):
+        """Emit the pending move, if any."""
+        if self.coalescer is not None:
+            self.coalescer.close()
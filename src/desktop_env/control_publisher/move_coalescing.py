@@ -0,0 +1,141 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Literal, Optional
+
+from pydantic import BaseModel
+
+from ..clock import time_ns
+
+# all: every move, rate: at most `rate` moves per second, frame: the latest position once per `1 / rate` seconds,
+# simplify: the points where the direction of the trajectory changes, and the last one
+MouseMoveMode = Literal["all", "rate", "frame", "simplify"]
+
+
+class MouseMoveStats(BaseModel):
+    received: int = 0  # moves reported by the OS
+    emitted: int = 0  # moves passed to the callback
+    coalesced: int = 0  # moves superseded by a later one before being emitted
+
+
+class MoveCoalescer:
+    """Reduces the mouse moves reported by the OS, up to 1000 per second with high polling rate mice.
+
+    A move which is not emitted right away is kept pending, and is emitted by a timer thread when it is due, unless a
+    later move supersedes it. Other mouse events must be emitted within `flushed()`, which emits the pending move first
+    so that the order of the events is kept. Moves are emitted with the position and time at which they were reported.
+
+    Args:
+        emit: Called with `(x, y, event_time)` for every emitted move, never concurrently.
+        mode: How moves are coalesced, see `MouseMoveMode`.
+        rate: Moves per second of the rate and frame modes. In the simplify mode, the pending move is emitted after
+            `1 / rate` seconds without movement.
+        angle: Minimum change of direction, in degrees, of the points kept by the simplify mode.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[float, float, int], None],
+        mode: MouseMoveMode = "rate",
+        *,
+        rate: float = 60.0,
+        angle: float = 10.0,
+    ):
+        if mode == "all":
+            raise ValueError("The all mode emits every move and needs no coalescer.")
+        self.emit = emit
+        self.mode = mode
+        self.period = 1.0 / rate
+        self.min_cos = math.cos(math.radians(angle))
+
+        self._stats = MouseMoveStats()
+        self._pending: Optional[tuple[float, float, int]] = None
+        self._anchor: Optional[tuple[float, float]] = None  # last emitted position, for the simplify mode
+        self._last_emit = -math.inf
+        self._deadline: Optional[float] = None
+        # Held while emitting, so that the timer thread and the listener thread never emit out of order
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run_deadlines, daemon=True)
+        self._thread.start()
+
+    @property
+    def stats(self) -> MouseMoveStats:
+        with self._cond:
+            return self._stats.model_copy()
+
+    def _emit_pending(self) -> None:
+        """Must be called with `self._cond` held."""
+        if self._pending is None:
+            return
+        x, y, event_time = self._pending
+        self._pending = None
+        self._anchor = (x, y)
+        self._last_emit = time.monotonic()
+        self._stats.emitted += 1
+        self.emit(x, y, event_time)
+
+    def _is_corner(self, x: float, y: float) -> bool:
+        """Whether the trajectory turns at the pending point, on its way to (x, y)."""
+        if self._anchor is None or self._pending is None:
+            return False
+        ux, uy = self._pending[0] - self._anchor[0], self._pending[1] - self._anchor[1]
+        vx, vy = x - self._pending[0], y - self._pending[1]
+        norms = math.hypot(ux, uy) * math.hypot(vx, vy)
+        return norms > 0 and (ux * vx + uy * vy) / norms < self.min_cos
+
+    def move(self, x: float, y: float) -> None:
+        event_time = time_ns()
+        with self._cond:
+            self._stats.received += 1
+            now = time.monotonic()
+            if self.mode == "simplify" and self._is_corner(x, y):
+                self._emit_pending()
+            if self._pending is not None:
+                self._stats.coalesced += 1
+            self._pending = (x, y, event_time)
+
+            if self.mode == "rate":
+                if now - self._last_emit >= self.period:
+                    self._emit_pending()
+                else:
+                    self._deadline = self._last_emit + self.period
+            elif self.mode == "frame":
+                if self._deadline is None:
+                    # The end of the current period, on a grid shared by every move
+                    self._deadline = now - now % self.period + self.period
+            elif self._anchor is None:
+                self._emit_pending()  # the start of a trajectory
+            else:
+                self._deadline = now + self.period
+            self._cond.notify_all()
+
+    @contextmanager
+    def flushed(self) -> Iterator[None]:
+        """Emit the pending move, and hold off the timer thread while the block emits another event."""
+        with self._cond:
+            self._emit_pending()
+            self._deadline = None
+            yield
+
+    def _run_deadlines(self) -> None:
+        with self._cond:
+            while not self._closed:
+                if self._deadline is None:
+                    self._cond.wait()
+                elif (timeout := self._deadline - time.monotonic()) > 0:
+                    self._cond.wait(timeout)
+                else:
+                    self._deadline = None
+                    self._emit_pending()
+                    if self.mode == "simplify":
+                        self._anchor = None  # the trajectory ended, the next move starts a new one
+
+    def close(self) -> None:
+        """Emit the pending move and stop the timer thread."""
+        with self._cond:
+            self._emit_pending()
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
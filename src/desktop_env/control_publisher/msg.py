@@ -1,14 +1,15 @@
 import datetime
-import time
-from typing import Any, Literal
+from typing import Any, ClassVar, Literal, Optional
 
 from pydantic import BaseModel, Field
 
+from ..clock import time_ns
+
 
 class BaseEvent(BaseModel):
     event_type: str | None = None
     event_data: Any = None
-    event_time: int = Field(default_factory=lambda: time.time_ns())  # nanosecond unit in general
+    event_time: int = Field(default_factory=time_ns)  # UTC nanoseconds from the shared `desktop_env.clock`
     device_name: str | None = None
 
     def __repr__(self):
@@ -16,14 +17,14 @@ class BaseEvent(BaseModel):
         return f"{datetime.datetime.fromtimestamp(self.event_time / 1e9).strftime('%Y-%m-%d %H:%M:%S')},{self.event_type},{self.event_data}"
 
     def __lt__(self, other):
-        if isinstance(other, BaseEvent):
+        if isinstance(other, (BaseEvent, RawEvent)):
             return self.event_time < other.event_time
         elif isinstance(other, float) or isinstance(other, int):
             return self.event_time < other
         raise NotImplementedError
 
     def __gt__(self, other):
-        if isinstance(other, BaseEvent):
+        if isinstance(other, (BaseEvent, RawEvent)):
             return self.event_time > other.event_time
         elif isinstance(other, float) or isinstance(other, int):
             return self.event_time > other
@@ -45,14 +46,14 @@ class KeyboardEvent(BaseEvent):
     def replay(self):
         import pynput
 
+        from ..utils.keymap import vk_to_key
+
         self.__class__.controller = getattr(self.__class__, "controller", pynput.keyboard.Controller())
         controller = self.__class__.controller
         if self.event_type == "on_press":
-            key = pynput.keyboard.KeyCode.from_vk(self.event_data)
-            controller.press(key)
+            controller.press(vk_to_key(self.event_data))
         elif self.event_type == "on_release":
-            key = pynput.keyboard.KeyCode.from_vk(self.event_data)
-            controller.release(key)
+            controller.release(vk_to_key(self.event_data))
 
 
 class MouseEvent(BaseEvent):
@@ -78,3 +79,86 @@ class MouseEvent(BaseEvent):
         elif self.event_type == "on_scroll":
             x, y, dx, dy = self.event_data
             controller.scroll(dx, dy)
+
+
+class RawEvent:
+    """A lightweight stand-in for a `BaseEvent`, created by the listeners on the input hot path.
+
+    It has the same attributes and ordering as the pydantic event, but costs no validation and no instance dict.
+    `to_model()` converts it to the pydantic event, where validation is needed; `model_dump()` serializes it without
+    the conversion.
+    """
+
+    __slots__ = ("event_type", "event_data", "event_time")
+    device_name: ClassVar[Optional[str]] = None
+    model_cls: ClassVar[type[BaseEvent]] = BaseEvent
+
+    def __init__(self, event_type: str, event_data: Any, event_time: Optional[int] = None):
+        self.event_type = event_type
+        self.event_data = event_data
+        self.event_time = time_ns() if event_time is None else event_time
+
+    @classmethod
+    def from_model(cls, event: BaseEvent) -> "RawEvent":
+        return cls(event.event_type, event.event_data, event.event_time)
+
+    def to_model(self) -> BaseEvent:
+        return self.model_cls(event_type=self.event_type, event_data=self.event_data, event_time=self.event_time)
+
+    def model_dump(self) -> dict:
+        """The same dict as `self.to_model().model_dump()`."""
+        return {
+            "event_type": self.event_type,
+            "event_data": self.event_data,
+            "event_time": self.event_time,
+            "device_name": self.device_name,
+        }
+
+    def __repr__(self):
+        return BaseEvent.__repr__(self)
+
+    def __eq__(self, other):
+        if isinstance(other, (RawEvent, BaseEvent)):
+            return (self.device_name, self.event_type, self.event_data, self.event_time) == (
+                other.device_name,
+                other.event_type,
+                other.event_data,
+                other.event_time,
+            )
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.device_name, self.event_type, self.event_data, self.event_time))
+
+    def __lt__(self, other):
+        if isinstance(other, (RawEvent, BaseEvent)):
+            return self.event_time < other.event_time
+        elif isinstance(other, float) or isinstance(other, int):
+            return self.event_time < other
+        raise NotImplementedError
+
+    def __gt__(self, other):
+        if isinstance(other, (RawEvent, BaseEvent)):
+            return self.event_time > other.event_time
+        elif isinstance(other, float) or isinstance(other, int):
+            return self.event_time > other
+        raise NotImplementedError
+
+    @property
+    def event_full_type(self):
+        return f"{self.device_name}.{self.event_type}"
+
+    def replay(self):
+        self.to_model().replay()
+
+
+class RawKeyboardEvent(RawEvent):
+    __slots__ = ()
+    device_name = "keyboard"
+    model_cls = KeyboardEvent
+
+
+class RawMouseEvent(RawEvent):
+    __slots__ = ()
+    device_name = "mouse"
+    model_cls = MouseEvent
@@ -1,25 +1,82 @@
 import importlib
 import time
+from typing import Callable, Sequence
 
 from .actor import ActorMixin
-from .desktop_args import DesktopArgs
+from .args import callback_sink
+from .desktop_args import DesktopArgs, SubmoduleArgs
+from .event_writer import EventWriter
 from .threading import AbstractThread
 
 
+def _chain(first: Callable, second: Callable) -> Callable:
+    if first is callback_sink:
+        return second
+
+    def chained(event):
+        first(event)
+        second(event)
+
+    return chained
+
+
+def chain_event_callbacks(submodule: SubmoduleArgs, writers: Sequence[EventWriter]) -> SubmoduleArgs:
+    """Chain the event callbacks of a submodule to the event writers which record its source.
+
+    If the writers are the only consumers of the events, i.e. no callback is set, a submodule which can deliver
+    lightweight events (`lightweight_events`) is switched to them, as the writers take them as they are.
+    """
+    update = {}
+    own_callbacks = False
+    for field, source in getattr(submodule.module, "event_callbacks", {}).items():
+        callback = getattr(submodule.args, field)
+        own_callbacks |= callback is not callback_sink
+        for writer in writers:
+            if writer.records(source):
+                callback = _chain(callback, writer.callback(source))
+        update[field] = callback
+    if not update:
+        return submodule
+    if not own_callbacks and "lightweight_events" in type(submodule.args).model_fields:
+        update["lightweight_events"] = True
+    return submodule.model_copy(update={"args": submodule.args.model_copy(update=update)})
+
+
 class Desktop(AbstractThread, ActorMixin):
     def __init__(self, args: DesktopArgs):
         super().__init__()
 
-        # Create threads
-        self.threads = []
+        submodules, shared = args.submodules, {}
+        if args.share_capture and len(submodules) > 1:
+            try:
+                from .capture_sharing import CaptureBranch, plan_shared_captures
+            except ImportError as e:
+                if e.name != "gi":
+                    raise
+                # GStreamer is not installed, so no submodule captures the screen
+            else:
+                submodules, shared = plan_shared_captures(submodules)
 
-        for submodule in args.submodules:
+        # Create threads. Event writers are created first, so that the publishers' callbacks can be chained to them,
+        # and captures merged into another submodule's pipeline are created after it.
+        threads = {}
+        for index, submodule in enumerate(submodules):
+            if isinstance(submodule.module, type) and issubclass(submodule.module, EventWriter):
+                threads[index] = submodule.module.from_args(submodule.args)
+        writers = list(threads.values())
+        for index, submodule in enumerate(submodules):
+            if index in shared or index in threads:
+                continue
+            if writers:
+                submodule = chain_event_callbacks(submodule, writers)
             if isinstance(submodule, str):
                 module: AbstractThread = importlib.import_module(submodule.module)
             else:
                 module: AbstractThread = submodule.module
-            thread = module.from_args(submodule.args)
-            self.threads.append(thread)
+            threads[index] = module.from_args(submodule.args)
+        for index, capture in shared.items():
+            threads[index] = CaptureBranch(threads[capture.host], capture)
+        self.threads = [threads[index] for index in range(len(submodules))]
 
     @classmethod
     def from_args(cls, args: DesktopArgs):
@@ -42,12 +99,20 @@ class Desktop(AbstractThread, ActorMixin):
 
     def stop(self):
         for thread in self.threads:
-            thread.stop()
+            if not isinstance(thread, EventWriter):
+                thread.stop()
 
     def join(self):
         for thread in self.threads:
-            thread.join()
+            if not isinstance(thread, EventWriter):
+                thread.join()
+        # Event writers are stopped once the publishers are joined, so that they write every event
+        for thread in self.threads:
+            if isinstance(thread, EventWriter):
+                thread.stop()
+                thread.join()
 
     def close(self):
+        self.actions.close()
         for thread in self.threads:
             thread.close()
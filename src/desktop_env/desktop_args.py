@@ -21,3 +21,5 @@ class SubmoduleArgs(BaseArgs):
 
 class DesktopArgs(BaseArgs):
     submodules: list[SubmoduleArgs] = Field(default_factory=list)
+    # Merge the `Recorder`s and `WindowsCapture`s capturing the same screen source into one pipeline
+    share_capture: bool = True
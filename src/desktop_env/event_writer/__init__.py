@@ -0,0 +1,10 @@
+from .args import EventWriterArgs
+from .event_log import (
+    KEYBOARD_EVENT_TYPES,
+    MOUSE_BUTTONS,
+    MOUSE_EVENT_TYPES,
+    BinaryEventLogWriter,
+    EventLog,
+    JsonlEventLogWriter,
+)
+from .event_writer import EventWriter, EventWriterStats
@@ -0,0 +1,22 @@
+from typing import Literal, Optional
+
+from pydantic import Field
+
+from ..args import BaseArgs
+
+FsyncPolicy = Literal["never", "interval", "always"]
+EventLogFormat = Literal["jsonl", "binary"]
+
+
+class EventWriterArgs(BaseArgs):
+    path: str = Field("event.jsonl", description="The JSONL file, or the binary event log directory, to append to")
+    # jsonl: one JSON object per line, binary: fixed-size records per event type, read with `EventLog`
+    format: EventLogFormat = "jsonl"
+    # The event sources to record, e.g. control_publisher, window_publisher. If None, every publisher is recorded.
+    sources: Optional[list[str]] = None
+    queue_size: int = Field(65536, gt=0, description="Maximum number of queued events. Further events are dropped")
+    batch_size: int = Field(4096, gt=0, description="Maximum number of events serialized and written at once")
+    flush_interval: float = Field(0.1, gt=0, description="Seconds between two writes of the queued events")
+    # never: leave it to the OS, interval: fsync at most every `fsync_interval` seconds, always: after every write
+    fsync: FsyncPolicy = "interval"
+    fsync_interval: float = Field(1.0, ge=0, description="Seconds between two fsyncs with the interval policy")
@@ -0,0 +1,354 @@
+import json
+import os
+import struct
+from pathlib import Path
+from typing import Any, BinaryIO, Optional, Sequence, Union
+
+import numpy as np
+import orjson
+from loguru import logger
+from pydantic import BaseModel
+
+from ..control_publisher.msg import KeyboardEvent, MouseEvent, RawEvent, RawKeyboardEvent, RawMouseEvent
+from ..window_publisher.msg import WindowInfo
+
+FORMAT_NAME = "desktop-env-event-log"
+FORMAT_VERSION = 1
+
+# Codes of the enumerated fields. Append only, the position is the code.
+KEYBOARD_EVENT_TYPES = ("on_press", "on_release")
+MOUSE_EVENT_TYPES = ("on_move", "on_click", "on_scroll")
+MOUSE_BUTTONS = ("unknown", "left", "middle", "right", "x1", "x2")
+
+# Every record starts with the time the writer received the event and the time of the event itself, in UTC ns
+KEYBOARD_DTYPE = np.dtype(
+    [
+        ("timestamp_ns", "<i8"),
+        ("event_time", "<i8"),
+        ("source", "u1"),  # index into `EventLog.sources`
+        ("event_type", "u1"),  # index into `KEYBOARD_EVENT_TYPES`
+        ("_pad", "u2"),
+        ("vk", "<u4"),  # virtual-key code
+    ]
+)
+MOUSE_DTYPE = np.dtype(
+    [
+        ("timestamp_ns", "<i8"),
+        ("event_time", "<i8"),
+        ("source", "u1"),
+        ("event_type", "u1"),  # index into `MOUSE_EVENT_TYPES`
+        ("button", "u1"),  # index into `MOUSE_BUTTONS`, on_click only
+        ("pressed", "?"),  # on_click only
+        ("_pad", "<u4"),
+        ("x", "<i4"),
+        ("y", "<i4"),
+        ("dx", "<i4"),  # on_scroll only
+        ("dy", "<i4"),  # on_scroll only
+    ]
+)
+WINDOW_DTYPE = np.dtype(
+    [
+        ("timestamp_ns", "<i8"),
+        ("event_time", "<i8"),
+        ("source", "u1"),
+        ("_pad", "u1", 7),
+        ("hwnd", "<u8"),
+        ("rect", "<i4", 4),  # left, top, right, bottom
+        ("title_offset", "<u8"),  # the title is `strings.bin[title_offset:title_offset + title_len]`, UTF-8
+        ("title_len", "<u4"),
+        ("_pad2", "<u4"),
+    ]
+)
+DTYPES = {"keyboard": KEYBOARD_DTYPE, "mouse": MOUSE_DTYPE, "window": WINDOW_DTYPE}
+# Events of any other type are stored as length-prefixed JSON records in `other.bin`
+LENGTH_PREFIX = struct.Struct("<I")
+
+# (timestamp_ns, source, event), as queued by the `EventWriter`
+EventRecord = tuple[int, Optional[str], Any]
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (BaseModel, RawEvent)):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def encode_json_record(record: EventRecord) -> bytes:
+    timestamp_ns, source, event = record
+    return orjson.dumps({"timestamp_ns": timestamp_ns, "event_src": source, "event_data": event}, default=_default)
+
+
+class JsonlEventLogWriter:
+    """Appends events to a JSONL file, one `{"timestamp_ns", "event_src", "event_data"}` object per line."""
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = Path(path)
+        self._file: BinaryIO = open(self.path, "ab", buffering=0)
+        self._dirty = False
+
+    def write(self, records: Sequence[EventRecord]) -> tuple[int, int]:
+        """Write a batch with a single system call. Returns the number of events and bytes written."""
+        lines = []
+        for record in records:
+            try:
+                lines.append(encode_json_record(record))
+            except TypeError as e:
+                logger.error(f"Dropping an event of {record[1]} which can't be serialized: {e}")
+        if not lines:
+            return 0, 0
+        data = b"\n".join(lines) + b"\n"
+        self._file.write(data)
+        self._dirty = True
+        return len(lines), len(data)
+
+    def sync(self) -> bool:
+        """fsync the written data. Returns False if nothing was written since the last sync."""
+        if not self._dirty:
+            return False
+        os.fsync(self._file.fileno())
+        self._dirty = False
+        return True
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class BinaryEventLogWriter:
+    """Appends events to a binary, columnar event log: a directory with one file of fixed-size records per event type.
+
+    - `keyboard.bin`, `mouse.bin`, `window.bin`: records of `KEYBOARD_DTYPE`, `MOUSE_DTYPE`, `WINDOW_DTYPE`.
+    - `strings.bin`: the UTF-8 window titles referenced by `window.bin`.
+    - `other.bin`: events of any other type, as length-prefixed JSON records.
+    - `header.json`: the format version, the record dtypes and the names of the sources.
+
+    Each batch appends one block of records to each file, so the files can be memory-mapped as arrays as they are, by
+    `EventLog`. A crash loses at most the records of the batch being written, which the reader ignores. When a log is
+    reopened, the partial records are truncated away before appending, so that the new records stay aligned.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.sources: list[Optional[str]] = []
+        header_path = self.path / "header.json"
+        if header_path.exists():
+            # Append to an existing log, keeping its source codes
+            self.sources = _read_header(self.path)["sources"]
+            self._truncate_partial_records()
+        else:
+            self._write_header()
+        self._files: dict[str, BinaryIO] = {}
+        self._dirty: set[str] = set()
+        self._strings_size = (self.path / "strings.bin").stat().st_size if (self.path / "strings.bin").exists() else 0
+
+    def _truncate(self, name: str, size: int) -> None:
+        path = self.path / f"{name}.bin"
+        if path.exists() and path.stat().st_size > size:
+            logger.warning(f"Truncating {path} from {path.stat().st_size} to {size} bytes, left by a crash")
+            os.truncate(path, size)
+
+    def _truncate_partial_records(self) -> None:
+        """Cut the records a crash left partially written, so that appended records are aligned with the others."""
+        for name, dtype in DTYPES.items():
+            path = self.path / f"{name}.bin"
+            if path.exists():
+                size = path.stat().st_size
+                self._truncate(name, size - size % dtype.itemsize)
+
+        # The end of the last complete length-prefixed record
+        path = self.path / "other.bin"
+        data = path.read_bytes() if path.exists() else b""
+        end = 0
+        while end + LENGTH_PREFIX.size <= len(data):
+            (length,) = LENGTH_PREFIX.unpack_from(data, end)
+            if end + LENGTH_PREFIX.size + length > len(data):
+                break
+            end += LENGTH_PREFIX.size + length
+        self._truncate("other", end)
+
+        # Titles are written before their window records, so the titles past the last record belong to a lost batch.
+        # Window records whose title didn't reach the disk are cut as well.
+        window = _memmap(self.path / "window.bin", WINDOW_DTYPE)
+        path = self.path / "strings.bin"
+        strings_size = path.stat().st_size if path.exists() else 0
+        title_ends = window["title_offset"].astype(np.int64) + window["title_len"]
+        complete = int(np.searchsorted(np.maximum.accumulate(title_ends), strings_size, side="right"))
+        del window
+        self._truncate("window", complete * WINDOW_DTYPE.itemsize)
+        self._truncate("strings", int(title_ends[complete - 1]) if complete else 0)
+
+    def _write_header(self) -> None:
+        header = {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "sources": self.sources,
+            "dtypes": {name: dtype.descr for name, dtype in DTYPES.items()},
+        }
+        tmp_path = self.path / "header.json.tmp"
+        tmp_path.write_text(json.dumps(header))
+        os.replace(tmp_path, self.path / "header.json")
+
+    def _source_code(self, source: Optional[str]) -> int:
+        if source not in self.sources:
+            if len(self.sources) == 256:
+                raise ValueError("An event log holds at most 256 sources.")
+            self.sources.append(source)
+            self._write_header()
+        return self.sources.index(source)
+
+    def _append(self, name: str, data: bytes) -> None:
+        if name not in self._files:
+            self._files[name] = open(self.path / f"{name}.bin", "ab", buffering=0)
+        self._files[name].write(data)
+        self._dirty.add(name)
+
+    def write(self, records: Sequence[EventRecord]) -> tuple[int, int]:
+        """Write a batch as one block per file. Returns the number of events and bytes written."""
+        keyboard, mouse, window, other = [], [], [], []
+        titles = bytearray()
+        for record in records:
+            timestamp_ns, source, event = record
+            if isinstance(event, (KeyboardEvent, RawKeyboardEvent)):
+                code = self._source_code(source)
+                event_type = KEYBOARD_EVENT_TYPES.index(event.event_type)
+                keyboard.append((timestamp_ns, event.event_time, code, event_type, 0, event.event_data))
+            elif isinstance(event, (MouseEvent, RawMouseEvent)):
+                code = self._source_code(source)
+                mouse.append((timestamp_ns, event.event_time, code, *_mouse_fields(event)))
+            elif isinstance(event, WindowInfo):
+                code = self._source_code(source)
+                title = event.title.encode("utf-8")
+                offset = self._strings_size + len(titles)
+                titles += title
+                window.append(
+                    (timestamp_ns, event.timestamp_ns, code, 0, event.hWnd, event.rect, offset, len(title), 0)
+                )
+            else:
+                try:
+                    data = encode_json_record(record)
+                except TypeError as e:
+                    logger.error(f"Dropping an event of {source} which can't be serialized: {e}")
+                    continue
+                other.append(LENGTH_PREFIX.pack(len(data)) + data)
+
+        nbytes = 0
+        if titles:
+            # Before the window records, so that a record never references a title which is not written yet
+            self._append("strings", bytes(titles))
+            self._strings_size += len(titles)
+            nbytes += len(titles)
+        for name, rows in (("keyboard", keyboard), ("mouse", mouse), ("window", window)):
+            if rows:
+                data = np.array(rows, dtype=DTYPES[name]).tobytes()
+                self._append(name, data)
+                nbytes += len(data)
+        if other:
+            data = b"".join(other)
+            self._append("other", data)
+            nbytes += len(data)
+        return len(keyboard) + len(mouse) + len(window) + len(other), nbytes
+
+    def sync(self) -> bool:
+        """fsync the files written since the last sync. Returns False if there were none."""
+        if not self._dirty:
+            return False
+        for name in self._dirty:
+            os.fsync(self._files[name].fileno())
+        self._dirty.clear()
+        return True
+
+    def close(self) -> None:
+        for file in self._files.values():
+            file.close()
+        self._files.clear()
+
+
+def _mouse_fields(event: Union[MouseEvent, RawMouseEvent]) -> tuple:
+    """(event_type, button, pressed, _pad, x, y, dx, dy) of a mouse event."""
+    event_type = MOUSE_EVENT_TYPES.index(event.event_type)
+    data = event.event_data
+    if event.event_type == "on_move":
+        x, y = data
+        return event_type, 0, False, 0, round(x), round(y), 0, 0
+    elif event.event_type == "on_click":
+        x, y, button, pressed = data
+        button = MOUSE_BUTTONS.index(button) if button in MOUSE_BUTTONS else 0
+        return event_type, button, pressed, 0, round(x), round(y), 0, 0
+    x, y, dx, dy = data
+    return event_type, 0, False, 0, round(x), round(y), round(dx), round(dy)
+
+
+def _read_header(path: Path) -> dict:
+    header = json.loads((path / "header.json").read_text())
+    if header.get("format") != FORMAT_NAME or header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a {FORMAT_NAME} of version {FORMAT_VERSION}.")
+    return header
+
+
+def _memmap(path: Path, dtype: np.dtype) -> np.ndarray:
+    """Map the complete records of the file, ignoring a partial record left by a crash."""
+    count = path.stat().st_size // dtype.itemsize if path.exists() else 0
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+class EventLog:
+    """Reads an event log written with `format="binary"`. The records of each event type are memory-mapped as a NumPy
+    structured array, so opening a log costs the same whatever its size, and no record is parsed.
+
+        log = EventLog("events")
+        moves = log.mouse[log.mouse["event_type"] == MOUSE_EVENT_TYPES.index("on_move")]
+        xy = np.stack([moves["x"], moves["y"]], axis=1)
+
+    Attributes:
+        sources: Names of the sources, indexed by the `source` field of the records.
+        keyboard: Records of `KEYBOARD_DTYPE`.
+        mouse: Records of `MOUSE_DTYPE`.
+        window: Records of `WINDOW_DTYPE`. Their titles are returned by `titles()`.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = Path(path)
+        header = _read_header(self.path)
+        for name, descr in header["dtypes"].items():
+            if np.dtype([tuple(field) for field in descr]) != DTYPES[name]:
+                raise ValueError(f"The {name} records of {self.path} have an unknown layout.")
+        self.sources: list[Optional[str]] = header["sources"]
+        self.keyboard = _memmap(self.path / "keyboard.bin", KEYBOARD_DTYPE)
+        self.mouse = _memmap(self.path / "mouse.bin", MOUSE_DTYPE)
+        self.window = _memmap(self.path / "window.bin", WINDOW_DTYPE)
+
+    def source_code(self, source: str) -> int:
+        """The value of the `source` field for `source`, e.g. to select `log.mouse[log.mouse["source"] == code]`."""
+        return self.sources.index(source)
+
+    def titles(self, window: Optional[np.ndarray] = None) -> list[str]:
+        """The titles of the window records, of `self.window` if `window` is None."""
+        window = self.window if window is None else window
+        strings = _memmap(self.path / "strings.bin", np.dtype("u1"))
+        return [
+            bytes(strings[offset : offset + length]).decode("utf-8")
+            for offset, length in zip(window["title_offset"].tolist(), window["title_len"].tolist())
+        ]
+
+    def other(self) -> list[dict]:
+        """Events of other types, as `{"timestamp_ns", "event_src", "event_data"}` dicts."""
+        path = self.path / "other.bin"
+        data = path.read_bytes() if path.exists() else b""
+        events, offset = [], 0
+        while offset + LENGTH_PREFIX.size <= len(data):
+            (length,) = LENGTH_PREFIX.unpack_from(data, offset)
+            offset += LENGTH_PREFIX.size
+            if offset + length > len(data):
+                break  # partial record left by a crash
+            events.append(orjson.loads(data[offset : offset + length]))
+            offset += length
+        return events
+
+    def __len__(self) -> int:
+        return len(self.keyboard) + len(self.mouse) + len(self.window) + len(self.other())
+
+    def __repr__(self):
+        counts = ", ".join(f"{name}={len(getattr(self, name))}" for name in DTYPES)
+        return f"{self.__class__.__name__}({self.path}, {counts})"
@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional, Union
+
+from loguru import logger
+from pydantic import BaseModel
+
+from ..clock import time_ns
+from ..threading import AbstractThread
+from .args import EventLogFormat, EventWriterArgs, FsyncPolicy
+from .event_log import BinaryEventLogWriter, JsonlEventLogWriter
+
+
+class EventWriterStats(BaseModel):
+    events_written: int = 0
+    events_dropped: int = 0  # events which arrived while the queue was full, or which can't be serialized
+    bytes_written: int = 0
+    writes: int = 0  # group commits, each writing every event queued since the previous one
+    fsyncs: int = 0
+    queue_depth: int = 0  # events waiting to be written
+    elapsed_sec: float = 0.0
+
+    @property
+    def events_per_sec(self) -> float:
+        return self.events_written / self.elapsed_sec if self.elapsed_sec else 0.0
+
+    @property
+    def bytes_per_sec(self) -> float:
+        return self.bytes_written / self.elapsed_sec if self.elapsed_sec else 0.0
+
+
+class EventWriter(AbstractThread):
+    """Appends keyboard, mouse and window events to an event log from a background thread.
+
+    The publishers' callbacks only append the event to a bounded queue, which costs no system call and no
+    serialization on the input thread. Every `flush_interval` seconds, or as soon as `batch_size` events are queued,
+    the background thread serializes every queued event and writes them with a single `write` (group commit).
+
+    With `format="jsonl"`, each line is `{"timestamp_ns": ..., "event_src": ..., "event_data": {...}}`. With
+    `format="binary"`, `path` is a directory of fixed-size records per event type, which `EventLog` memory-maps as
+    NumPy structured arrays; see `BinaryEventLogWriter`.
+
+    In a `Desktop`, the callbacks of the other submodules' publishers (see `AbstractThread.event_callbacks`) are
+    chained to the writer. Outside of one, pass `writer.callback("source")` as the callback.
+    """
+
+    args_cls = EventWriterArgs
+
+    def __init__(
+        self,
+        path: str = "event.jsonl",
+        *,
+        format: EventLogFormat = "jsonl",
+        sources: Optional[list[str]] = None,
+        queue_size: int = 65536,
+        batch_size: int = 4096,
+        flush_interval: float = 0.1,
+        fsync: FsyncPolicy = "interval",
+        fsync_interval: float = 1.0,
+    ):
+        self.path = path
+        self.format = format
+        self.sources = sources
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+
+        # deque.append and popleft are atomic, so producers never take a lock
+        self._queue: deque[tuple[int, str, Any]] = deque()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._stats = EventWriterStats()  # updated by the writer thread only
+        # Producers count their drops apart, under a lock taken only when the queue is full
+        self._full_drops = 0
+        self._full_drops_lock = threading.Lock()
+        self._started_at: Optional[float] = None
+        self._last_fsync = 0.0
+        self._dirty = False  # written since the last fsync
+        self._log: Optional[Union[JsonlEventLogWriter, BinaryEventLogWriter]] = None
+        self._loop_thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_args(cls, args: EventWriterArgs):
+        return cls(
+            args.path,
+            format=args.format,
+            sources=args.sources,
+            queue_size=args.queue_size,
+            batch_size=args.batch_size,
+            flush_interval=args.flush_interval,
+            fsync=args.fsync,
+            fsync_interval=args.fsync_interval,
+        )
+
+    @property
+    def stats(self) -> EventWriterStats:
+        elapsed = time.monotonic() - self._started_at if self._started_at is not None else 0.0
+        return self._stats.model_copy(
+            update={
+                "events_dropped": self._stats.events_dropped + self._full_drops,
+                "queue_depth": len(self._queue),
+                "elapsed_sec": elapsed,
+            }
+        )
+
+    def records(self, source: str) -> bool:
+        return self.sources is None or source in self.sources
+
+    def put(self, event: Any, source: Optional[str] = None) -> bool:
+        """Queue an event. Returns False if it was dropped because the queue is full. Safe to call from any thread."""
+        if len(self._queue) >= self.queue_size:
+            with self._full_drops_lock:
+                self._full_drops += 1
+            return False
+        self._queue.append((time_ns(), source, event))
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def callback(self, source: str) -> Callable[[Any], None]:
+        """A callback for a publisher, which queues its events with `event_src=source`."""
+
+        def put(event: Any) -> None:
+            self.put(event, source)
+
+        return put
+
+    def _write_batch(self) -> int:
+        """Serialize and write up to `batch_size` queued events. Returns the number of events written."""
+        records = [self._queue.popleft() for _ in range(min(len(self._queue), self.batch_size))]
+        if not records:
+            return 0
+        written, nbytes = self._log.write(records)
+        self._stats.events_dropped += len(records) - written  # events which can't be serialized
+        self._stats.events_written += written
+        self._stats.bytes_written += nbytes
+        self._stats.writes += written > 0
+        return len(records)
+
+    def _write_queued(self) -> None:
+        while (written := self._write_batch()) > 0:
+            self._dirty = True
+            if written < self.batch_size:
+                break
+
+    def _sync(self, force: bool = False) -> None:
+        if self.fsync == "never" or not self._dirty:
+            return
+        now = time.monotonic()
+        if force or self.fsync == "always" or now - self._last_fsync >= self.fsync_interval:
+            self._stats.fsyncs += self._log.sync()
+            self._last_fsync = now
+            self._dirty = False
+
+    def start(self):
+        """Write queued events until stopped. This function will block the current thread."""
+        self._log = BinaryEventLogWriter(self.path) if self.format == "binary" else JsonlEventLogWriter(self.path)
+        self._started_at = self._last_fsync = time.monotonic()
+        try:
+            while not self._stop_event.is_set():
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                self._write_queued()
+                self._sync()
+            # Drain the events queued before the stop
+            self._write_queued()
+            self._sync(force=True)
+        finally:
+            self._log.close()
+
+    def start_free_threaded(self):
+        self._loop_thread = threading.Thread(target=self.start, daemon=True)
+        self._loop_thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wakeup.set()
+
+    def join(self):
+        if self._loop_thread is not None:
+            self._loop_thread.join()
+
+    def close(self):
+        stats = self.stats
+        logger.info(
+            f"Event writer wrote {stats.events_written} events ({stats.bytes_written} bytes) to {self.path}, "
+            f"dropped {stats.events_dropped}"
+        )
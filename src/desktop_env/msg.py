@@ -1,2 +1,2 @@
 from .window_publisher.msg import WindowInfo
-from .windows_capture.msg import FrameStamped
+from .windows_capture.msg import CapsInfo, CompressedFrameStamped, Frame, FrameHandle, FrameStamped
@@ -1,2 +1,3 @@
 from .args import RecorderArgs
+from .msg import SegmentInfo
 from .recorder import Recorder
@@ -1,6 +1,12 @@
-from typing import Optional
+from typing import Callable, Optional
+
+from pydantic import Field, ImportString
 
 from ..args import BaseArgs
+from ..windows_capture.args import DispatchArgs, FrameSubscriberArgs
+from ..windows_capture.gst_pipeline import CaptureBackend
+from ..windows_capture.msg import Frame
+from .msg import SegmentInfo
 
 
 class RecorderArgs(BaseArgs):
@@ -13,3 +19,18 @@ class RecorderArgs(BaseArgs):
 
     window_name: Optional[str] = None
     monitor_idx: Optional[int] = None
+    backend: CaptureBackend = "auto"
+    framerate: str = Field("60/1", description="The framerate of the recorded video")
+
+    # Callback function for frames of the `appsink` branch (enable_appsink=True). If None, frames are pulled.
+    on_frame_arrived: Optional[ImportString[Callable[[Frame], None]]] = None
+    dispatch: DispatchArgs = Field(default_factory=DispatchArgs)  # How `on_frame_arrived` is called
+    # Live consumers of the recorded video, each with its own branch of the tee, so the screen is captured once
+    subscribers: list[FrameSubscriberArgs] = Field(default_factory=list)
+    metrics: bool = Field(True, description="Collect latency histograms and frame counters of every appsink")
+    # Segmented recording: the file is split into `<filesink_location stem>_00000.mkv`, `_00001.mkv`, ...
+    segment_duration: Optional[float] = Field(None, gt=0, description="Seconds of recording per segment")
+    segment_max_bytes: Optional[int] = Field(None, gt=0, description="Maximum size of a segment, in bytes")
+    # Called from the GLib main loop of the recorder with every finalized segment. Hand heavy work to another thread.
+    on_segment_closed: Optional[ImportString[Callable[[SegmentInfo], None]]] = None
+    eos_timeout: float = Field(10.0, description="Seconds to wait for the file to be finalized when stopping")
@@ -1,6 +1,16 @@
-from typing import Optional
+import os
+from typing import TYPE_CHECKING, Optional, Sequence
 
-from ..utils import get_window_by_title
+from ..windows_capture.gst_pipeline import CaptureBackend, capture_source, resolve_backend, subscriber_branch
+
+if TYPE_CHECKING:
+    from ..windows_capture.args import FrameSubscriberArgs
+
+
+def segment_location(filesink_location: str) -> str:
+    """The `splitmuxsink` location pattern of a segmented recording, e.g. `out.mkv` -> `out_%05d.mkv`."""
+    root, ext = os.path.splitext(filesink_location)
+    return f"{root}_%05d{ext or '.mkv'}"
 
 
 def construct_pipeline(
@@ -13,6 +23,11 @@ def construct_pipeline(
     enable_fpsdisplaysink: bool = True,
     window_name: Optional[str] = None,
     monitor_idx: Optional[int] = None,
+    backend: CaptureBackend = "auto",
+    framerate: str = "60/1",
+    segment_duration: Optional[float] = None,
+    segment_max_bytes: Optional[int] = None,
+    subscribers: Sequence["FrameSubscriberArgs"] = (),
 ) -> str:
     """Construct a GStreamer pipeline for screen capturing.
     Args:
@@ -24,42 +39,70 @@ def construct_pipeline(
         enable_fpsdisplaysink: Whether to enable fpsdisplaysink.
         window_name: The name of the window to capture. If None, the entire screen will be captured.
         monitor_idx: The index of the monitor to capture. If None, the primary monitor will be captured.
+        backend: The capture source. On Linux (ximagesrc, pipewire), video is encoded with x264enc and the audio of
+            the default output is recorded from its PulseAudio/PipeWire monitor.
+        framerate: The framerate of the recorded video.
+        segment_duration: If given, the recording is split into segments of about this many seconds, named
+            `segment_location(filesink_location)`. Segments are cut on keyframes.
+        segment_max_bytes: If given, the recording is split into segments of at most about this many bytes.
+        subscribers: Subscribers which get their own branch of the video tee, named `t`.
     """
-    assert enable_appsink or enable_fpsdisplaysink, "At least one of appsink and fpsdisplaysink must be enabled."
+    assert enable_appsink or enable_fpsdisplaysink or subscribers, (
+        "At least one of appsink, fpsdisplaysink and subscribers must be enabled."
+    )
+    backend = resolve_backend(backend)
+    if backend == "d3d11":
+        audio_src = "wasapi2src do-timestamp=true loopback=true low-latency=true ! audioconvert ! mfaacenc"
+        video_encoder = "d3d11convert ! mfh264enc"
+        download = "d3d11download ! "
+    elif backend in ("ximagesrc", "pipewire"):
+        audio_src = "pulsesrc device=@DEFAULT_MONITOR@ do-timestamp=true ! audioconvert ! audioresample ! opusenc"
+        video_encoder = "videoconvert ! x264enc tune=zerolatency speed-preset=ultrafast"
+        download = ""
+    else:
+        raise NotImplementedError(f"Recording with {backend} is not supported yet.")
 
     pipeline_description = []
-    pipeline_description += [f"matroskamux name=mux ! filesink location={filesink_location}"]
-
-    if record_audio:
+    if segment_duration is None and segment_max_bytes is None:
+        pipeline_description += [f"matroskamux name=mux ! filesink location={filesink_location}"]
+        audio_pad = video_pad = subtitle_pad = "mux."
+    else:
+        # Every segment is a complete matroska file, so a crash only loses the segment being written
+        max_size_time = int(segment_duration * 1e9) if segment_duration is not None else 0
+        max_size_bytes = segment_max_bytes or 0
+        # Ask the encoder for a keyframe at the cut, instead of waiting for the next one. Only works for time splits.
+        keyframe_requests = "true" if max_size_bytes == 0 else "false"
         pipeline_description += [
-            "wasapi2src do-timestamp=true loopback=true low-latency=true ! audioconvert ! mfaacenc ! queue ! mux."
+            f"splitmuxsink name=mux muxer-factory=matroskamux location={segment_location(filesink_location)} "
+            f"max-size-time={max_size_time} max-size-bytes={max_size_bytes} "
+            f"send-keyframe-requests={keyframe_requests}"
         ]
-    if record_video:
-        src_parameter = ""
-        if window_name is not None:
-            src_parameter += f" window-handle={get_window_by_title(window_name).hWnd}"
-        if monitor_idx is not None:
-            src_parameter += f" monitor-index={monitor_idx}"
+        # The request pads of splitmuxsink accept any caps, so they are picked by name
+        audio_pad, video_pad, subtitle_pad = "mux.audio_0", "mux.video", "mux.subtitle_0"
 
+    if record_audio:
+        pipeline_description += [f"{audio_src} ! queue ! {audio_pad}"]
+    if record_video:
+        source = capture_source(backend=backend, window_name=window_name, monitor_idx=monitor_idx, framerate=framerate)
         pipeline_description += [
-            f"d3d11screencapturesrc show-cursor=true {src_parameter} do-timestamp=true ! "
-            "videorate drop-only=true ! video/x-raw(memory:D3D11Memory),framerate=0/1,max-framerate=60/1 ! "
-            "tee name=t "
-            "t. ! queue ! d3d11convert ! mfh264enc ! h264parse ! queue ! mux."
+            f"{source} ! tee name=t t. ! queue ! {video_encoder} ! h264parse ! queue ! {video_pad}"
         ]
     if record_timestamp:
-        pipeline_description += ["utctimestampsrc interval=1 ! subparse ! queue ! mux."]
+        pipeline_description += [f"utctimestampsrc interval=1 ! subparse ! queue ! {subtitle_pad}"]
 
     if enable_appsink:
         pipeline_description += [
-            "t. ! queue leaky=downstream ! d3d11download ! videoconvert ! video/x-raw,format=BGRA ! "
-            "appsink name=appsink sync=true max-buffers=1 drop=true emit-signals=true"
+            f"t. ! queue leaky=downstream ! {download}videoconvert ! video/x-raw,format=BGRA ! "
+            "appsink name=appsink sync=true max-buffers=1 drop=true"
         ]
     if enable_fpsdisplaysink:
         pipeline_description += [
-            "t. ! queue leaky=downstream ! d3d11download ! videoconvert ! video/x-raw,format=BGRA ! "
+            f"t. ! queue leaky=downstream ! {download}videoconvert ! video/x-raw,format=BGRA ! "
             "fpsdisplaysink video-sink=fakesink"
         ]
 
+    if record_video:
+        pipeline_description += [subscriber_branch(subscriber, backend=backend) for subscriber in subscribers]
+
     pipeline_str = " ".join(pipeline_description)
     return pipeline_str
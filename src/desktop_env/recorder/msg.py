@@ -0,0 +1,12 @@
+from pydantic import BaseModel, Field
+
+from ..clock import time_ns
+
+
+class SegmentInfo(BaseModel):
+    """A finalized segment of a segmented recording. The file is complete and can be uploaded or indexed."""
+
+    location: str
+    index: int  # position of the segment in the recording, from 0
+    running_time_ns: int  # pipeline running time at which the segment was closed
+    timestamp_ns: int = Field(default_factory=time_ns)  # UTC nanoseconds from the shared `desktop_env.clock`
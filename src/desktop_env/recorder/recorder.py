@@ -1,34 +1,193 @@
+import gi
+
+gi.require_version("Gst", "1.0")
+import importlib.util
+import json
 import os
-import subprocess
+import sys
 import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from gi.repository import GLib, Gst
+from loguru import logger
 
 from ..threading import AbstractThread
+from ..windows_capture.appsink_reader import AppsinkReader
+from ..windows_capture.args import FrameSubscriberArgs
+from ..windows_capture.gst_pipeline import subscriber_branch
+from ..windows_capture.metrics import CaptureMetricsSnapshot, to_prometheus
 from .args import RecorderArgs
 from .gst_pipeline import construct_pipeline
+from .msg import SegmentInfo
+
+Gst.init(None)
+
+# Python plugins of this repository, e.g. `utctimestampsrc`
+CUSTOM_PLUGIN_DIR = Path(os.getcwd()) / "custom_plugin" / "python"
+
+
+def register_custom_plugins(plugin_dir: Path = CUSTOM_PLUGIN_DIR) -> None:
+    """Register the Python elements found in `plugin_dir` to this process' registry.
+
+    This replaces `GST_PLUGIN_PATH`, which only works if it is set before GStreamer is initialized and the gst-python
+    loader is installed. Elements which are already registered are skipped.
+    """
+    for path in sorted(plugin_dir.glob("*.py")):
+        module_name = f"desktop_env_custom_plugin.{path.stem}"
+        if module_name in sys.modules:
+            continue  # registered by a previous recorder; its GObject type can't be defined twice
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules[module_name] = module
+        factory = getattr(module, "__gstelementfactory__", None)
+        if factory is None or Gst.ElementFactory.find(factory[0]) is not None:
+            continue
+        name, rank, element_cls = factory
+        if not Gst.Element.register(None, name, rank, element_cls):
+            logger.warning(f"Failed to register the custom element {name} from {path}")
 
 
 class Recorder(AbstractThread):
+    """Records the screen, audio and timestamps into a matroska file, in-process on its own GLib main loop.
+
+    The video is split by a `tee` named `t` (`self.tee`), so the same capture can also be consumed live:
+    - `enable_appsink=True`: frames of the `appsink` branch are delivered to `on_frame_arrived`, or pulled from
+      `self.reader`.
+    - `subscribers`: each subscriber gets its own branch, available as `self.subscribers[name]`. Subscribers can also
+      be added while recording, with `add_subscriber`.
+
+    `stop()` sends EOS and waits up to `eos_timeout` seconds for the muxer to finalize the file.
+
+    With `segment_duration` or `segment_max_bytes`, the recording is split into complete files, cut on keyframes.
+    Every finalized segment is appended to `self.segments` and passed to `on_segment_closed`.
+    """
+
     args_cls = RecorderArgs
 
     def __init__(self, args: RecorderArgs):
-        pipeline_description = construct_pipeline(**args.model_dump())
-        self._pipeline = f"gst-launch-1.0 -e -v {pipeline_description}"
-        self._process = None
-        self._loop_thread = None  # Initialize loop thread
+        register_custom_plugins()
+        self.args = args
+        pipeline_description = construct_pipeline(
+            args.filesink_location,
+            record_audio=args.record_audio,
+            record_video=args.record_video,
+            record_timestamp=args.record_timestamp,
+            enable_appsink=args.enable_appsink,
+            enable_fpsdisplaysink=args.enable_fpsdisplaysink,
+            window_name=args.window_name,
+            monitor_idx=args.monitor_idx,
+            backend=args.backend,
+            framerate=args.framerate,
+            segment_duration=args.segment_duration,
+            segment_max_bytes=args.segment_max_bytes,
+            subscribers=args.subscribers,
+        )
+        self.pipeline: Gst.Pipeline = Gst.parse_launch(pipeline_description)
+        # The tee of the captured video, None if video is not recorded
+        self.tee: Optional[Gst.Element] = self.pipeline.get_by_name("t")
+
+        self.reader: Optional[AppsinkReader] = None
+        if args.enable_appsink:
+            self.reader = AppsinkReader(
+                self.pipeline,
+                self.pipeline.get_by_name("appsink"),
+                args.on_frame_arrived,
+                dispatch=args.dispatch,
+                metrics=args.metrics,
+            )
+        self.subscribers: dict[str, AppsinkReader] = {}
+        for subscriber in args.subscribers:
+            self.subscribers[subscriber.name] = self._subscriber_reader(subscriber)
+
+        self.segments: list[SegmentInfo] = []
+
+        self.loop = GLib.MainLoop()
+        self._eos = threading.Event()
+        bus = self.pipeline.get_bus()
+        bus.add_signal_watch()
+        bus.connect("message", self._on_bus_message)
+        self._loop_thread = None
 
     @classmethod
     def from_args(cls, args: RecorderArgs):
         return cls(args)
 
+    def _subscriber_reader(self, subscriber: FrameSubscriberArgs) -> AppsinkReader:
+        return AppsinkReader(
+            self.pipeline,
+            self.pipeline.get_by_name(subscriber.name),
+            subscriber.on_frame_arrived,
+            frame_pool=subscriber.frame_pool,
+            dispatch=subscriber.dispatch,
+            change_detection=subscriber.change_detection,
+            metrics=self.args.metrics if subscriber.metrics is None else subscriber.metrics,
+        )
+
+    def add_subscriber(self, subscriber: FrameSubscriberArgs) -> AppsinkReader:
+        """Attach a new branch to the tee, before or while recording, and return the reader of its appsink."""
+        if self.tee is None:
+            raise RuntimeError("The recorder has no video tee; enable `record_video` to attach subscribers.")
+        if subscriber.name in self.subscribers or self.pipeline.get_by_name(subscriber.name) is not None:
+            raise ValueError(f"An element named `{subscriber.name}` already exists in the pipeline.")
+        # The branch starts with "t. ! ", which links to the tee by name; in a separate bin it is linked by hand
+        description = subscriber_branch(subscriber, backend=self.args.backend).removeprefix("t. ! ")
+        branch = Gst.parse_bin_from_description(description, True)
+        self.pipeline.add(branch)
+        self.tee.link(branch)
+        reader = self._subscriber_reader(subscriber)
+        branch.sync_state_with_parent()
+        self.subscribers[subscriber.name] = reader
+        return reader
+
+    def _on_bus_message(self, bus: Gst.Bus, message: Gst.Message) -> None:
+        if message.type == Gst.MessageType.EOS:
+            self._eos.set()
+        elif message.type == Gst.MessageType.ERROR:
+            err, debug = message.parse_error()
+            logger.error(f"Recorder pipeline error from {message.src.get_name()}: {err}, {debug}")
+            self._eos.set()  # the file won't be finalized any further, don't wait for EOS
+        elif message.type == Gst.MessageType.WARNING:
+            warning, debug = message.parse_warning()
+            logger.warning(f"Recorder pipeline warning from {message.src.get_name()}: {warning}, {debug}")
+        elif message.type == Gst.MessageType.ELEMENT:
+            structure = message.get_structure()
+            if structure is not None and structure.get_name() == "splitmuxsink-fragment-closed":
+                self._on_segment_closed(structure.get_string("location"), structure.get_value("running-time"))
+
+    def _on_segment_closed(self, location: str, running_time_ns: int) -> None:
+        segment = SegmentInfo(location=location, index=len(self.segments), running_time_ns=running_time_ns)
+        self.segments.append(segment)
+        logger.info(f"Recording segment {segment.index} closed: {location}")
+        if self.args.on_segment_closed is not None:
+            try:
+                self.args.on_segment_closed(segment)
+            except Exception:
+                logger.exception(f"on_segment_closed failed for {location}")
+
+    def metrics_snapshot(self) -> dict[str, CaptureMetricsSnapshot]:
+        """Snapshot of the metrics of every appsink, keyed by appsink name. Empty if metrics are disabled."""
+        readers = {"appsink": self.reader, **self.subscribers} if self.reader is not None else self.subscribers
+        snapshots = {name: reader.metrics_snapshot() for name, reader in readers.items()}
+        return {name: snapshot for name, snapshot in snapshots.items() if snapshot is not None}
+
+    def metrics_json(self) -> str:
+        return json.dumps({name: snapshot.model_dump() for name, snapshot in self.metrics_snapshot().items()})
+
+    def metrics_prometheus(self) -> str:
+        return to_prometheus(self.metrics_snapshot())
+
     def start(self):
         """Start the pipeline. This function will block the current thread."""
-        # Prepare the environment variable
-        env = os.environ.copy()
-        # Set GST_PLUGIN_PATH to the 'custom_plugin' directory in the current working directory
-        env["GST_PLUGIN_PATH"] = os.path.join(os.getcwd(), "custom_plugin")
-        # Start the process with the modified environment
-        self._process = subprocess.Popen(self._pipeline, shell=True, env=env)
-        self._process.wait()
+        ret = self.pipeline.set_state(Gst.State.PLAYING)
+        if ret == Gst.StateChangeReturn.FAILURE:
+            msg = self.pipeline.get_bus().timed_pop_filtered(Gst.CLOCK_TIME_NONE, Gst.MessageType.ERROR)
+            err, debug = msg.parse_error()
+            logger.error(f"Failed to set the recorder pipeline to PLAYING state: {err}, {debug}")
+            return
+        self.loop.run()
 
     def start_free_threaded(self):
         """Start the pipeline in a separate thread. This function will not block the current thread."""
@@ -36,23 +195,38 @@ class Recorder(AbstractThread):
         self._loop_thread.start()
 
     def stop(self):
-        """Stop the pipeline by terminating the process."""
-        if self._process and self._process.poll() is None:
-            try:
-                self._process.terminate()
-            except Exception:
-                pass  # The process might have already terminated
-        self._process = None
+        """Send EOS so that the muxer finalizes the file, wait up to `eos_timeout` seconds, then stop the pipeline."""
+        _, state, _ = self.pipeline.get_state(0)
+        if state == Gst.State.PLAYING and not self._eos.is_set():
+            self.pipeline.send_event(Gst.Event.new_eos())
+            if self.loop.is_running():
+                finalized = self._eos.wait(self.args.eos_timeout)
+            else:
+                # Nobody dispatches bus messages, so dispatch them here until EOS, including the last closed segment
+                bus = self.pipeline.get_bus()
+                deadline = time.monotonic() + self.args.eos_timeout
+                while not self._eos.is_set() and (remaining := deadline - time.monotonic()) > 0:
+                    message = bus.timed_pop(int(remaining * Gst.SECOND))
+                    if message is not None:
+                        self._on_bus_message(bus, message)
+                finalized = self._eos.is_set()
+            if not finalized:
+                logger.warning(
+                    f"EOS not received within {self.args.eos_timeout}s, {self.args.filesink_location} may not be "
+                    "finalized."
+                )
+        self.pipeline.set_state(Gst.State.NULL)
+        self.loop.quit()
 
     def join(self):
-        """Wait for the pipeline process and thread to finish."""
-        if self._process:
-            self._process.wait()
-        if self._loop_thread:
+        """Wait for the main loop thread to finish."""
+        if self._loop_thread is not None:
             self._loop_thread.join()
         self._loop_thread = None
 
     def close(self):
-        """Stop and clean up the pipeline."""
-        self.stop()
-        self.join()
+        """Release the readers and the bus watch."""
+        for reader in (self.reader, *self.subscribers.values()):
+            if reader is not None:
+                reader.close()
+        self.pipeline.get_bus().remove_signal_watch()
@@ -0,0 +1,2 @@
+from .args import ReplayArgs
+from .replayer import ControllerInjector, Replayer, ReplayStats, iter_recorded_events
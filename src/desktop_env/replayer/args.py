@@ -0,0 +1,18 @@
+from typing import Optional
+
+from pydantic import Field
+
+from ..args import BaseArgs
+
+
+class ReplayArgs(BaseArgs):
+    path: str = Field("event.jsonl", description="The JSONL file, or the binary event log directory, to replay")
+    # The event sources to replay, e.g. control_publisher. If None, every keyboard and mouse event is replayed.
+    sources: Optional[list[str]] = None
+    speed: float = Field(1.0, gt=0, description="Replay speed multiplier, e.g. 2.0 replays twice as fast")
+    # Time window to replay, in seconds from the first event of the log
+    start: Optional[float] = Field(None, ge=0, description="Skip the events before this time")
+    end: Optional[float] = Field(None, ge=0, description="Stop at the events after this time")
+    # Gaps between events longer than this, in recorded seconds, are shortened to it. None keeps every gap
+    skip_idle: Optional[float] = Field(None, ge=0, description="Longest idle gap to replay")
+    spin: float = Field(0.002, ge=0, description="Seconds spun in a busy loop before each event, after sleeping")
@@ -0,0 +1,253 @@
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Union
+
+import numpy as np
+import orjson
+from loguru import logger
+from pydantic import BaseModel
+
+from ..clock import sleep_until
+from ..control_publisher.msg import RawEvent, RawKeyboardEvent, RawMouseEvent
+from ..event_writer.event_log import KEYBOARD_EVENT_TYPES, MOUSE_BUTTONS, MOUSE_EVENT_TYPES, EventLog
+from ..threading import AbstractThread
+from .args import ReplayArgs
+
+# Injections later than this after their scheduled time are counted as late
+LATE_THRESHOLD_NS = 1_000_000
+
+
+def _iter_jsonl(path: Path, sources: Optional[list[str]]) -> Iterator[RawEvent]:
+    skipped = 0
+    with open(path, "rb") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            record = orjson.loads(line)
+            if sources is not None and record.get("event_src") not in sources:
+                continue
+            data = record.get("event_data")
+            # Logs written before `EventWriter` store the event as a JSON string
+            if isinstance(data, (str, bytes)):
+                try:
+                    data = orjson.loads(data)
+                except orjson.JSONDecodeError:
+                    data = None
+            if not isinstance(data, dict):
+                skipped += 1
+                continue
+            if data.get("device_name") == "keyboard":
+                yield RawKeyboardEvent(data["event_type"], data["event_data"], data["event_time"])
+            elif data.get("device_name") == "mouse":
+                yield RawMouseEvent(data["event_type"], tuple(data["event_data"]), data["event_time"])
+    if skipped:
+        logger.warning(f"Skipped {skipped} records of {path} whose event_data is not an event")
+
+
+def _iter_binary(path: Path, sources: Optional[list[str]]) -> Iterator[RawEvent]:
+    log = EventLog(path)
+    keyboard, mouse = log.keyboard, log.mouse
+    if sources is not None:
+        codes = [code for code, source in enumerate(log.sources) if source in sources]
+        keyboard = keyboard[np.isin(keyboard["source"], codes)]
+        mouse = mouse[np.isin(mouse["source"], codes)]
+    # Merge both event types in time order
+    order = np.argsort(np.concatenate([keyboard["event_time"], mouse["event_time"]]), kind="stable")
+    for index in order.tolist():
+        if index < len(keyboard):
+            record = keyboard[index]
+            event_type = KEYBOARD_EVENT_TYPES[record["event_type"]]
+            yield RawKeyboardEvent(event_type, int(record["vk"]), int(record["event_time"]))
+            continue
+        record = mouse[index - len(keyboard)]
+        event_type = MOUSE_EVENT_TYPES[record["event_type"]]
+        x, y = int(record["x"]), int(record["y"])
+        if event_type == "on_move":
+            event_data = (x, y)
+        elif event_type == "on_click":
+            event_data = (x, y, MOUSE_BUTTONS[record["button"]], bool(record["pressed"]))
+        else:
+            event_data = (x, y, int(record["dx"]), int(record["dy"]))
+        yield RawMouseEvent(event_type, event_data, int(record["event_time"]))
+
+
+def iter_recorded_events(
+    path: Union[str, Path], sources: Optional[list[str]] = None
+) -> Iterator[Union[RawKeyboardEvent, RawMouseEvent]]:
+    """Stream the keyboard and mouse events of an `EventWriter` log, a JSONL file or a binary log directory.
+
+    Events of other devices, e.g. windows, are left out. Events are yielded in the order of the log, which is the
+    order of `event_time` for binary logs.
+    """
+    path = Path(path)
+    return _iter_binary(path, sources) if path.is_dir() else _iter_jsonl(path, sources)
+
+
+class ReplayStats(BaseModel):
+    injected: int = 0
+    failed: int = 0  # injections which raised
+    skipped: int = 0  # events before the time window
+    late: int = 0  # events injected more than 1 ms after their scheduled time
+    mean_error_us: float = 0.0  # mean of the absolute timing errors
+    p99_error_us: float = 0.0
+    max_error_us: float = 0.0
+    elapsed_sec: float = 0.0
+
+
+class ControllerInjector:
+    """Injects events with the pynput controllers of `ActorMixin`; with XTest on X servers, e.g. Xvfb."""
+
+    def __init__(self):
+        from ..actor import KeyboardController, MouseController
+
+        self.mouse = MouseController()
+        self.keyboard = KeyboardController()
+
+    def __call__(self, event: RawEvent) -> None:
+        if event.device_name == "keyboard":
+            if event.event_type == "on_press":
+                self.keyboard.press(event.event_data)
+            else:
+                self.keyboard.release(event.event_data)
+        elif event.event_type == "on_move":
+            self.mouse.move(*event.event_data)
+        elif event.event_type == "on_click":
+            self.mouse.click(*event.event_data)
+        else:
+            x, y, dx, dy = event.event_data
+            self.mouse.move(x, y)
+            self.mouse.scroll(dx, dy)
+
+
+class Replayer(AbstractThread):
+    """Replays a recorded event log with the timing of the recording.
+
+    Each event is scheduled against a monotonic clock, relative to the first replayed event. The replayer sleeps
+    until `spin` seconds before the event, then spins for the rest, which keeps the injection jitter well under a
+    millisecond where the OS sleep is coarser. The timing error of every event, injection time minus scheduled time,
+    is kept in `timing_errors_ns` and summarized by `stats`.
+
+    Args:
+        path: The JSONL file, or the binary event log directory, to replay.
+        sources: The event sources to replay. If None, every keyboard and mouse event is replayed.
+        speed: Replay speed multiplier.
+        start: Seconds from the first event of the log at which the replay starts.
+        end: Seconds from the first event of the log at which the replay ends.
+        skip_idle: Gaps between events longer than this many recorded seconds are shortened to it.
+        spin: Seconds spun in a busy loop before each event.
+        inject: Called with every event. Defaults to a `ControllerInjector`.
+    """
+
+    args_cls = ReplayArgs
+
+    def __init__(
+        self,
+        path: str = "event.jsonl",
+        *,
+        sources: Optional[list[str]] = None,
+        speed: float = 1.0,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        skip_idle: Optional[float] = None,
+        spin: float = 0.002,
+        inject: Optional[Callable[[RawEvent], None]] = None,
+    ):
+        self.path = path
+        self.sources = sources
+        self.speed = speed
+        self.start_ns = None if start is None else int(start * 1e9)
+        self.end_ns = None if end is None else int(end * 1e9)
+        self.skip_idle_ns = None if skip_idle is None else int(skip_idle * 1e9)
+        self.spin_ns = int(spin * 1e9)
+        self.inject = inject if inject is not None else ControllerInjector()
+
+        self.timing_errors_ns = array("q")
+        self._stats = ReplayStats()
+        self._started_at: Optional[int] = None
+        self._finished_at: Optional[int] = None
+        self._stop_event = threading.Event()
+        self._loop_thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_args(cls, args: ReplayArgs):
+        return cls(
+            args.path,
+            sources=args.sources,
+            speed=args.speed,
+            start=args.start,
+            end=args.end,
+            skip_idle=args.skip_idle,
+            spin=args.spin,
+        )
+
+    @property
+    def stats(self) -> ReplayStats:
+        stats = self._stats.model_copy()
+        if self._started_at is not None:
+            stats.elapsed_sec = ((self._finished_at or time.perf_counter_ns()) - self._started_at) / 1e9
+        errors = np.abs(np.frombuffer(self.timing_errors_ns, dtype=np.int64)) / 1e3
+        if len(errors):
+            stats.mean_error_us = float(errors.mean())
+            stats.p99_error_us = float(np.percentile(errors, 99))
+            stats.max_error_us = float(errors.max())
+        return stats
+
+    def start(self):
+        """Replay the log until its end or until stopped. This function will block the current thread."""
+        first_time = None  # event_time of the first event of the log
+        base = None  # recorded offset of the first replayed event
+        previous = 0  # recorded offset of the previous replayed event
+        idle_ns = 0  # recorded time removed by skip_idle so far
+        for event in iter_recorded_events(self.path, self.sources):
+            if self._stop_event.is_set():
+                break
+            if first_time is None:
+                first_time = event.event_time
+            offset = event.event_time - first_time
+            if self.start_ns is not None and offset < self.start_ns:
+                self._stats.skipped += 1
+                continue
+            if self.end_ns is not None and offset > self.end_ns:
+                break
+            if base is None:
+                base = previous = offset
+                self._started_at = time.perf_counter_ns()
+            if self.skip_idle_ns is not None and offset - previous > self.skip_idle_ns:
+                idle_ns += offset - previous - self.skip_idle_ns
+            previous = offset
+
+            target_ns = self._started_at + int((offset - base - idle_ns) / self.speed)
+            sleep_until(target_ns, spin_ns=self.spin_ns, interrupt=self._stop_event)
+            if self._stop_event.is_set():
+                break
+            self.timing_errors_ns.append(time.perf_counter_ns() - target_ns)
+            if self.timing_errors_ns[-1] > LATE_THRESHOLD_NS:
+                self._stats.late += 1
+            try:
+                self.inject(event)
+                self._stats.injected += 1
+            except Exception as e:
+                self._stats.failed += 1
+                logger.warning(f"Failed to replay {event!r}: {e}")
+        self._finished_at = time.perf_counter_ns()
+
+    def start_free_threaded(self):
+        self._loop_thread = threading.Thread(target=self.start, daemon=True)
+        self._loop_thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def join(self):
+        if self._loop_thread is not None:
+            self._loop_thread.join()
+
+    def close(self):
+        stats = self.stats
+        logger.info(
+            f"Replayed {stats.injected} events of {self.path} in {stats.elapsed_sec:.1f}s ({stats.failed} failed, "
+            f"{stats.late} late), timing error mean {stats.mean_error_us:.0f}us, p99 {stats.p99_error_us:.0f}us, "
+            f"max {stats.max_error_us:.0f}us"
+        )
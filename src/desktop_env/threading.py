@@ -9,6 +9,9 @@ class AbstractThread:
     """
 
     args_cls = BaseArgs
+    # Callback fields of `args_cls` through which events are published, and the name of their source. In a `Desktop`,
+    # these callbacks are chained to the `EventWriter`s.
+    event_callbacks: dict[str, str] = {}
 
     def __init__(self):
         super().__init__()
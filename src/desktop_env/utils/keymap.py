@@ -0,0 +1,155 @@
+"""Translation between pynput keys, virtual key codes and characters, with tables built once at import.
+
+A virtual key code (vk) identifies a physical key, in the namespace of the platform: Windows virtual-key codes, macOS
+key codes, or X keysyms elsewhere. A character is typed by a key, with or without shift. Characters follow the US
+layout.
+"""
+
+import platform
+import string
+from typing import Optional, Union
+
+from pynput.keyboard import Key, KeyCode
+
+SYSTEM = platform.system()
+
+# The character typed with shift, for every key which types a character
+_SHIFTED = {
+    **{char: char.upper() for char in string.ascii_lowercase},
+    "`": "~",
+    "1": "!",
+    "2": "@",
+    "3": "#",
+    "4": "$",
+    "5": "%",
+    "6": "^",
+    "7": "&",
+    "8": "*",
+    "9": "(",
+    "0": ")",
+    "-": "_",
+    "=": "+",
+    "[": "{",
+    "]": "}",
+    "\\": "|",
+    ";": ":",
+    "'": '"',
+    ",": "<",
+    ".": ">",
+    "/": "?",
+}
+
+if SYSTEM == "Windows":
+    _CHAR_VKS = {
+        **{char: ord(char.upper()) for char in string.ascii_lowercase + string.digits},
+        **dict(zip("`-=[]\\;',./", (0xC0, 0xBD, 0xBB, 0xDB, 0xDD, 0xDC, 0xBA, 0xDE, 0xBC, 0xBE, 0xBF))),
+        " ": 0x20,
+        "\t": 0x09,
+        "\n": 0x0D,
+    }
+    NUMPAD_VKS = {**{0x60 + i: str(i) for i in range(10)}, 0x6A: "*", 0x6B: "+", 0x6D: "-", 0x6E: ".", 0x6F: "/"}
+elif SYSTEM == "Darwin":
+    # Key codes of the ANSI keyboard
+    _CHAR_VKS = {
+        **dict(zip("asdfhgzxcv", range(0, 10))),
+        **dict(zip("bqweryt123465=97-80]ou[ip", range(11, 36))),
+        **dict(zip("lj'k;\\,/nm.", range(37, 48))),
+        "`": 50,
+        " ": 49,
+        "\t": 48,
+        "\n": 36,
+    }
+    NUMPAD_VKS = {
+        **dict(zip((82, 83, 84, 85, 86, 87, 88, 89, 91, 92), string.digits)),
+        65: ".",
+        67: "*",
+        69: "+",
+        75: "/",
+        78: "-",
+        81: "=",
+    }
+else:
+    # Keysyms of the Latin-1 characters are their code points
+    _CHAR_VKS = {char: ord(char) for char in _SHIFTED}
+    _CHAR_VKS.update({" ": 0x20, "\t": 0xFF09, "\n": 0xFF0D})
+    NUMPAD_VKS = {
+        **{0xFFB0 + i: str(i) for i in range(10)},
+        0xFFAA: "*",
+        0xFFAB: "+",
+        0xFFAD: "-",
+        0xFFAE: ".",
+        0xFFAF: "/",
+    }
+
+# char -> (vk, whether shift is held)
+CHAR_TO_VK: dict[str, tuple[int, bool]] = {char: (vk, False) for char, vk in _CHAR_VKS.items()}
+CHAR_TO_VK.update({_SHIFTED[char]: (vk, True) for char, vk in _CHAR_VKS.items() if char in _SHIFTED})
+# (vk, whether shift is held) -> char. Numpad keys type the same character either way
+VK_TO_CHAR: dict[tuple[int, bool], str] = {entry: char for char, entry in CHAR_TO_VK.items()}
+VK_TO_CHAR.update({(vk, shift): char for vk, char in NUMPAD_VKS.items() for shift in (False, True)})
+
+# Special keys, including aliases such as `Key.alt_l` for `Key.alt`. The media keys of macOS are left out, since
+# their codes collide with the key codes of characters
+KEY_TO_VK: dict[Key, int] = {
+    key: key.value.vk
+    for key in Key.__members__.values()
+    if getattr(key.value, "vk", None) is not None and not getattr(key.value, "_is_media", False)
+}
+# vk -> the key to press to inject it. The first name of a special key wins, e.g. `Key.alt` over `Key.alt_l`
+VK_TO_KEY: dict[int, Union[Key, KeyCode]] = {}
+for _key, _vk in KEY_TO_VK.items():
+    VK_TO_KEY.setdefault(_vk, _key)
+for _vk in (*_CHAR_VKS.values(), *NUMPAD_VKS):
+    VK_TO_KEY.setdefault(_vk, KeyCode.from_vk(_vk))
+SHIFT_VK: Optional[int] = KEY_TO_VK.get(Key.shift)
+
+# Windows and macOS report the vk of the pressed key; X reports a keysym which depends on the shift state
+_PREFER_VK = SYSTEM in ("Windows", "Darwin")
+
+
+def key_to_vk(key: Union[Key, KeyCode, None]) -> int:
+    """Converts a pynput key to a virtual key code. Unknown keys (None) are 0.
+
+    The key parameter passed to callbacks is a `pynput.keyboard.Key` for special keys,
+    a `pynput.keyboard.KeyCode` for normal alphanumeric keys, or just None for unknown keys.
+    """
+    if key is None:
+        return 0
+    if isinstance(key, Key):
+        return KEY_TO_VK.get(key, 0)
+    if _PREFER_VK and key.vk is not None:
+        return key.vk
+    if key.char is not None:
+        entry = CHAR_TO_VK.get(key.char)
+        if entry is not None:
+            return entry[0]
+        return ord(key.char.lower())  # the keysym on X, for the characters of other layouts
+    return key.vk or 0
+
+
+def vk_to_key(vk: int) -> Union[Key, KeyCode]:
+    """The pynput key to press or release to inject a virtual key code."""
+    key = VK_TO_KEY.get(vk)
+    return key if key is not None else KeyCode.from_vk(vk)
+
+
+def char_to_vk(char: str) -> int:
+    """Converts a character to the virtual key code of the key which types it. See `char_to_vks` for shift."""
+    entry = CHAR_TO_VK.get(char)
+    if entry is None:
+        raise ValueError(f"Unsupported character: {char}")
+    return entry[0]
+
+
+def char_to_vks(char: str) -> tuple[int, ...]:
+    """The virtual key codes to press, in order, to type a character: shift first if needed."""
+    entry = CHAR_TO_VK.get(char)
+    if entry is None:
+        raise ValueError(f"Unsupported character: {char}")
+    vk, shift = entry
+    return (SHIFT_VK, vk) if shift else (vk,)
+
+
+def vk_to_char(vk: int, shift: bool = False) -> Optional[str]:
+    """The character typed by a key, or None if it types none."""
+    return VK_TO_CHAR.get((vk, shift))
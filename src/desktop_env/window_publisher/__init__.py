@@ -15,6 +15,7 @@ class WindowPublisher(AbstractThread):
     """Publishes the active window information to the callback function every 1/FPS seconds"""
 
     args_cls = WindowPublishArgs
+    event_callbacks = {"callback": "window_publisher"}
 
     def __init__(self, callback: Callable, verbose: bool, fps: int):
         self.pbar = tqdm(total=None, desc="Publishing windows info", dynamic_ncols=True, disable=not verbose)
@@ -31,6 +32,11 @@ class WindowPublisher(AbstractThread):
 
             self.gw = gw
             self._get_window_info = self._get_window_info_windows
+        elif platform.system() == "Linux":
+            from Xlib import display
+
+            self.x_display = display.Display()
+            self._get_window_info = self._get_window_info_linux
         else:
             raise NotImplementedError(f"Platform {platform.system()} is not supported yet")
 
@@ -45,6 +51,22 @@ class WindowPublisher(AbstractThread):
             )
         return None
 
+    def _get_window_info_linux(self):
+        from Xlib import X
+
+        from .utils import _x11_window_rect, _x11_window_title
+
+        root = self.x_display.screen().root
+        active = root.get_full_property(self.x_display.intern_atom("_NET_ACTIVE_WINDOW"), X.AnyPropertyType)
+        if active is None or not active.value or active.value[0] == 0:
+            return None
+        window = self.x_display.create_resource_object("window", active.value[0])
+        return WindowInfo(
+            title=_x11_window_title(self.x_display, window),
+            rect=_x11_window_rect(root, window),
+            hWnd=active.value[0],
+        )
+
     def _get_window_info_macos(self):
         from Quartz import CGWindowListCopyWindowInfo, kCGNullWindowID, kCGWindowListOptionOnScreenOnly
 
@@ -2,12 +2,12 @@ from typing import Callable
 
 from pydantic import Field, ImportString
 
-from ..args import BaseArgs
+from ..args import BaseArgs, callback_sink
 from .msg import WindowInfo
 
 
 class WindowPublishArgs(BaseArgs):
     # Callback function for when a window is published
-    callback: ImportString[Callable[[WindowInfo], None]]
+    callback: ImportString[Callable[[WindowInfo], None]] = Field(callback_sink)
     verbose: bool = Field(False, description="Whether to print debug information")
     fps: float = 4
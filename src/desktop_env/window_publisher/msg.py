@@ -1,10 +1,13 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from ..clock import time_ns
 
 
 class WindowInfo(BaseModel):
     title: str
     rect: tuple[int, int, int, int]
     hWnd: int
+    timestamp_ns: int = Field(default_factory=time_ns)  # UTC nanoseconds from the shared `desktop_env.clock`
 
     @property
     def width(self):
@@ -42,10 +42,55 @@ def get_window_by_title(window_title_substring: str) -> WindowInfo:
                         hWnd=window.get("kCGWindowNumber", 0),
                     )
 
+        raise ValueError(f"No window with title containing '{window_title_substring}' found.")
+    elif os_name == "Linux":
+        from Xlib import X, display
+
+        x_display = display.Display()
+        root = x_display.screen().root
+        client_list = root.get_full_property(x_display.intern_atom("_NET_CLIENT_LIST"), X.AnyPropertyType)
+        for xid in client_list.value if client_list is not None else ():
+            window = x_display.create_resource_object("window", xid)
+            title = _x11_window_title(x_display, window)
+            if title and window_title_substring.lower() in title.lower():
+                return WindowInfo(title=title, rect=_x11_window_rect(root, window), hWnd=xid)
+
         raise ValueError(f"No window with title containing '{window_title_substring}' found.")
     else:
-        # Linux or other OS (not implemented yet)
-        raise NotImplementedError("Not implemented for Linux or other OS.")
+        raise NotImplementedError(f"Not implemented for {os_name}.")
+
+
+def _x11_window_title(x_display, window) -> str:
+    """Title of an X11 window, preferring the UTF-8 `_NET_WM_NAME` over the legacy `WM_NAME`."""
+    net_wm_name = window.get_full_property(x_display.intern_atom("_NET_WM_NAME"), x_display.intern_atom("UTF8_STRING"))
+    if net_wm_name is not None:
+        value = net_wm_name.value
+        return value.decode("utf-8", errors="replace") if isinstance(value, bytes) else str(value)
+    return window.get_wm_name() or ""
+
+
+def _x11_window_rect(root, window) -> tuple[int, int, int, int]:
+    """Rect `(left, top, right, bottom)` of an X11 window in root window coordinates."""
+    geometry = window.get_geometry()
+    origin = root.translate_coords(window, 0, 0)
+    return (origin.x, origin.y, origin.x + geometry.width, origin.y + geometry.height)
+
+
+def get_monitor_rect(monitor_idx: int) -> tuple[int, int, int, int]:
+    """Rect `(left, top, right, bottom)` of the monitor in desktop coordinates.
+
+    Only needed on Linux, where `ximagesrc` has no monitor selection and captures the monitor's part of the screen.
+    """
+    os_name = platform.system()
+    if os_name != "Linux":
+        raise NotImplementedError(f"Not implemented for {os_name}.")
+    from Xlib import display
+
+    monitors = display.Display().screen().root.xrandr_get_monitors().monitors
+    if not 0 <= monitor_idx < len(monitors):
+        raise ValueError(f"Monitor index {monitor_idx} is out of range, {len(monitors)} monitors found.")
+    monitor = monitors[monitor_idx]
+    return (monitor.x, monitor.y, monitor.x + monitor.width_in_pixels, monitor.y + monitor.height_in_pixels)
 
 
 def when_active(window_title_substring: str):
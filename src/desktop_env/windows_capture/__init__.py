@@ -1,2 +1,10 @@
+from .appsink_reader import AppsinkReader
+from .args import ChangeDetectionArgs, DispatchArgs, FramePoolArgs, FrameSubscriberArgs, WindowsCaptureArgs
+from .batching import FrameBatch, FrameBatcher, FrameBatcherStats
+from .buffer_pool import FrameBufferPool, FramePoolStats, PooledFrameHandle
+from .change_detection import ChangeDetectionStats, ChangeDetector, ChangeInfo
+from .dispatch import DispatchStats
 from .gst_pipeline import construct_pipeline
+from .metrics import CaptureMetrics, CaptureMetricsSnapshot, LatencyHistogram, to_prometheus
+from .shm_ring import SharedFrameHandle, SharedFrameReader, SharedFrameWriter
 from .windows_capture import WindowsCapture
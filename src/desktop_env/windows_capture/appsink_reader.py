@@ -0,0 +1,306 @@
+import gi
+
+gi.require_version("Gst", "1.0")
+import asyncio
+import functools
+import time
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+import numpy as np
+from gi.repository import Gst
+from tqdm import tqdm
+
+from ..clock import Clock, monotonic_to_utc_ns
+from .args import ChangeDetectionArgs, DispatchArgs, FramePoolArgs
+from .buffer_pool import FrameBufferPool, FramePoolStats
+from .change_detection import ChangeDetectionStats, ChangeDetector
+from .dispatch import DispatchStats, make_dispatcher
+from .metrics import CaptureMetrics, CaptureMetricsSnapshot
+from .msg import CapsInfo, CompressedFrameStamped, Frame, FrameHandle
+
+
+class AppsinkReader:
+    """Turns the samples of one appsink into `FrameHandle`s, either pushed to a callback or pulled by the consumer.
+    If the appsink receives encoded images (`image/jpeg`, `image/png`), `CompressedFrameStamped`s are delivered
+    instead.
+
+    - push mode: `on_frame_arrived(frame)` is called for every frame, from the GStreamer streaming thread or from
+      worker threads, depending on `dispatch`.
+    - pull mode (`on_frame_arrived=None`): frames are pulled by the consumer with `frames()`, `aframes()` or
+      `latest()`.
+      Signal emission is disabled, so frames which are never pulled cost no Python code, except for a buffer counter
+      if `metrics` is enabled.
+
+    With `metrics`, per-stage latency histograms and frame counters are collected in `self.metrics`.
+    With `change_detection`, raw frames which did not change since the last delivered frame are dropped before they
+    are copied or dispatched, or are annotated with their dirty rects. Encoded frames are always delivered.
+    """
+
+    def __init__(
+        self,
+        pipeline: Gst.Pipeline,
+        appsink: Gst.Element,
+        on_frame_arrived: Optional[Callable[[Frame], None]] = None,
+        *,
+        frame_pool: Optional[FramePoolArgs] = None,
+        dispatch: Optional[DispatchArgs] = None,
+        change_detection: Optional[ChangeDetectionArgs] = None,
+        metrics: bool = True,
+        pbar: Optional[tqdm] = None,
+    ):
+        self.pipeline = pipeline
+        self.appsink = appsink
+
+        self.metrics: Optional[CaptureMetrics] = None
+        if metrics:
+            self.metrics = CaptureMetrics()
+            # Counts every buffer reaching the appsink, including the ones it drops, to derive the dropped frames
+            self.appsink.get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER, self.__on_buffer_probe)
+
+        # Data for progress bar
+        self.pbar = pbar
+        self._bandwidth = 0
+        self._last_time = time.time()
+
+        # This MUST be True to capture `new-sample` signal. In pull mode, no signal is needed.
+        self.appsink.set_property("emit-signals", on_frame_arrived is not None)
+        self.appsink.set_property("sync", True)  # This should be True, I guess
+        if self.appsink.get_property("max-buffers") == 0:
+            # Never let the streaming thread block (or queue up frames) because of a slow consumer
+            self.appsink.set_property("max-buffers", 1)
+            self.appsink.set_property("drop", True)
+
+        # Converts the pipeline clock to `time.monotonic_ns()`, created for each pipeline clock
+        self._pipeline_clock: Optional[Clock] = None
+
+        # Caps are parsed once per negotiation and cached, instead of being re-read for every sample
+        self._caps_info: Optional[CapsInfo] = None
+        self.appsink.get_static_pad("sink").connect("notify::caps", self.__on_caps_changed)
+
+        # The frame pool is allocated lazily, since its slots are sized from the negotiated caps
+        self._frame_pool_args = frame_pool
+        self._frame_pool: Optional[FrameBufferPool] = None
+
+        self._change_detector: Optional[ChangeDetector] = None
+        if change_detection is not None:
+            self._change_detector = ChangeDetector(**change_detection.model_dump())
+
+        # Connect to the appsink's new-sample signal
+        self._dispatcher = None
+        if on_frame_arrived is not None:
+            dispatch = dispatch or DispatchArgs()
+            self._dispatcher = make_dispatcher(
+                on_frame_arrived,
+                dispatch.mode,
+                num_workers=dispatch.num_workers,
+                max_in_flight=dispatch.max_in_flight,
+                metrics=self.metrics,
+            )
+            self.on_frame_arrived = functools.partial(self.__on_new_sample, callback=self._dispatcher.submit)
+            self.appsink.connect("new-sample", self.on_frame_arrived)
+
+    @property
+    def pool_stats(self) -> Optional[FramePoolStats]:
+        """Statistics of the frame pool, or None if the frame pool is disabled or not allocated yet."""
+        return self._frame_pool.stats if self._frame_pool is not None else None
+
+    @property
+    def dispatch_stats(self) -> Optional[DispatchStats]:
+        """Statistics of the callback dispatcher, including frames superseded before delivery. None in pull mode."""
+        return self._dispatcher.stats if self._dispatcher is not None else None
+
+    @property
+    def change_stats(self) -> Optional[ChangeDetectionStats]:
+        """Statistics of the change detection, including suppressed frames. None if change detection is disabled."""
+        return self._change_detector.stats.model_copy() if self._change_detector is not None else None
+
+    def metrics_snapshot(self) -> Optional[CaptureMetricsSnapshot]:
+        """Snapshot of the metrics, or None if metrics are disabled. Use `.model_dump_json()` to dump it as JSON."""
+        if self.metrics is None:
+            return None
+        pending = self._dispatcher.stats.pending if self._dispatcher is not None else 0
+        return self.metrics.snapshot(pending=pending)
+
+    def close(self):
+        if self._dispatcher is not None:
+            self._dispatcher.close()
+
+    def __get_frame_time_utc(self, pts):
+        assert pts != Gst.CLOCK_TIME_NONE
+
+        # Get the pipeline's clock. Ref: https://gstreamer.freedesktop.org/documentation/gstreamer/gstelement.html?gi-language=python
+        clock = self.pipeline.get_clock()
+        assert clock.props.clock_type == Gst.ClockType.MONOTONIC
+        if self.metrics is not None:
+            elapsed_time_from_playing = clock.get_time() - self.pipeline.get_base_time()
+            self.metrics.latency["source_to_appsink"].record(elapsed_time_from_playing - pts)
+
+        # The pipeline clock is monotonic, but its time base is not guaranteed to be `time.monotonic_ns()`'s one
+        if self._pipeline_clock is None or self._pipeline_clock.reference != clock.get_time:
+            self._pipeline_clock = Clock(clock.get_time)
+        frame_time_in_monotonic = self._pipeline_clock.reference_to_monotonic_ns(pts + self.pipeline.get_base_time())
+        return monotonic_to_utc_ns(frame_time_in_monotonic)
+
+    def __on_buffer_probe(self, pad: Gst.Pad, info: Gst.PadProbeInfo):
+        self.metrics.on_buffer()
+        return Gst.PadProbeReturn.OK
+
+    def __on_caps_changed(self, pad: Gst.Pad, pspec):
+        self._caps_info = None
+
+    def __get_caps_info(self, sample: Gst.Sample) -> CapsInfo:
+        if self._caps_info is None:
+            # This width and height may be different with Window's width and height
+            self._caps_info = CapsInfo.from_caps(sample.get_caps())
+        return self._caps_info
+
+    def __map_sample(self, sample: Gst.Sample, caps_info: CapsInfo) -> FrameHandle:
+        """Wrap the sample into a `FrameHandle` which keeps the buffer mapped until the handle is released."""
+        buf: Gst.Buffer = sample.get_buffer()
+        map_result: tuple[bool, Gst.MapInfo] = buf.map(Gst.MapFlags.READ)
+        result, mapinfo = map_result
+        if not result:
+            raise RuntimeError("Failed to map the buffer.")
+        frame_arr = caps_info.view(np.frombuffer(mapinfo.data, dtype=np.uint8))
+        # The partial holds a reference to `buf`, so the memory stays valid until the handle is released
+        return FrameHandle(
+            frame_arr,
+            timestamp_ns=self.__get_frame_time_utc(buf.pts),
+            caps=caps_info,
+            release=functools.partial(buf.unmap, mapinfo),
+        )
+
+    def __read_compressed(self, sample: Gst.Sample, caps_info: CapsInfo) -> CompressedFrameStamped:
+        """Copy the encoded image out of the sample. It is small, so the buffer is not kept mapped."""
+        buf: Gst.Buffer = sample.get_buffer()
+        map_result: tuple[bool, Gst.MapInfo] = buf.map(Gst.MapFlags.READ)
+        result, mapinfo = map_result
+        if not result:
+            raise RuntimeError("Failed to map the buffer.")
+        try:
+            data = bytes(mapinfo.data)
+        finally:
+            buf.unmap(mapinfo)
+        return CompressedFrameStamped.model_construct(
+            timestamp_ns=self.__get_frame_time_utc(buf.pts), format=caps_info.format, data=data
+        )
+
+    def __copy_into_pool(self, frame: FrameHandle) -> Optional[FrameHandle]:
+        """Copy the mapped frame into a pool slot and release the mapping. Returns None if the frame was dropped."""
+        if self._frame_pool is None or self._frame_pool.shape != frame.caps.shape:
+            self._frame_pool = FrameBufferPool.from_caps(frame.caps, **self._frame_pool_args.model_dump())
+        with frame:
+            pooled = self._frame_pool.wrap(frame.frame_arr, frame.timestamp_ns, frame.caps)
+        if pooled is not None:
+            pooled.change = frame.change
+        return pooled
+
+    def __sample_to_frame(self, sample: Gst.Sample) -> Optional[Frame]:
+        """Convert a sample into a frame and update the progress bar. Returns None if the frame was dropped or
+        suppressed."""
+        caps_info = self.__get_caps_info(sample)
+        if caps_info.compressed:
+            frame = self.__read_compressed(sample, caps_info)
+            nbytes = len(frame.data)
+        else:
+            frame = self.__map_sample(sample, caps_info)
+            if self._change_detector is not None:
+                frame.change = self._change_detector.process(frame.frame_arr, frame.timestamp_ns)
+                if frame.change is None:
+                    frame.release()
+                    return None
+            if self._frame_pool_args is not None:
+                frame = self.__copy_into_pool(frame)
+                if frame is None:
+                    return None
+            nbytes = frame.frame_arr.nbytes
+        if self.pbar is None:
+            return frame
+        self._bandwidth += nbytes
+
+        # Calculate time difference
+        current_time = time.time()
+        time_diff = current_time - self._last_time
+
+        # Update bandwidth every second
+        if time_diff >= 1.0:
+            bandwidth = self._bandwidth / time_diff
+            self.pbar.set_postfix(
+                bandwidth=f"{bandwidth / 1e6:.2f} MB/s",
+                width=caps_info.width,
+                height=caps_info.height,
+                format=caps_info.format,
+            )
+            self._bandwidth = 0
+            self._last_time = current_time
+
+        # Update the tqdm progress bar
+        self.pbar.update(1)
+        return frame
+
+    def __on_new_sample(self, sink, callback: Callable):
+        """Callback function for the new-sample signal of appsink. Internally calls `callback(frame, pulled_ns)`"""
+
+        # Retrieve the sample
+        sample: Gst.Sample = sink.emit("pull-sample")
+        if sample is None:
+            print("Received null sample.")
+            return Gst.FlowReturn.ERROR
+        pulled_ns = time.monotonic_ns()
+
+        try:
+            frame = self.__sample_to_frame(sample)
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            return Gst.FlowReturn.ERROR
+
+        # Publish the frame. The buffer is kept mapped for as long as the consumer holds the handle.
+        if frame is not None:
+            callback(frame, pulled_ns)
+        return Gst.FlowReturn.OK
+
+    # Pull mode API. These may be called from any thread while the pipeline is running.
+
+    def pull(self, timeout: Optional[float] = None) -> Optional[Frame]:
+        """Wait up to `timeout` seconds (forever if None) for the next frame.
+        Returns None on timeout or end of stream."""
+        timeout_ns = Gst.CLOCK_TIME_NONE if timeout is None else int(timeout * Gst.SECOND)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            sample: Optional[Gst.Sample] = self.appsink.emit("try-pull-sample", timeout_ns)
+            if sample is None:
+                return None
+            frame = self.__sample_to_frame(sample)
+            if frame is not None:
+                if self.metrics is not None:
+                    self.metrics.on_delivered(frame)
+                return frame
+            # The frame was dropped by the frame pool or suppressed as unchanged; wait for the next one within the
+            # remaining time
+            if deadline is not None:
+                timeout_ns = max(0, int((deadline - time.monotonic()) * Gst.SECOND))
+
+    def latest(self, timeout: float = 0) -> Optional[Frame]:
+        """Return the newest frame which has not been pulled yet, skipping older queued ones without converting them.
+        If no frame is queued, wait up to `timeout` seconds for one. Returns None if no frame is available."""
+        newest: Optional[Gst.Sample] = None
+        while (sample := self.appsink.emit("try-pull-sample", 0)) is not None:
+            newest = sample
+        if newest is None:
+            return self.pull(timeout)
+        frame = self.__sample_to_frame(newest)
+        if frame is not None and self.metrics is not None:
+            self.metrics.on_delivered(frame)
+        return frame
+
+    def frames(self, timeout: Optional[float] = None) -> Iterator[Frame]:
+        """Iterate over frames as they arrive. The iteration ends at the end of stream, or when no frame arrives
+        within `timeout` seconds. Frames which arrive while the consumer is busy are dropped, not queued."""
+        while (frame := self.pull(timeout)) is not None:
+            yield frame
+
+    async def aframes(self, timeout: Optional[float] = None) -> AsyncIterator[Frame]:
+        """Asynchronous version of `frames()`. Waiting for a frame happens in the default executor."""
+        loop = asyncio.get_running_loop()
+        while (frame := await loop.run_in_executor(None, self.pull, timeout)) is not None:
+            yield frame
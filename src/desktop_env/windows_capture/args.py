@@ -1,12 +1,120 @@
-from typing import Callable
+from typing import Callable, Literal, Optional
 
-from pydantic import BaseModel, Field, ImportString
+from pydantic import BaseModel, Field, ImportString, model_validator
+from typing_extensions import Self
 
 from ..args import BaseArgs, callback_sink
-from .gst_pipeline import construct_pipeline
-from .msg import FrameStamped
+from .gst_pipeline import CaptureBackend, Interpolation, OutputFormat, construct_pipeline
+from .msg import Frame
+
+
+class FramePoolArgs(BaseArgs):
+    num_slots: int = Field(4, description="Number of preallocated frame buffers")
+    max_bytes: Optional[int] = Field(None, description="Hard memory budget of the pool, in bytes")
+    policy: Literal["overwrite", "block"] = Field(
+        "block",
+        description="When all slots are in use, block until one is released or overwrite the oldest one. Views of an "
+        "overwritten frame are not protected, check `PooledFrameHandle.valid`",
+    )
+    block_timeout: float = Field(0.1, description="Seconds to wait for a free slot before dropping the frame")
+
+
+class DispatchArgs(BaseArgs):
+    mode: Literal["inline", "worker", "pool"] = Field(
+        "inline",
+        description="Call `on_frame_arrived` on the streaming thread (inline), on a dedicated worker thread with a "
+        "latest-only mailbox (worker), or on a pool of worker threads (pool)",
+    )
+    num_workers: int = Field(4, description="Number of worker threads in pool mode")
+    max_in_flight: int = Field(8, description="Maximum number of running or waiting frames in pool mode")
+
+
+class ChangeDetectionArgs(BaseArgs):
+    mode: Literal["suppress", "annotate"] = Field(
+        "suppress",
+        description="Drop frames which did not change (suppress), or deliver every frame with its dirty rects and "
+        "change score attached as `FrameHandle.change` (annotate)",
+    )
+    block_size: int = Field(32, description="Side of the square blocks which are compared, in pixels")
+    sample_step: int = Field(4, description="Only every n-th pixel of a block is read. block_size must be a multiple")
+    threshold: float = Field(4.0, description="Minimum change of a block's mean value (0-255) to mark it dirty")
+    min_score: float = Field(0.0, ge=0, le=1, description="A frame changed if more than this fraction of blocks did")
+    max_suppression_interval: float = Field(
+        1.0, description="Deliver a frame at least this often (in seconds), even if nothing changed"
+    )
+
+
+class FrameSubscriberArgs(BaseArgs):
+    """A consumer of the capture with its own branch of the pipeline, so that it receives frames at its own cost."""
+
+    name: str = Field(description="Name of the subscriber. Also used as the name of its appsink")
+    # Callback function for when a frame arrives. If None, frames are pulled from `WindowsCapture.subscribers[name]`
+    on_frame_arrived: Optional[ImportString[Callable[[Frame], None]]] = None
+    max_framerate: Optional[str] = Field(None, description="Maximum framerate of the subscriber, e.g. 4/1")
+    width: Optional[int] = Field(None, description="Output width. If None, the captured width is kept")
+    height: Optional[int] = Field(None, description="Output height. If None, the captured height is kept")
+    interpolation: Interpolation = Field("bilinear", description="Interpolation mode used for scaling")
+    format: OutputFormat = Field(
+        "raw",
+        description="Output pixel format (e.g. raw (BGRA on Windows, BGRx on X11), RGB, GRAY8), or jpeg/png",
+    )
+    jpeg_quality: int = Field(85, ge=0, le=100, description="Quality of jpeg encoding")
+    png_compression_level: int = Field(1, ge=0, le=9, description="Compression level of png encoding")
+    queue_size: int = Field(1, description="Size of the leaky queue in front of the subscriber")
+    frame_pool: Optional[FramePoolArgs] = None
+    dispatch: DispatchArgs = Field(default_factory=DispatchArgs)
+    change_detection: Optional[ChangeDetectionArgs] = None
+    metrics: Optional[bool] = Field(None, description="Collect metrics of the subscriber. If None, like the capture")
 
 
 class WindowsCaptureArgs(BaseArgs):
-    on_frame_arrived: ImportString[Callable[[FrameStamped], None]]  # Callback function for when a frame arrives
-    pipeline_description: str = Field(default_factory=construct_pipeline)  # Optional pipeline description
+    # Callback function for when a frame arrives. If None, frames are pulled with `frames()`/`aframes()`/`latest()`
+    on_frame_arrived: Optional[ImportString[Callable[[Frame], None]]] = None
+    # Optional pipeline description. If None, it is constructed from the fields below with `construct_pipeline`.
+    pipeline_description: Optional[str] = None
+
+    window_name: Optional[str] = Field(None, description="The name of the window to capture")
+    monitor_idx: Optional[int] = Field(None, description="The index of the monitor to capture")
+    framerate: str = Field("30/1", description="The maximum framerate of the capture")
+    backend: CaptureBackend = Field("auto", description="The capture source, e.g. ximagesrc or pipewire on Linux")
+    output_format: OutputFormat = Field(
+        "raw", description="Output pixel format (e.g. raw (BGRA on Windows, BGRx on X11), RGB), or jpeg/png"
+    )
+    width: Optional[int] = Field(None, description="Output width. If None, the captured width is kept")
+    height: Optional[int] = Field(None, description="Output height. If None, the captured height is kept")
+    interpolation: Interpolation = Field("bilinear", description="Interpolation mode used for scaling")
+    crop: Optional[tuple[int, int, int, int]] = Field(
+        None, description="The rect (left, top, right, bottom) to capture"
+    )
+    jpeg_quality: int = Field(85, ge=0, le=100, description="Quality of jpeg encoding")
+    png_compression_level: int = Field(1, ge=0, le=9, description="Compression level of png encoding")
+
+    frame_pool: Optional[FramePoolArgs] = None  # Copy frames into a preallocated buffer pool, if given
+    dispatch: DispatchArgs = Field(default_factory=DispatchArgs)  # How `on_frame_arrived` is called
+    change_detection: Optional[ChangeDetectionArgs] = None  # Skip or annotate unchanged frames, if given
+    subscribers: list[FrameSubscriberArgs] = Field(default_factory=list)  # Additional consumers of the same capture
+    metrics: bool = Field(True, description="Collect latency histograms and frame counters of every appsink")
+    verbose: bool = Field(True, description="Whether to show the progress bar")
+
+    @model_validator(mode="after")
+    def construct_pipeline_description(self) -> Self:
+        if self.pipeline_description is None:
+            self.pipeline_description = self.default_pipeline_description()
+        return self
+
+    def default_pipeline_description(self) -> str:
+        """The pipeline constructed from the fields, used if `pipeline_description` is not given."""
+        return construct_pipeline(
+            window_name=self.window_name,
+            monitor_idx=self.monitor_idx,
+            framerate=self.framerate,
+            backend=self.backend,
+            output_format=self.output_format,
+            width=self.width,
+            height=self.height,
+            interpolation=self.interpolation,
+            crop=self.crop,
+            jpeg_quality=self.jpeg_quality,
+            png_compression_level=self.png_compression_level,
+            subscribers=self.subscribers,
+        )
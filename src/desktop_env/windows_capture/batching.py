@@ -0,0 +1,261 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from .msg import CapsInfo, Frame, FrameHandle
+
+
+class FrameBatch:
+    """A batch of frames stacked in one contiguous array, for batched inference.
+
+    `frames` is a `[N, H, W, C]` view and `timestamps_ns` a `[N]` view into a buffer preallocated by the
+    `FrameBatcher`. The buffer is reused once the batch is released, when `release()` is called, when the `with`
+    block exits, or when the last reference to the batch is dropped.
+    """
+
+    __slots__ = ("caps", "_frames", "_timestamps_ns", "_release", "__weakref__")
+
+    def __init__(
+        self,
+        frames: np.ndarray,
+        timestamps_ns: np.ndarray,
+        caps: CapsInfo,
+        release: Optional[Callable[[], None]] = None,
+    ):
+        self.caps = caps
+        self._frames = frames
+        self._timestamps_ns = timestamps_ns
+        self._release = release
+
+    @property
+    def frames(self) -> np.ndarray:
+        if self._frames is None:
+            raise RuntimeError("The batch has already been released.")
+        return self._frames
+
+    @property
+    def timestamps_ns(self) -> np.ndarray:
+        if self._timestamps_ns is None:
+            raise RuntimeError("The batch has already been released.")
+        return self._timestamps_ns
+
+    @property
+    def released(self) -> bool:
+        return self._frames is None
+
+    def release(self) -> None:
+        """Return the buffer to the batcher. Views obtained from the batch must not be used afterwards."""
+        if self._frames is None:
+            return
+        self._frames = self._timestamps_ns = None
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __enter__(self) -> "FrameBatch":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    def __del__(self):
+        self.release()
+
+    def __repr__(self):
+        if self.released:
+            return f"{self.__class__.__name__}(released)"
+        return f"{self.__class__.__name__}({len(self)} x {self.caps.width}x{self.caps.height} {self.caps.format})"
+
+
+class FrameBatcherStats(BaseModel):
+    frames: int = 0  # frames written into a batch
+    batches: int = 0  # batches delivered
+    full_batches: int = 0  # batches delivered because they reached `batch_size`
+    dropped: int = 0  # frames dropped because no batch buffer was released in time
+
+
+class _BatchBuffer:
+    """One preallocated `[batch_size, H, W, C]` frame array and its timestamp vector."""
+
+    def __init__(self, caps: CapsInfo, batch_size: int):
+        self.caps = caps
+        self.frames = np.empty((batch_size, *caps.shape), dtype=np.uint8)
+        self.timestamps_ns = np.empty(batch_size, dtype=np.int64)
+
+
+class FrameBatcher:
+    """Collects frames into preallocated batches and hands each batch to `on_batch` as a `FrameBatch`.
+
+    It is a frame callback, so it can be passed as `on_frame_arrived` of `WindowsCapture` or of a subscriber:
+
+        batcher = FrameBatcher(on_batch, batch_size=8, max_delay=0.1)
+        capture = WindowsCapture(batcher)
+
+    Every frame is copied once, straight from its buffer into its row of the batch, and released right away, so no
+    `np.stack` is needed. Leave the frame pool disabled, or frames are copied twice. A batch is delivered when it
+    holds `batch_size` frames, or `max_delay` seconds after its first frame, whichever comes first; batches delivered
+    on the deadline are shorter. A change of the frame size or format delivers the current batch early.
+
+    `on_batch` is called from the thread which delivers frames, or from the deadline thread of the batcher, never
+    concurrently. While `num_buffers` batches are held by the consumer, new frames wait up to `block_timeout`
+    seconds for one to be released and are dropped afterwards.
+
+    Args:
+        on_batch: Called with every batch. The batch is released when the callback returns, unless the callback
+            keeps a reference to it.
+        batch_size: Maximum number of frames in a batch.
+        max_delay: Maximum seconds between the first frame of a batch and its delivery. None waits for full batches.
+        num_buffers: Number of preallocated batch buffers.
+        block_timeout: Seconds to wait for a released batch buffer before dropping a frame.
+    """
+
+    def __init__(
+        self,
+        on_batch: Callable[[FrameBatch], None],
+        *,
+        batch_size: int = 8,
+        max_delay: Optional[float] = 0.1,
+        num_buffers: int = 2,
+        block_timeout: float = 0.1,
+    ):
+        if batch_size < 1 or num_buffers < 1:
+            raise ValueError("batch_size and num_buffers must be at least 1.")
+        self.on_batch = on_batch
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.num_buffers = num_buffers
+        self.block_timeout = block_timeout
+
+        self._caps: Optional[CapsInfo] = None
+        self._free: deque[_BatchBuffer] = deque()
+        self._current: Optional[_BatchBuffer] = None
+        self._count = 0
+        self._deadline: Optional[float] = None
+        self._cond = threading.Condition()
+        self._deliver_lock = threading.Lock()  # keeps batches in order and `on_batch` calls serialized
+        self._stats = FrameBatcherStats()
+        self._closed = False
+
+        self._thread: Optional[threading.Thread] = None
+        if max_delay is not None:
+            self._thread = threading.Thread(target=self._run_deadlines, daemon=True)
+            self._thread.start()
+
+    @property
+    def stats(self) -> FrameBatcherStats:
+        with self._cond:
+            return self._stats.model_copy()
+
+    def _reallocate(self, caps: CapsInfo) -> None:
+        """Allocate the buffers for a new frame size or format. Must be called with `self._cond` held."""
+        self._caps = caps
+        self._free = deque(_BatchBuffer(caps, self.batch_size) for _ in range(self.num_buffers))
+
+    def _recycle(self, buffer: _BatchBuffer) -> None:
+        with self._cond:
+            # Buffers of a previous caps are left to the garbage collector
+            if buffer.caps == self._caps:
+                self._free.append(buffer)
+                self._cond.notify_all()
+
+    def _take(self) -> Optional[tuple[_BatchBuffer, int]]:
+        """Take the current batch out for delivery. Must be called with `self._cond` held."""
+        if self._current is None or self._count == 0:
+            return None
+        taken = (self._current, self._count)
+        self._current, self._count, self._deadline = None, 0, None
+        self._stats.batches += 1
+        self._stats.full_batches += taken[1] == self.batch_size
+        return taken
+
+    def _deliver(self, taken: tuple[_BatchBuffer, int]) -> None:
+        """Call `on_batch`. Must be called with `self._deliver_lock` held and `self._cond` released."""
+        buffer, count = taken
+        batch = FrameBatch(
+            buffer.frames[:count], buffer.timestamps_ns[:count], buffer.caps, lambda: self._recycle(buffer)
+        )
+        try:
+            self.on_batch(batch)
+        finally:
+            # Drop this function's reference, so that the batch is released unless the callback kept it
+            del batch
+
+    def add(self, frame_arr: np.ndarray, timestamp_ns: int, caps: CapsInfo) -> bool:
+        """Copy a frame into the current batch. Returns False if it was dropped because no buffer was free."""
+        with self._deliver_lock:
+            if caps != self._caps:
+                # Deliver the frames of the previous caps first
+                with self._cond:
+                    taken = self._take()
+                if taken is not None:
+                    self._deliver(taken)
+            with self._cond:
+                if caps != self._caps:
+                    self._reallocate(caps)
+                if self._current is None:
+                    if not self._free:
+                        self._cond.wait_for(lambda: self._free, timeout=self.block_timeout)
+                    if not self._free:
+                        self._stats.dropped += 1
+                        return False
+                    self._current = self._free.popleft()
+                    if self.max_delay is not None:
+                        self._deadline = time.monotonic() + self.max_delay
+                        self._cond.notify_all()
+
+            # The current batch is only touched by this call until it is taken, which needs `self._deliver_lock`
+            buffer, index = self._current, self._count
+            np.copyto(buffer.frames[index], frame_arr)
+            buffer.timestamps_ns[index] = timestamp_ns
+            with self._cond:
+                self._count += 1
+                self._stats.frames += 1
+                taken = self._take() if self._count == self.batch_size else None
+            if taken is not None:
+                self._deliver(taken)
+            return True
+
+    def __call__(self, frame: Frame) -> None:
+        if not isinstance(frame, FrameHandle):
+            raise TypeError("FrameBatcher only batches raw frames. Use a raw output format, e.g. output_format='RGB'.")
+        with frame:
+            self.add(frame.frame_arr, frame.timestamp_ns, frame.caps)
+
+    def flush(self) -> None:
+        """Deliver the current batch now, even if it is not full."""
+        self._flush(expired_only=False)
+
+    def _flush(self, expired_only: bool) -> None:
+        with self._deliver_lock:
+            with self._cond:
+                expired = self._deadline is not None and time.monotonic() >= self._deadline
+                taken = self._take() if expired or not expired_only else None
+            if taken is not None:
+                self._deliver(taken)
+
+    def _run_deadlines(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and (self._deadline is None or time.monotonic() < self._deadline):
+                    timeout = None if self._deadline is None else self._deadline - time.monotonic()
+                    self._cond.wait(timeout)
+                if self._closed:
+                    return
+            # The batch may have been delivered by size in the meantime, and a new one started
+            self._flush(expired_only=True)
+
+    def close(self) -> None:
+        """Deliver the remaining frames and stop the deadline thread."""
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
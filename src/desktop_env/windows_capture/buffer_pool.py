@@ -0,0 +1,155 @@
+import functools
+import threading
+import weakref
+from collections import deque
+from typing import Literal, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from .msg import CapsInfo, FrameHandle
+
+
+class FramePoolStats(BaseModel):
+    num_slots: int
+    slot_nbytes: int
+    slots_in_use: int
+    hits: int = 0  # frames written into a free slot
+    overwrites: int = 0  # frames written by reclaiming the oldest slot in use
+    misses: int = 0  # frames dropped because no slot became free in time
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.overwrites + self.misses
+        return self.hits / total if total else 1.0
+
+
+class PooledFrameHandle(FrameHandle):
+    """A `FrameHandle` whose `frame_arr` is a view into a slot of a `FrameBufferPool`.
+
+    Under the "overwrite" policy, the slot of the oldest handle is reclaimed when the pool runs out of slots. The
+    handle is then invalidated, but views already taken from `frame_arr` keep pointing at the slot, which is
+    overwritten with the next frame while they may still be read. Check `valid` after processing the frame, or copy
+    it with `to_frame_stamped()` first, if the consumer holds more than `num_slots` frames.
+    """
+
+    __slots__ = ("generation", "_slot", "_generations")
+
+    def __init__(self, frame_arr, timestamp_ns, caps, release, *, slot: int, generation: int, generations: list[int]):
+        super().__init__(frame_arr, timestamp_ns, caps, release)
+        self.generation = generation
+        self._slot = slot
+        self._generations = generations
+
+    @property
+    def valid(self) -> bool:
+        """Whether the slot still holds this frame, i.e. `frame_arr` has not been overwritten."""
+        return not self.released and self._generations[self._slot] == self.generation
+
+
+class FrameBufferPool:
+    """Fixed-size ring of preallocated frame buffers with a hard memory budget.
+
+    Frames are copied into pool slots and handed out as `PooledFrameHandle`s. Releasing the handle returns its slot to
+    the pool. When every slot is in use, `policy` decides what happens to a new frame:
+    - "block": wait up to `block_timeout` seconds for a slot to be released, then drop the frame.
+    - "overwrite": the oldest slot in use is reclaimed. The handle holding it is invalidated, but views taken from its
+      `frame_arr` are not and get overwritten; check `PooledFrameHandle.valid` before trusting them.
+    """
+
+    def __init__(
+        self,
+        shape: tuple[int, ...],
+        *,
+        num_slots: int = 4,
+        max_bytes: Optional[int] = None,
+        policy: Literal["overwrite", "block"] = "block",
+        block_timeout: float = 0.1,
+        dtype=np.uint8,
+    ):
+        slot_nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if max_bytes is not None:
+            num_slots = min(num_slots, max_bytes // slot_nbytes)
+        if num_slots < 1:
+            raise ValueError(f"Memory budget of {max_bytes} bytes can't hold a single {slot_nbytes} bytes slot.")
+
+        self.shape = tuple(shape)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._buffer = np.empty((num_slots, *shape), dtype=dtype)
+        self._generations = [0] * num_slots
+        self._owners: list[Optional[weakref.ref]] = [None] * num_slots
+        self._free = deque(range(num_slots))
+        self._in_use: deque[int] = deque()  # ordered from the oldest to the newest
+        self._cond = threading.Condition()
+        self._stats = FramePoolStats(num_slots=num_slots, slot_nbytes=slot_nbytes, slots_in_use=0)
+
+    @classmethod
+    def from_caps(cls, caps: CapsInfo, **kwargs) -> "FrameBufferPool":
+        return cls(caps.shape, **kwargs)
+
+    @property
+    def nbytes(self) -> int:
+        return self._buffer.nbytes
+
+    @property
+    def stats(self) -> FramePoolStats:
+        with self._cond:
+            return self._stats.model_copy(update={"slots_in_use": len(self._in_use)})
+
+    def _acquire(self) -> Optional[int]:
+        """Take a slot out of the pool. Must be called with `self._cond` held."""
+        if not self._free and self.policy == "block":
+            self._cond.wait_for(lambda: self._free, timeout=self.block_timeout)
+
+        if self._free:
+            slot = self._free.popleft()
+            self._stats.hits += 1
+        elif self.policy == "overwrite":
+            slot = self._in_use.popleft()
+            owner = self._owners[slot]() if self._owners[slot] is not None else None
+            if owner is not None:
+                owner._invalidate()
+            self._stats.overwrites += 1
+        else:
+            self._stats.misses += 1
+            return None
+
+        self._generations[slot] += 1
+        self._in_use.append(slot)
+        return slot
+
+    def _release(self, slot: int, generation: int) -> None:
+        with self._cond:
+            if self._generations[slot] != generation:
+                return  # the slot has been reclaimed in the meantime
+            self._generations[slot] += 1
+            self._owners[slot] = None
+            self._in_use.remove(slot)
+            self._free.append(slot)
+            self._cond.notify()
+
+    def wrap(self, frame_arr: np.ndarray, timestamp_ns: int, caps: CapsInfo) -> Optional[PooledFrameHandle]:
+        """Copy `frame_arr` into a pool slot. Returns None if the frame was dropped by the "block" policy."""
+        with self._cond:
+            slot = self._acquire()
+            if slot is None:
+                return None
+            generation = self._generations[slot]
+
+        # Copy outside of the lock; the slot is owned by this call until the handle is published
+        dst = self._buffer[slot]
+        np.copyto(dst, frame_arr)
+        handle = PooledFrameHandle(
+            dst.view(),
+            timestamp_ns,
+            caps,
+            functools.partial(self._release, slot, generation),
+            slot=slot,
+            generation=generation,
+            generations=self._generations,
+        )
+        with self._cond:
+            if self._generations[slot] == generation:
+                self._owners[slot] = weakref.ref(handle)
+        return handle
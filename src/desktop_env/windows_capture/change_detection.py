@@ -0,0 +1,103 @@
+from typing import Literal, NamedTuple, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+
+class ChangeInfo(NamedTuple):
+    score: float  # fraction of blocks which changed, 0.0-1.0
+    dirty_rects: list[tuple[int, int, int, int]]  # changed regions as (left, top, right, bottom), in frame pixels
+
+
+class ChangeDetectionStats(BaseModel):
+    frames: int = 0  # frames compared
+    changed: int = 0  # frames with at least `min_score` of the blocks changed
+    suppressed: int = 0  # unchanged frames which were not delivered
+
+
+class ChangeDetector:
+    """Detects which blocks of a frame changed since the last delivered frame.
+
+    Each frame is reduced to a grid of per-block channel means, computed on every `sample_step`-th pixel. A block is
+    dirty when one of its channel means moved by more than `threshold` (0-255). Comparing against the last delivered
+    frame, instead of the previous one, keeps slow changes from being suppressed forever.
+    - mode="suppress": frames with a score below `min_score` are not delivered, unless no frame has been delivered for
+      `max_suppression_interval` seconds.
+    - mode="annotate": every frame is delivered with its `ChangeInfo` attached.
+    """
+
+    def __init__(
+        self,
+        *,
+        mode: Literal["suppress", "annotate"] = "suppress",
+        block_size: int = 32,
+        sample_step: int = 4,
+        threshold: float = 4.0,
+        min_score: float = 0.0,
+        max_suppression_interval: float = 1.0,
+    ):
+        if block_size % sample_step != 0:
+            raise ValueError("block_size must be a multiple of sample_step.")
+        self.mode = mode
+        self.block_size = block_size
+        self.sample_step = sample_step
+        self.threshold = threshold
+        self.min_score = min_score
+        self.max_suppression_interval_ns = int(max_suppression_interval * 1e9)
+        self.stats = ChangeDetectionStats()
+
+        self._reference: Optional[np.ndarray] = None  # block grid of the last delivered frame
+        self._last_delivered_ns: Optional[int] = None
+
+    def _block_grid(self, frame_arr: np.ndarray) -> np.ndarray:
+        """Per-block channel means, shape [H / block_size, W / block_size, C]. Partial blocks at the border count."""
+        sampled = frame_arr[:: self.sample_step, :: self.sample_step]
+        step = self.block_size // self.sample_step
+        rows = np.arange(0, sampled.shape[0], step)
+        cols = np.arange(0, sampled.shape[1], step)
+        sums = np.add.reduceat(np.add.reduceat(sampled, rows, axis=0, dtype=np.uint32), cols, axis=1)
+        counts = np.outer(np.diff(rows, append=sampled.shape[0]), np.diff(cols, append=sampled.shape[1]))
+        return sums.astype(np.float32) / counts[..., None]
+
+    def _dirty_rects(self, dirty: np.ndarray, width: int, height: int) -> list[tuple[int, int, int, int]]:
+        """Merge horizontally adjacent dirty blocks of each block row into one rect."""
+        padded = np.zeros((dirty.shape[0], dirty.shape[1] + 2), dtype=np.int8)
+        padded[:, 1:-1] = dirty
+        edges = np.diff(padded, axis=1)
+        starts_row, starts_col = np.nonzero(edges == 1)
+        _, ends_col = np.nonzero(edges == -1)
+        b = self.block_size
+        return [
+            (int(c0 * b), int(r * b), int(min(c1 * b, width)), int(min((r + 1) * b, height)))
+            for r, c0, c1 in zip(starts_row, starts_col, ends_col)
+        ]
+
+    def compare(self, frame_arr: np.ndarray) -> tuple[ChangeInfo, np.ndarray]:
+        """Compare the frame with the last delivered one. Returns the change and the block grid of the frame."""
+        grid = self._block_grid(frame_arr)
+        if self._reference is None or self._reference.shape != grid.shape:
+            dirty = np.ones(grid.shape[:2], dtype=bool)
+        else:
+            dirty = (np.abs(grid - self._reference) > self.threshold).any(axis=-1)
+        score = float(dirty.mean())
+        return ChangeInfo(score, self._dirty_rects(dirty, frame_arr.shape[1], frame_arr.shape[0])), grid
+
+    def process(self, frame_arr: np.ndarray, timestamp_ns: int) -> Optional[ChangeInfo]:
+        """Compare the frame and decide whether to deliver it. Returns None if the frame should be suppressed."""
+        change, grid = self.compare(frame_arr)
+        self.stats.frames += 1
+        changed = change.score > self.min_score
+        self.stats.changed += changed
+
+        if self.mode == "suppress" and not changed:
+            overdue = (
+                self._last_delivered_ns is not None
+                and timestamp_ns - self._last_delivered_ns >= self.max_suppression_interval_ns
+            )
+            if not overdue:
+                self.stats.suppressed += 1
+                return None
+
+        self._reference = grid
+        self._last_delivered_ns = timestamp_ns
+        return change
@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Literal, Optional
+
+from loguru import logger
+from pydantic import BaseModel
+
+from .metrics import CaptureMetrics
+from .msg import Frame, FrameHandle
+
+
+def _release(frame: Frame) -> None:
+    if isinstance(frame, FrameHandle):
+        frame.release()
+
+
+def _deliver(
+    callback: Callable[[Frame], None], frame: Frame, pulled_ns: int, metrics: Optional[CaptureMetrics]
+) -> None:
+    """Call the callback, recording the wait since the frame was pulled and the callback duration."""
+    if metrics is None:
+        callback(frame)
+        return
+    start_ns = time.monotonic_ns()
+    metrics.latency["appsink_to_callback"].record(start_ns - pulled_ns)
+    metrics.on_delivered(frame)
+    try:
+        callback(frame)
+    finally:
+        metrics.latency["callback_duration"].record(time.monotonic_ns() - start_ns)
+
+
+class DispatchStats(BaseModel):
+    submitted: int = 0  # frames handed over by the capture
+    delivered: int = 0  # frames passed to the callback
+    superseded: int = 0  # frames replaced by a newer frame before they were delivered
+    pending: int = 0  # frames waiting for a worker
+
+
+class InlineDispatcher:
+    """Calls the callback directly on the GStreamer streaming thread. A slow callback stalls the capture."""
+
+    def __init__(self, callback: Callable[[Frame], None], *, metrics: Optional[CaptureMetrics] = None):
+        self.callback = callback
+        self.metrics = metrics
+        self._stats = DispatchStats()
+
+    @property
+    def stats(self) -> DispatchStats:
+        return self._stats.model_copy()
+
+    def submit(self, frame: Frame, pulled_ns: Optional[int] = None) -> None:
+        """Deliver the frame. `pulled_ns` is the `time.monotonic_ns()` at which it was taken out of the appsink."""
+        self._stats.submitted += 1
+        self._stats.delivered += 1
+        _deliver(self.callback, frame, pulled_ns or time.monotonic_ns(), self.metrics)
+
+    def close(self) -> None: ...
+
+
+class ThreadedDispatcher:
+    """Calls the callback from `num_workers` worker threads, so the streaming thread never waits for the consumer.
+
+    At most `max_pending` frames wait for a free worker. When a new frame arrives and the mailbox is full, the oldest
+    waiting frame is superseded (released without being delivered), so the latest frame always wins.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[Frame], None],
+        *,
+        num_workers: int = 1,
+        max_pending: int = 1,
+        metrics: Optional[CaptureMetrics] = None,
+    ):
+        self.callback = callback
+        self.metrics = metrics
+        self._pending: deque[tuple[Frame, int]] = deque()
+        self._max_pending = max_pending
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._stats = DispatchStats()
+        self._workers = [
+            threading.Thread(target=self._run, name=f"frame-dispatcher-{i}", daemon=True) for i in range(num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    @property
+    def stats(self) -> DispatchStats:
+        with self._cond:
+            return self._stats.model_copy(update={"pending": len(self._pending)})
+
+    def submit(self, frame: Frame, pulled_ns: Optional[int] = None) -> None:
+        """Queue the frame. `pulled_ns` is the `time.monotonic_ns()` at which it was taken out of the appsink."""
+        superseded = None
+        with self._cond:
+            self._stats.submitted += 1
+            if len(self._pending) >= self._max_pending:
+                superseded, _ = self._pending.popleft()
+                self._stats.superseded += 1
+            self._pending.append((frame, pulled_ns or time.monotonic_ns()))
+            self._cond.notify()
+        if superseded is not None:
+            _release(superseded)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._stop_event.is_set())
+                if self._stop_event.is_set():
+                    return
+                frame, pulled_ns = self._pending.popleft()
+                self._stats.delivered += 1
+            try:
+                _deliver(self.callback, frame, pulled_ns, self.metrics)
+            except Exception:
+                logger.exception("Error in frame callback")
+            del frame  # release the handle unless the callback kept it
+
+    def close(self) -> None:
+        with self._cond:
+            self._stop_event.set()
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join()
+        while self._pending:
+            _release(self._pending.popleft()[0])
+
+
+def make_dispatcher(
+    callback: Callable[[Frame], None],
+    mode: Literal["inline", "worker", "pool"],
+    *,
+    num_workers: int = 4,
+    max_in_flight: int = 8,
+    metrics: Optional[CaptureMetrics] = None,
+):
+    """Create the dispatcher for the given mode.
+    - inline: call the callback on the streaming thread.
+    - worker: a dedicated worker thread with a latest-only mailbox.
+    - pool: `num_workers` worker threads with at most `max_in_flight` frames running or waiting.
+    """
+    if mode == "inline":
+        return InlineDispatcher(callback, metrics=metrics)
+    elif mode == "worker":
+        return ThreadedDispatcher(callback, num_workers=1, max_pending=1, metrics=metrics)
+    elif mode == "pool":
+        return ThreadedDispatcher(
+            callback, num_workers=num_workers, max_pending=max(1, max_in_flight - num_workers), metrics=metrics
+        )
+    else:
+        raise ValueError(f"Unsupported dispatch mode: {mode}")
@@ -1,28 +1,255 @@
 import platform
-import sys
-from typing import Literal, Optional
+from typing import TYPE_CHECKING, Literal, Optional, Sequence
 
-from ..utils import get_window_by_title
+from ..utils import get_monitor_rect, get_window_by_title
 
+if TYPE_CHECKING:
+    from .args import FrameSubscriberArgs
 
-def output_format_to_element(output_format: Literal["raw", "jpeg"]) -> str:
+
+RAW_FORMATS = ("BGRA", "BGRx", "RGBA", "RGBx", "RGB", "BGR", "GRAY8")
+OutputFormat = Literal["raw", "BGRA", "BGRx", "RGBA", "RGBx", "RGB", "BGR", "GRAY8", "jpeg", "png"]
+Interpolation = Literal["nearest", "bilinear", "area", "bicubic", "lanczos"]
+# Screen capture source. "auto" picks d3d11 on Windows, ximagesrc on Linux and avfvideosrc on macOS.
+CaptureBackend = Literal["auto", "d3d11", "ximagesrc", "pipewire", "avfvideosrc"]
+
+# Interpolation mode to the `method` of videoscale and of d3d11scale. d3d11scale has no bicubic/lanczos sampler.
+VIDEOSCALE_METHODS = {
+    "nearest": "nearest-neighbour",
+    "bilinear": "bilinear",
+    "area": "bilinear2",
+    "bicubic": "catrom",
+    "lanczos": "lanczos",
+}
+D3D11SCALE_METHODS = {"nearest": "nearest", "bilinear": "bilinear", "area": "linear-minify"}
+
+
+def resolve_backend(backend: CaptureBackend = "auto") -> str:
+    """Resolve "auto" into the default capture backend of the platform."""
+    if backend != "auto":
+        return backend
+    system = platform.system()
+    if system == "Windows":
+        return "d3d11"
+    elif system == "Linux":
+        return "ximagesrc"
+    elif system == "Darwin":
+        return "avfvideosrc"
+    raise NotImplementedError(f"Platform {system} is not supported yet.")
+
+
+def memory_feature(backend: CaptureBackend = "auto") -> str:
+    """Caps feature of the frames from the source. Only d3d11 keeps frames in GPU memory; others use system memory."""
+    return "(memory:D3D11Memory)" if resolve_backend(backend) == "d3d11" else ""
+
+
+def output_format_to_element(
+    output_format: OutputFormat, *, jpeg_quality: int = 85, png_compression_level: int = 1
+) -> str:
     """Convert the output format to the corresponding GStreamer element."""
     if output_format == "raw":
-        return "video/x-raw,format=BGRA"  # Caution: alpha channel is valid when capturing the screen.
-    # elif output_format == "jpeg": # TODO: support jpeg encoding
-    #     return "jpegenc"
+        # The 4-channel format of the source is kept, so that `videoconvert` passes frames through without a copy:
+        # BGRA for d3d11 (Caution: alpha channel is valid when capturing the screen), BGRx for ximagesrc.
+        return "video/x-raw,format={BGRA,BGRx}"
+    elif output_format in RAW_FORMATS:
+        return f"video/x-raw,format={output_format}"
+    elif output_format == "jpeg":
+        return f"jpegenc quality={jpeg_quality} ! image/jpeg"
+    elif output_format == "png":
+        return f"pngenc compression-level={png_compression_level} snapshot=false ! image/png"
     else:
         raise ValueError(f"Unsupported output format: {output_format}")
 
 
+def _check_crop(crop: tuple[int, int, int, int]) -> None:
+    left, top, right, bottom = crop
+    if not (0 <= left < right and 0 <= top < bottom):
+        raise ValueError(f"Invalid crop rect: {crop}")
+
+
+def crop_parameter(
+    crop: tuple[int, int, int, int], backend: CaptureBackend = "auto", offset: tuple[int, int] = (0, 0)
+) -> str:
+    """Convert a crop rect `(left, top, right, bottom)` in screen pixels into the parameters of the capture source.
+    `offset` is added to the rect, e.g. the origin of the monitor for ximagesrc, which always captures the whole
+    X screen. Sources without crop parameters are cropped with `crop_element` instead."""
+    _check_crop(crop)
+    left, top, right, bottom = crop
+    backend = resolve_backend(backend)
+    if backend == "d3d11":
+        return f" crop-x={left} crop-y={top} crop-width={right - left} crop-height={bottom - top}"
+    elif backend == "ximagesrc":
+        left, top, right, bottom = left + offset[0], top + offset[1], right + offset[0], bottom + offset[1]
+        return f" startx={left} starty={top} endx={right - 1} endy={bottom - 1}"  # end is inclusive in ximagesrc
+    else:
+        raise NotImplementedError(f"{backend} has no crop parameters, use `crop_element`.")
+
+
+def crop_element(crop: tuple[int, int, int, int]) -> str:
+    """A `videocrop` element which crops system memory frames to the rect `(left, top, right, bottom)`, for sources
+    which can't crop themselves. The right and bottom margins are derived from the size fixed by the caps after it."""
+    _check_crop(crop)
+    left, top, right, bottom = crop
+    return (
+        f"videocrop left={left} top={top} right=-1 bottom=-1 ! video/x-raw,width={right - left},height={bottom - top}"
+    )
+
+
+def capture_source(
+    *,
+    backend: CaptureBackend = "auto",
+    window_name: Optional[str] = None,
+    monitor_idx: Optional[int] = None,
+    crop: Optional[tuple[int, int, int, int]] = None,
+    framerate: str = "30/1",
+    additional_parameter_for_screencap: str = "",
+) -> str:
+    """Construct the screen capture source, up to the caps which limit its framerate.
+    Args:
+        backend: The capture source. See `CaptureBackend`.
+        window_name: The name of the window to capture. If None, the entire screen will be captured.
+        monitor_idx: The index of the monitor to capture. If None, the primary monitor will be captured.
+        crop: The rect `(left, top, right, bottom)` to capture, in pixels of the captured monitor or window.
+        framerate: The maximum framerate of the capture.
+        additional_parameter_for_screencap: Additional parameter of the source element. For pipewire, the stream
+            to capture, e.g. `fd=12 path=42`, as granted by the ScreenCast portal.
+    """
+    backend = resolve_backend(backend)
+    extra = additional_parameter_for_screencap
+    if backend == "d3d11":
+        src_parameter = ""
+        if window_name is not None:
+            src_parameter += f" window-handle={get_window_by_title(window_name).hWnd}"
+        if monitor_idx is not None:
+            src_parameter += f" monitor-index={monitor_idx}"
+        if crop is not None:
+            src_parameter += crop_parameter(crop, backend)
+        return (
+            f"d3d11screencapturesrc show-cursor=TRUE {src_parameter} {extra} do-timestamp=True ! "
+            f"videorate drop-only=True ! video/x-raw(memory:D3D11Memory),framerate=0/1,max-framerate={framerate}"
+        )
+    elif backend == "ximagesrc":
+        # XShm is used automatically. With use-damage, only the regions reported by XDamage are copied per frame.
+        src_parameter = " use-damage=true show-pointer=true"
+        offset = (0, 0)
+        if window_name is not None:
+            src_parameter += f" xid={get_window_by_title(window_name).hWnd}"
+        elif monitor_idx is not None:
+            left, top, right, bottom = get_monitor_rect(monitor_idx)
+            offset = (left, top)
+            if crop is None:
+                crop = (0, 0, right - left, bottom - top)
+        if crop is not None:
+            src_parameter += crop_parameter(crop, backend, offset)
+        # ximagesrc paces itself on the pipeline clock at the negotiated framerate, so no videorate is needed
+        return f"ximagesrc {src_parameter} {extra} do-timestamp=True ! video/x-raw,framerate={framerate}"
+    elif backend in ("pipewire", "avfvideosrc"):
+        if window_name is not None or (backend == "pipewire" and monitor_idx is not None):
+            raise NotImplementedError(
+                f"window_name and monitor_idx are not supported with {backend} yet. For pipewire, select the window "
+                "or monitor in the ScreenCast portal."
+            )
+        if backend == "pipewire":
+            src = "pipewiresrc"
+        else:
+            src = "avfvideosrc capture-screen=true"
+            if monitor_idx is not None:
+                src += f" device-index={monitor_idx}"
+        # These sources produce frames on damage or at the display rate, so the rate is limited downstream. They
+        # have no crop parameters, so frames are cropped after the rate limit, to crop only the frames which are kept.
+        source = (
+            f"{src} {extra} do-timestamp=True ! "
+            f"videorate drop-only=True ! video/x-raw,framerate=0/1,max-framerate={framerate}"
+        )
+        return source if crop is None else f"{source} ! {crop_element(crop)}"
+    else:
+        raise ValueError(f"Unsupported capture backend: {backend}")
+
+
+def appsink_branch(
+    name: str,
+    *,
+    max_framerate: Optional[str] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    interpolation: Interpolation = "bilinear",
+    format: OutputFormat = "raw",
+    jpeg_quality: int = 85,
+    png_compression_level: int = 1,
+    queue_size: int = 1,
+    backend: CaptureBackend = "auto",
+) -> str:
+    """Construct a `tee` branch which ends in an appsink named `name`.
+    Args:
+        name: The name of the appsink.
+        max_framerate: The maximum framerate of the branch. If None, every frame of the tee is passed.
+        width: The output width. If None, the captured width is kept.
+        height: The output height. If None, the captured height is kept.
+        interpolation: The interpolation mode used for scaling.
+        format: The output pixel format of the branch, or the image format ("jpeg", "png") to encode frames into.
+        jpeg_quality: The quality of jpeg encoding, 0-100.
+        png_compression_level: The compression level of png encoding, 0-9.
+        queue_size: The size of the leaky queue of the branch.
+        backend: The capture backend which feeds the tee.
+    """
+    # Rate limiting and scaling are done before downloading, so that only the needed pixels leave the GPU
+    backend = resolve_backend(backend)
+    memory = memory_feature(backend)
+    elements = [f"t. ! queue leaky=downstream max-size-buffers={queue_size} max-size-bytes=0 max-size-time=0"]
+    if max_framerate is not None:
+        elements += ["videorate drop-only=true", f"video/x-raw{memory},framerate=0/1,max-framerate={max_framerate}"]
+    size = "".join(f",{key}={value}" for key, value in (("width", width), ("height", height)) if value is not None)
+    if backend == "d3d11":
+        if size and interpolation in D3D11SCALE_METHODS:
+            elements += [
+                f"d3d11scale method={D3D11SCALE_METHODS[interpolation]}",
+                f"video/x-raw(memory:D3D11Memory){size}",
+            ]
+            size = ""
+        elements += ["d3d11download"]
+    if size:
+        elements += [f"videoscale method={VIDEOSCALE_METHODS[interpolation]}", f"video/x-raw{size}"]
+    elements += [
+        "videoconvert",
+        output_format_to_element(format, jpeg_quality=jpeg_quality, png_compression_level=png_compression_level),
+        f"appsink name={name} max-buffers=1 drop=true",
+    ]
+    return " ! ".join(elements) + " "
+
+
+def subscriber_branch(subscriber: "FrameSubscriberArgs", *, backend: CaptureBackend = "auto") -> str:
+    """Construct the `tee` branch of a subscriber, see `appsink_branch`."""
+    return appsink_branch(
+        subscriber.name,
+        max_framerate=subscriber.max_framerate,
+        width=subscriber.width,
+        height=subscriber.height,
+        interpolation=subscriber.interpolation,
+        format=subscriber.format,
+        jpeg_quality=subscriber.jpeg_quality,
+        png_compression_level=subscriber.png_compression_level,
+        queue_size=subscriber.queue_size,
+        backend=backend,
+    )
+
+
 def construct_pipeline(
     *,
     window_name: Optional[str] = None,
     monitor_idx: Optional[int] = None,
     additional_parameter_for_screencap="",
     framerate="30/1",
-    output_format: Literal["raw", "jpeg"] = "raw",
+    backend: CaptureBackend = "auto",
+    output_format: OutputFormat = "raw",
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    interpolation: Interpolation = "bilinear",
+    crop: Optional[tuple[int, int, int, int]] = None,
+    jpeg_quality: int = 85,
+    png_compression_level: int = 1,
     output_dir: Optional[str] = None,
+    enable_appsink: bool = True,
+    subscribers: Sequence["FrameSubscriberArgs"] = (),
 ) -> str:
     """Construct a GStreamer pipeline for screen capturing.
     Args:
@@ -30,40 +257,51 @@ def construct_pipeline(
         monitor_idx: The index of the monitor to capture. If None, the primary monitor will be captured.
         additional_parameter_for_screencap: Additional parameter for screen capturing. e.g. window-handle=0x21466, monitor-index=1, etc.
         framerate: The frame rate of the video.
-        output_format: The output format of the video. Either "raw" or "jpeg".
+        backend: The capture source: d3d11 (Windows), ximagesrc (Linux X11) or pipewire (Linux Wayland), avfvideosrc
+            (macOS). "auto" picks the default of the platform.
+        output_format: The output format of the video. "raw" (BGRA on Windows, BGRx on X11, where the fourth byte is
+            padding, not alpha), a raw pixel format such as RGB, BGR, GRAY8, or "jpeg"/"png" to deliver frames
+            encoded inside the pipeline.
+        width: The output width. If None, the captured width is kept.
+        height: The output height. If None, the captured height is kept.
+        interpolation: The interpolation mode used for scaling.
+        crop: The rect `(left, top, right, bottom)` to capture, in pixels of the captured monitor or window.
+        jpeg_quality: The quality of jpeg encoding, 0-100.
+        png_compression_level: The compression level of png encoding, 0-9.
+        enable_appsink: Whether to add the primary appsink, named `appsink`.
+        subscribers: Subscribers which get their own branch, with their own framerate, size and format.
     """
-    if platform.system() == "Windows":
-        pipeline_src = "d3d11screencapturesrc show-cursor=TRUE"
-        # TODO: test whether d3d11testsrc is valid in other OS
-    elif platform.system() == "Linux":
-        pipeline_src = "ximagesrc"
-    elif platform.system() == "Darwin":
-        pipeline_src = "avfvideosrc capture-screen=true"
-    else:
-        print("Unsupported platform.")
-        sys.exit(1)
-
-    src_parameter = ""
-    if window_name is not None:
-        src_parameter += f" window-handle={get_window_by_title(window_name).hWnd}"
-    if monitor_idx is not None:
-        src_parameter += f" monitor-index={monitor_idx}"
-
+    backend = resolve_backend(backend)
     assert isinstance(framerate, str), "framerate must be a string, now. (TODO: support other types)"
-    assert output_format == "raw", "Only raw format is supported now."
 
     # TODO: prevent odd-size input to mfh264enc, which induces an resize and blur effect.
-    pipeline_description = (
-        f"{pipeline_src} {src_parameter} {additional_parameter_for_screencap} do-timestamp=True ! "
-        "videorate drop-only=True ! " + f"video/x-raw(memory:D3D11Memory),framerate=0/1,max-framerate={framerate} ! "
-        "tee name=t"
-        "t. ! queue leaky=downstream ! d3d11download ! video/x-raw,format=BGRA ! appsink name=appsink max-buffers=1 drop=true "
+    source = capture_source(
+        backend=backend,
+        window_name=window_name,
+        monitor_idx=monitor_idx,
+        crop=crop,
+        framerate=framerate,
+        additional_parameter_for_screencap=additional_parameter_for_screencap,
     )
-    if output_dir is not None:
-        pipeline_description += (
-            f"t. ! queue ! d3d11convert ! mfh264enc ! h264parse ! matroskamux ! filesink location={output_dir}"
+    pipeline_description = f"{source} ! tee name=t "
+    # Resizing, cropping and pixel format conversion are done inside the pipeline, so frames arrive as needed
+    if enable_appsink:
+        pipeline_description += appsink_branch(
+            "appsink",
+            width=width,
+            height=height,
+            interpolation=interpolation,
+            format=output_format,
+            jpeg_quality=jpeg_quality,
+            png_compression_level=png_compression_level,
+            backend=backend,
         )
     # max-buffers=1 drop=true: Drop the frame if the buffer is full. it is necessary to prevent memory boom.
+    for subscriber in subscribers:
+        pipeline_description += subscriber_branch(subscriber, backend=backend)
+    if output_dir is not None:
+        encoder = "d3d11convert ! mfh264enc" if backend == "d3d11" else "videoconvert ! x264enc tune=zerolatency"
+        pipeline_description += f"t. ! queue ! {encoder} ! h264parse ! matroskamux ! filesink location={output_dir} "
 
     assert "appsink" in pipeline_description, "appsink element is not found in the pipeline description."
     return pipeline_description
@@ -0,0 +1,166 @@
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from .msg import CompressedFrameStamped, Frame
+
+LATENCY_STAGES = ("source_to_appsink", "appsink_to_callback", "callback_duration")
+
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of nanosecond values.
+
+    Values below `2 ** precision_bits` are counted exactly. Above that, each power of two is split into
+    `2 ** (precision_bits - 1)` linear buckets, so every value is stored with a relative error below
+    `2 ** -(precision_bits - 1)` (~1.6% for the default of 7 bits) in a fixed number of buckets.
+    """
+
+    def __init__(self, *, precision_bits: int = 7, max_value_ns: int = 2**40):
+        self._bits = precision_bits
+        self._half = 1 << (precision_bits - 1)
+        self._max_value = max_value_ns
+        self._counts = [0] * (self._index(max_value_ns) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value: int) -> int:
+        shift = value.bit_length() - self._bits
+        if shift <= 0:
+            return value
+        return shift * self._half + (value >> shift)
+
+    def _bucket_value(self, index: int) -> int:
+        """Representative (middle) value of the bucket."""
+        if index < 2 * self._half:
+            return index
+        shift = index // self._half - 1
+        mantissa = index - shift * self._half
+        return (mantissa << shift) + (1 << (shift - 1))
+
+    def record(self, value_ns: int) -> None:
+        value_ns = min(max(int(value_ns), 0), self._max_value)
+        index = self._index(value_ns)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += value_ns
+            self.min = value_ns if self.min is None else min(self.min, value_ns)
+            self.max = value_ns if self.max is None else max(self.max, value_ns)
+
+    def percentiles(self, *quantiles: float) -> list[Optional[int]]:
+        """Values at the given quantiles (0.0-1.0), or None if nothing was recorded."""
+        with self._lock:
+            counts = np.array(self._counts, dtype=np.int64)
+        total = int(counts.sum())
+        if total == 0:
+            return [None] * len(quantiles)
+        cumulative = np.cumsum(counts)
+        indices = np.searchsorted(cumulative, [max(1, np.ceil(q * total)) for q in quantiles])
+        return [min(self._bucket_value(int(i)), self.max) for i in indices]
+
+    def snapshot(self) -> "LatencySnapshot":
+        p50, p95, p99 = self.percentiles(0.5, 0.95, 0.99)
+        return LatencySnapshot(
+            count=self.count, sum_ns=self.total, min_ns=self.min, max_ns=self.max, p50_ns=p50, p95_ns=p95, p99_ns=p99
+        )
+
+
+class LatencySnapshot(BaseModel):
+    count: int
+    sum_ns: int
+    min_ns: Optional[int] = None
+    max_ns: Optional[int] = None
+    p50_ns: Optional[int] = None
+    p95_ns: Optional[int] = None
+    p99_ns: Optional[int] = None
+
+
+class CaptureMetricsSnapshot(BaseModel):
+    frames_received: int  # buffers which reached the appsink
+    frames_delivered: int  # frames passed to the callback, or returned by the pull API
+    frames_dropped: int  # frames which reached the appsink but were never delivered
+    bytes_delivered: int
+    bandwidth_bytes_per_sec: float  # average since the metrics were created
+    uptime_sec: float
+    # Latency of each stage, keyed by the names in `LATENCY_STAGES`
+    latency: dict[str, LatencySnapshot]
+
+
+class CaptureMetrics:
+    """Health metrics of one appsink of the capture.
+
+    Latency is recorded per stage:
+    - source_to_appsink: from the source timestamp of the frame until it is taken out of the appsink.
+    - appsink_to_callback: from then until the callback is entered. Includes the wait in the dispatcher's mailbox.
+    - callback_duration: time spent inside the callback.
+    In pull mode, no callback is involved and only the first stage is recorded.
+    """
+
+    def __init__(self):
+        self.latency = {stage: LatencyHistogram() for stage in LATENCY_STAGES}
+        self._lock = threading.Lock()
+        self._start_ns = time.monotonic_ns()
+        self._received = 0
+        self._delivered = 0
+        self._bytes = 0
+
+    def on_buffer(self) -> None:
+        """Count a buffer arriving at the appsink."""
+        with self._lock:
+            self._received += 1
+
+    def on_delivered(self, frame: Frame) -> None:
+        """Count a frame handed to the consumer."""
+        nbytes = len(frame.data) if isinstance(frame, CompressedFrameStamped) else frame.frame_arr.nbytes
+        with self._lock:
+            self._delivered += 1
+            self._bytes += nbytes
+
+    def snapshot(self, pending: int = 0) -> CaptureMetricsSnapshot:
+        """Snapshot of the metrics. `pending` frames are neither delivered nor dropped yet."""
+        uptime_sec = (time.monotonic_ns() - self._start_ns) / 1e9
+        with self._lock:
+            received, delivered, nbytes = self._received, self._delivered, self._bytes
+        return CaptureMetricsSnapshot(
+            frames_received=received,
+            frames_delivered=delivered,
+            frames_dropped=max(0, received - delivered - pending),
+            bytes_delivered=nbytes,
+            bandwidth_bytes_per_sec=nbytes / uptime_sec if uptime_sec > 0 else 0.0,
+            uptime_sec=uptime_sec,
+            latency={stage: histogram.snapshot() for stage, histogram in self.latency.items()},
+        )
+
+
+def to_prometheus(snapshots: dict[str, CaptureMetricsSnapshot], prefix: str = "desktop_env_capture") -> str:
+    """Render snapshots, keyed by appsink name, in the Prometheus text exposition format."""
+    lines = []
+    counters = [
+        ("frames_received", "Frames which reached the appsink."),
+        ("frames_delivered", "Frames delivered to the consumer."),
+        ("frames_dropped", "Frames which reached the appsink but were never delivered."),
+        ("bytes_delivered", "Bytes of frames delivered to the consumer."),
+    ]
+    for field, help in counters:
+        name = f"{prefix}_{field}_total"
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} counter")
+        lines.extend(f'{name}{{appsink="{sink}"}} {getattr(snapshot, field)}' for sink, snapshot in snapshots.items())
+
+    name = f"{prefix}_latency_seconds"
+    lines.append(f"# HELP {name} Latency of each stage of the capture.")
+    lines.append(f"# TYPE {name} summary")
+    for sink, snapshot in snapshots.items():
+        for stage, latency in snapshot.latency.items():
+            labels = f'appsink="{sink}",stage="{stage}"'
+            for quantile, value in (("0.5", latency.p50_ns), ("0.95", latency.p95_ns), ("0.99", latency.p99_ns)):
+                lines.append(f'{name}{{{labels},quantile="{quantile}"}} {"NaN" if value is None else value / 1e9}')
+            lines.append(f"{name}_sum{{{labels}}} {latency.sum_ns / 1e9}")
+            lines.append(f"{name}_count{{{labels}}} {latency.count}")
+    return "\n".join(lines) + "\n"
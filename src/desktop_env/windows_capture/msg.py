@@ -1,10 +1,136 @@
+from typing import Callable, Literal, NamedTuple, Optional, Union
+
 import numpy as np
 from pydantic import BaseModel
 
+from .change_detection import ChangeInfo
+
 
 class FrameStamped(BaseModel):
     class Config:
         arbitrary_types_allowed = True
 
     timestamp_ns: int
-    frame_arr: np.ndarray  # [W, H, BGRA]
+    frame_arr: np.ndarray  # [H, W, C], e.g. BGRA, or BGRx whose fourth byte is padding
+
+
+class CompressedFrameStamped(BaseModel):
+    """A frame encoded inside the pipeline, for consumers which move frames across processes or over the network."""
+
+    timestamp_ns: int
+    format: Literal["jpeg", "png"]
+    data: bytes  # the encoded image, e.g. the content of a .jpg file
+
+
+# Bytes per pixel of the packed raw video formats which can be delivered as frames
+FORMAT_CHANNELS = {"BGRA": 4, "RGBA": 4, "BGRx": 4, "RGBx": 4, "RGB": 3, "BGR": 3, "GRAY8": 1}
+# Media type of the encoded image formats which can be delivered as frames
+COMPRESSED_FORMATS = {"image/jpeg": "jpeg", "image/png": "png"}
+
+
+class CapsInfo(NamedTuple):
+    """Parsed fields of a fixed `video/x-raw` or `image/*` caps. Parsed once per caps negotiation, not once per frame.
+    For encoded images, `format` is the image format, e.g. "jpeg"."""
+
+    width: int
+    height: int
+    format: str
+
+    @classmethod
+    def from_caps(cls, caps) -> "CapsInfo":
+        structure = caps.get_structure(0)
+        name = structure.get_name()
+        format_ = COMPRESSED_FORMATS[name] if name in COMPRESSED_FORMATS else structure.get_value("format")
+        return cls(structure.get_value("width"), structure.get_value("height"), format_)
+
+    @property
+    def compressed(self) -> bool:
+        return self.format in COMPRESSED_FORMATS.values()
+
+    @property
+    def channels(self) -> int:
+        if self.format not in FORMAT_CHANNELS:
+            raise ValueError(f"Unsupported format: {self.format}")
+        return FORMAT_CHANNELS[self.format]
+
+    @property
+    def stride(self) -> int:
+        """Bytes per row. GStreamer pads each row of packed raw video to a multiple of 4 bytes."""
+        return (self.width * self.channels + 3) & ~3
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        return (self.height, self.width, self.channels)
+
+    def view(self, data: np.ndarray) -> np.ndarray:
+        """View a flat uint8 buffer as a [H, W, C] array without copying, skipping the row padding if any."""
+        rows = data[: self.height * self.stride].reshape(self.height, self.stride)
+        return rows[:, : self.width * self.channels].reshape(self.shape)
+
+
+class FrameHandle:
+    """A captured frame which keeps its underlying buffer alive (and mapped) until it is released.
+
+    `frame_arr` is a read-only view into the buffer memory, so no copy is made on delivery. The buffer is released
+    when `release()` is called, when the `with` block exits, or when the last reference to the handle is dropped.
+    It has the same `timestamp_ns`/`frame_arr` attributes as `FrameStamped`, so it can be used in place of it.
+    """
+
+    __slots__ = ("timestamp_ns", "caps", "change", "_frame_arr", "_release", "__weakref__")
+
+    def __init__(
+        self, frame_arr: np.ndarray, timestamp_ns: int, caps: CapsInfo, release: Optional[Callable[[], None]] = None
+    ):
+        frame_arr.flags.writeable = False
+        self.timestamp_ns = timestamp_ns
+        self.caps = caps
+        # Dirty rects and change score since the last delivered frame, if change detection is enabled
+        self.change: Optional[ChangeInfo] = None
+        self._frame_arr = frame_arr
+        self._release = release
+
+    @property
+    def frame_arr(self) -> np.ndarray:
+        if self._frame_arr is None:
+            raise RuntimeError("The frame has already been released.")
+        return self._frame_arr
+
+    @property
+    def released(self) -> bool:
+        return self._frame_arr is None
+
+    def release(self) -> None:
+        """Release the underlying buffer. Views obtained from `frame_arr` must not be used afterwards."""
+        if self._frame_arr is None:
+            return
+        self._frame_arr = None
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def _invalidate(self) -> None:
+        """Drop the view without releasing it. Used by the owner of the memory when it reclaims the memory."""
+        self._frame_arr = None
+        self._release = None
+
+    def to_frame_stamped(self, copy: bool = True) -> FrameStamped:
+        """Convert into a `FrameStamped`. With `copy=True`, the result stays valid after this handle is released."""
+        frame_arr = self.frame_arr.copy() if copy else self.frame_arr
+        return FrameStamped.model_construct(timestamp_ns=self.timestamp_ns, frame_arr=frame_arr)
+
+    def __enter__(self) -> "FrameHandle":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    def __del__(self):
+        self.release()
+
+    def __repr__(self):
+        state = "released" if self.released else f"{self.caps.width}x{self.caps.height} {self.caps.format}"
+        return f"{self.__class__.__name__}(timestamp_ns={self.timestamp_ns}, {state})"
+
+
+# Anything delivered by the capture: raw frames as `FrameHandle`, encoded frames as `CompressedFrameStamped`
+Frame = Union[FrameHandle, CompressedFrameStamped]
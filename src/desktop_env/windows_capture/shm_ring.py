@@ -0,0 +1,255 @@
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Literal, Optional
+
+import numpy as np
+
+from .msg import CapsInfo, CompressedFrameStamped, Frame, FrameHandle
+
+MAGIC = 0x44454652  # "DEFR"
+VERSION = 1
+
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "<u4"),
+        ("version", "<u4"),
+        ("num_slots", "<u4"),
+        ("_pad", "<u4"),
+        ("slot_nbytes", "<u8"),
+        ("write_seq", "<u8"),  # number of frames published so far
+    ]
+)
+# The control channel: one record per slot, written by the writer and checked by readers with a seqlock
+SLOT_DTYPE = np.dtype(
+    [
+        ("lock", "<u8"),  # odd while the slot is being written
+        ("frame_seq", "<u8"),  # sequence number of the frame in the slot
+        ("timestamp_ns", "<i8"),
+        ("width", "<u4"),
+        ("height", "<u4"),
+        ("format", "<u4"),  # index into `FORMAT_CODES`
+        ("_pad", "<u4"),
+        ("nbytes", "<u8"),
+        ("_reserved", "<u8", 2),
+    ]
+)
+HEADER_NBYTES = 64
+# Codes of the formats in the slot records. Append only, the position is the code.
+FORMAT_CODES = ("BGRA", "BGRx", "RGBA", "RGBx", "RGB", "BGR", "GRAY8", "jpeg", "png")
+
+
+def _layout(num_slots: int) -> tuple[int, int]:
+    """Offsets of the slot records and of the slot data. The data is aligned to 64 bytes."""
+    data_offset = HEADER_NBYTES + num_slots * SLOT_DTYPE.itemsize
+    return HEADER_NBYTES, (data_offset + 63) & ~63
+
+
+class SharedFrameWriter:
+    """Publishes frames into a ring of `num_slots` slots in shared memory, for consumers in other processes.
+
+    It is a frame callback, so it can be passed as `on_frame_arrived` of `WindowsCapture` or of a subscriber. Each
+    frame is copied once, into the next slot. The segment is created on the first frame, with slots large enough for
+    it (or `max_frame_bytes`, if larger); frames which do not fit are dropped.
+
+        writer = SharedFrameWriter("desktop-env-frames")
+        capture = WindowsCapture(writer)
+
+    Args:
+        name: The name of the shared memory segment, used by `SharedFrameReader` to attach.
+        num_slots: Number of slots. A frame read by a consumer stays valid until `num_slots - 1` newer frames arrive.
+        max_frame_bytes: Minimum size of a slot, to allow for larger frames after renegotiation.
+    """
+
+    def __init__(self, name: str, *, num_slots: int = 4, max_frame_bytes: int = 0):
+        self.name = name
+        self.num_slots = num_slots
+        self.max_frame_bytes = max_frame_bytes
+        self.dropped = 0  # frames which did not fit into a slot
+        self._shm: Optional[shared_memory.SharedMemory] = None
+
+    def _create(self, slot_nbytes: int) -> None:
+        slots_offset, data_offset = _layout(self.num_slots)
+        self._shm = shared_memory.SharedMemory(self.name, create=True, size=data_offset + self.num_slots * slot_nbytes)
+        buf = self._shm.buf
+        self._header = np.ndarray((), HEADER_DTYPE, buf, 0)
+        self._slots = np.ndarray((self.num_slots,), SLOT_DTYPE, buf, slots_offset)
+        self._data = np.ndarray((self.num_slots, slot_nbytes), np.uint8, buf, data_offset)
+        self._slots[...] = 0
+        self._header[()] = (MAGIC, VERSION, self.num_slots, 0, slot_nbytes, 0)
+
+    def write(self, data: np.ndarray, timestamp_ns: int, caps: CapsInfo) -> bool:
+        """Publish a raw frame (`data` shaped as `caps.shape`) or an encoded image (`data` is 1-D).
+        Returns False if the frame was dropped because it does not fit into a slot."""
+        nbytes = caps.stride * caps.height if not caps.compressed else data.nbytes
+        if self._shm is None:
+            self._create(max(nbytes, self.max_frame_bytes))
+        if nbytes > self._data.shape[1]:
+            self.dropped += 1
+            return False
+
+        frame_seq = int(self._header["write_seq"])
+        index = frame_seq % self.num_slots
+        slot = self._slots[index]
+        slot["lock"] += 1  # odd: readers retry or discard this slot
+        if caps.compressed:
+            self._data[index, :nbytes] = data
+        else:
+            np.copyto(caps.view(self._data[index, :nbytes]), data)
+        slot["frame_seq"] = frame_seq
+        slot["timestamp_ns"] = timestamp_ns
+        slot["width"], slot["height"] = caps.width, caps.height
+        slot["format"] = FORMAT_CODES.index(caps.format)
+        slot["nbytes"] = nbytes
+        slot["lock"] += 1
+        self._header["write_seq"] = frame_seq + 1
+        return True
+
+    def __call__(self, frame: Frame) -> None:
+        if isinstance(frame, CompressedFrameStamped):
+            data = np.frombuffer(frame.data, dtype=np.uint8)
+            self.write(data, frame.timestamp_ns, CapsInfo(0, 0, frame.format))
+            return
+        with frame:
+            self.write(frame.frame_arr, frame.timestamp_ns, frame.caps)
+
+    def close(self) -> None:
+        """Remove the shared memory segment. Readers which are still attached keep their mapping."""
+        if self._shm is not None:
+            self._header = self._slots = self._data = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+
+class SharedFrameHandle(FrameHandle):
+    """A `FrameHandle` whose `frame_arr` is a view into a slot of the shared memory ring. No copy is made.
+
+    The writer reuses the slot after `num_slots - 1` newer frames. Check `valid` after processing the frame, or copy
+    it with `to_frame_stamped()` first, if the consumer may fall that far behind.
+    """
+
+    __slots__ = ("frame_seq", "_slot", "_lock")
+
+    def __init__(self, frame_arr, timestamp_ns, caps, *, frame_seq: int, slot: np.ndarray, lock: int):
+        super().__init__(frame_arr, timestamp_ns, caps)
+        self.frame_seq = frame_seq
+        self._slot = slot
+        self._lock = lock
+
+    @property
+    def valid(self) -> bool:
+        """Whether the slot still holds this frame, i.e. `frame_arr` has not been overwritten."""
+        return not self.released and int(self._slot["lock"]) == self._lock
+
+
+class SharedFrameReader:
+    """Reads frames published by a `SharedFrameWriter` in another process.
+
+    - mode="latest": `read()` returns the newest frame, skipping older unread ones.
+    - mode="sequential": `read()` returns every frame in order. If the reader falls more than the ring size behind,
+      the overwritten frames are skipped and counted in `skipped`.
+    `lag` is the number of published frames which have not been read yet.
+
+    Args:
+        name: The name of the shared memory segment given to the writer.
+        mode: The read mode, see above.
+        connect_timeout: Seconds to wait for the writer to create the segment, which happens on its first frame.
+        poll_interval: Seconds to sleep between checks for a new frame.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        mode: Literal["latest", "sequential"] = "latest",
+        connect_timeout: float = 10.0,
+        poll_interval: float = 0.0005,
+    ):
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.skipped = 0
+        self._next_seq = 0
+
+        deadline = time.monotonic() + connect_timeout
+        while True:
+            try:
+                self._shm = self._attach(name)
+                break
+            except FileNotFoundError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.01)
+
+        buf = self._shm.buf
+        self._header = np.ndarray((), HEADER_DTYPE, buf, 0)
+        if self._header["magic"] != MAGIC or self._header["version"] != VERSION:
+            raise ValueError(f"Shared memory `{name}` is not a frame ring of version {VERSION}.")
+        self.num_slots = int(self._header["num_slots"])
+        slots_offset, data_offset = _layout(self.num_slots)
+        self._slots = np.ndarray((self.num_slots,), SLOT_DTYPE, buf, slots_offset)
+        self._data = np.ndarray((self.num_slots, int(self._header["slot_nbytes"])), np.uint8, buf, data_offset)
+
+    @staticmethod
+    def _attach(name: str) -> shared_memory.SharedMemory:
+        if sys.version_info >= (3, 13):
+            return shared_memory.SharedMemory(name, track=False)
+        shm = shared_memory.SharedMemory(name)
+        # Before Python 3.13, attaching registers the segment to be unlinked when this process exits, which would
+        # remove it under the writer's feet
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+    @property
+    def lag(self) -> int:
+        return max(0, int(self._header["write_seq"]) - self._next_seq)
+
+    def _try_read(self, frame_seq: int) -> Optional[Frame]:
+        index = frame_seq % self.num_slots
+        slot = self._slots[index]
+        lock = int(slot["lock"])
+        if lock % 2 == 1 or int(slot["frame_seq"]) != frame_seq:
+            return None
+        caps = CapsInfo(int(slot["width"]), int(slot["height"]), FORMAT_CODES[int(slot["format"])])
+        timestamp_ns, nbytes = int(slot["timestamp_ns"]), int(slot["nbytes"])
+        data = self._data[index, :nbytes]
+        if caps.compressed:
+            # Encoded images are small, so they are copied out instead of being handed out as views
+            frame = CompressedFrameStamped.model_construct(
+                timestamp_ns=timestamp_ns, format=caps.format, data=data.tobytes()
+            )
+        else:
+            frame = SharedFrameHandle(caps.view(data), timestamp_ns, caps, frame_seq=frame_seq, slot=slot, lock=lock)
+        # The slot was rewritten while its record was read
+        if int(slot["lock"]) != lock:
+            return None
+        return frame
+
+    def read(self, timeout: Optional[float] = None) -> Optional[Frame]:
+        """Wait up to `timeout` seconds (forever if None) for a frame to read. Returns None on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            write_seq = int(self._header["write_seq"])
+            if write_seq > self._next_seq:
+                if self.mode == "latest":
+                    target = write_seq - 1
+                else:
+                    # Frames older than the ring have been overwritten
+                    target = max(self._next_seq, write_seq - self.num_slots + 1)
+                    self.skipped += target - self._next_seq
+                frame = self._try_read(target)
+                if frame is not None:
+                    self._next_seq = target + 1
+                    return frame
+                if self.mode == "sequential":
+                    # Overwritten while reading: the reader fell behind by a full ring, skip the frame
+                    self.skipped += 1
+                    self._next_seq = target + 1
+                continue
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def close(self) -> None:
+        self._header = self._slots = self._data = None
+        self._shm.close()
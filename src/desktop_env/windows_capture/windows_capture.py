@@ -1,56 +1,139 @@
 import gi
 
 gi.require_version("Gst", "1.0")
-import functools
+import json
 import threading
-import time
-from typing import Callable, Optional
+from typing import AsyncIterator, Callable, Iterator, Optional, Sequence
 
-import numpy as np
 from gi.repository import GLib, Gst
 from tqdm import tqdm
 
 from ..threading import AbstractThread
-from .args import WindowsCaptureArgs
+from .appsink_reader import AppsinkReader
+from .args import ChangeDetectionArgs, DispatchArgs, FramePoolArgs, FrameSubscriberArgs, WindowsCaptureArgs
+from .buffer_pool import FramePoolStats
+from .change_detection import ChangeDetectionStats
+from .dispatch import DispatchStats
 from .gst_pipeline import construct_pipeline
-from .msg import FrameStamped
+from .metrics import CaptureMetricsSnapshot, to_prometheus
+from .msg import Frame
 
 # Initialize GStreamer
 Gst.init(None)
 
 
 class WindowsCapture(AbstractThread):
+    """Captures the screen and delivers frames as `FrameHandle`s, or as `CompressedFrameStamped`s for jpeg/png output.
+
+    Frames are delivered in one of two modes:
+    - push mode: `on_frame_arrived(frame)` is called for every frame, from the GStreamer streaming thread or from
+      worker threads, depending on `dispatch`.
+    - pull mode (`on_frame_arrived=None`): frames are pulled by the consumer with `frames()`, `aframes()` or
+      `latest()`.
+      Signal emission is disabled, so frames which are never pulled cost no Python code at all.
+
+    Additional `subscribers` share the same screen grab. Each one reads from its own appsink branch, which is
+    rate-limited, scaled and converted inside the pipeline, and is available as `self.subscribers[name]`.
+
+    With `change_detection`, frames which did not change are suppressed, or delivered with `FrameHandle.change`.
+
+    Capture health of every appsink (per-stage latency percentiles, delivered/dropped frames and bandwidth) is
+    available with `metrics_snapshot()`, `metrics_json()` and `metrics_prometheus()`.
+    """
+
     args_cls = WindowsCaptureArgs
 
     def __init__(
         self,
-        on_frame_arrived: Callable[[FrameStamped], None],
+        on_frame_arrived: Optional[Callable[[Frame], None]] = None,
         *,
         pipeline_description: Optional[str] = None,
+        frame_pool: Optional[FramePoolArgs] = None,
+        dispatch: Optional[DispatchArgs] = None,
+        change_detection: Optional[ChangeDetectionArgs] = None,
+        subscribers: Sequence[FrameSubscriberArgs] = (),
+        metrics: bool = True,
+        verbose: bool = True,
     ):
         # Data for progress bar
-        self.pbar = tqdm(total=None, desc="Producing Frames", unit="frames", dynamic_ncols=True)
-        self._bandwidth = 0
-        self._last_time = time.time()
+        self.pbar = tqdm(total=None, desc="Producing Frames", unit="frames", dynamic_ncols=True, disable=not verbose)
 
         if pipeline_description is None:
-            pipeline_description = construct_pipeline()
+            pipeline_description = construct_pipeline(subscribers=subscribers)
         self.pipeline: Gst.Pipeline = Gst.parse_launch(pipeline_description)
 
-        # Get the appsink element and set properties
+        # Get the appsink element. It may be absent if only subscribers consume the capture.
         self.appsink = self.pipeline.get_by_name("appsink")
-        self.appsink.set_property("emit-signals", True)  # This MUST be True to capture `new-sample` signal
-        self.appsink.set_property("sync", True)  # This should be True, I guess
-
-        # Connect to the appsink's new-sample signal
-        self.on_frame_arrived = functools.partial(self.__on_new_sample, callback=on_frame_arrived)
-        self.appsink.connect("new-sample", self.on_frame_arrived)
+        self.reader: Optional[AppsinkReader] = None
+        if self.appsink is not None:
+            self.reader = AppsinkReader(
+                self.pipeline,
+                self.appsink,
+                on_frame_arrived,
+                frame_pool=frame_pool,
+                dispatch=dispatch,
+                change_detection=change_detection,
+                metrics=metrics,
+                pbar=self.pbar if verbose else None,
+            )
+
+        self.subscribers: dict[str, AppsinkReader] = {}
+        for subscriber in subscribers:
+            appsink = self.pipeline.get_by_name(subscriber.name)
+            if appsink is None:
+                raise ValueError(f"appsink `{subscriber.name}` of the subscriber is not found in the pipeline.")
+            self.subscribers[subscriber.name] = AppsinkReader(
+                self.pipeline,
+                appsink,
+                subscriber.on_frame_arrived,
+                frame_pool=subscriber.frame_pool,
+                dispatch=subscriber.dispatch,
+                change_detection=subscriber.change_detection,
+                metrics=metrics if subscriber.metrics is None else subscriber.metrics,
+            )
 
         self.loop = GLib.MainLoop()
 
     @classmethod
     def from_args(cls, args: WindowsCaptureArgs):
-        return cls(args.on_frame_arrived, pipeline_description=args.pipeline_description)
+        return cls(
+            args.on_frame_arrived,
+            pipeline_description=args.pipeline_description,
+            frame_pool=args.frame_pool,
+            dispatch=args.dispatch,
+            change_detection=args.change_detection,
+            subscribers=args.subscribers,
+            metrics=args.metrics,
+            verbose=args.verbose,
+        )
+
+    @property
+    def pool_stats(self) -> Optional[FramePoolStats]:
+        """Statistics of the frame pool, or None if the frame pool is disabled or not allocated yet."""
+        return self.reader.pool_stats if self.reader is not None else None
+
+    @property
+    def dispatch_stats(self) -> Optional[DispatchStats]:
+        """Statistics of the callback dispatcher, including frames superseded before delivery. None in pull mode."""
+        return self.reader.dispatch_stats if self.reader is not None else None
+
+    @property
+    def change_stats(self) -> Optional[ChangeDetectionStats]:
+        """Statistics of the change detection, including suppressed frames. None if change detection is disabled."""
+        return self.reader.change_stats if self.reader is not None else None
+
+    def metrics_snapshot(self) -> dict[str, CaptureMetricsSnapshot]:
+        """Snapshot of the metrics of every appsink, keyed by appsink name. Empty if metrics are disabled."""
+        readers = {"appsink": self.reader, **self.subscribers} if self.reader is not None else self.subscribers
+        snapshots = {name: reader.metrics_snapshot() for name, reader in readers.items()}
+        return {name: snapshot for name, snapshot in snapshots.items() if snapshot is not None}
+
+    def metrics_json(self) -> str:
+        return json.dumps({name: snapshot.model_dump() for name, snapshot in self.metrics_snapshot().items()})
+
+    def metrics_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format, e.g. to be served on a `/metrics` endpoint."""
+        return to_prometheus(self.metrics_snapshot())
 
     def start(self):
         """Start the pipeline. This function will block the current thread."""
@@ -92,82 +175,26 @@ class WindowsCapture(AbstractThread):
         self.loop.quit()
         if hasattr(self, "_loop_thread"):
             self._loop_thread.join()
+        for reader in (self.reader, *self.subscribers.values()):
+            if reader is not None:
+                reader.close()
         self.pbar.close()
 
-    def __get_frame_time_utc(self, pts):
-        assert pts != Gst.CLOCK_TIME_NONE
-
-        # Get the pipeline's clock. Ref: https://gstreamer.freedesktop.org/documentation/gstreamer/gstelement.html?gi-language=python
-        clock = self.pipeline.get_clock()
-        assert clock.props.clock_type == Gst.ClockType.MONOTONIC
-        elapsed_time_from_playing = clock.get_time() - self.pipeline.get_base_time()
-        latency = elapsed_time_from_playing - pts
+    # Pull mode API of the primary appsink. See `AppsinkReader` for details.
 
-        # TODO: report latency step-by-step, separating the gstreamer's latency and others
-        # Print the latency in milliseconds
-        # print(f"Latency: {latency / Gst.MSECOND:.2f} ms")
+    def _primary_reader(self) -> AppsinkReader:
+        if self.reader is None:
+            raise RuntimeError("The pipeline has no primary appsink; pull frames from `self.subscribers` instead.")
+        return self.reader
 
-        # frame_time_in_monotonic = pts + self.pipeline.get_base_time()
-        # frame_time_in_utc = frame_time_in_monotonic + (time.time_ns() - time.monotonic_ns())
-        frame_time_in_utc = time.time_ns() - latency
+    def pull(self, timeout: Optional[float] = None) -> Optional[Frame]:
+        return self._primary_reader().pull(timeout)
 
-        # Convert nanoseconds to seconds and get UTC time
-        import datetime
+    def latest(self, timeout: float = 0) -> Optional[Frame]:
+        return self._primary_reader().latest(timeout)
 
-        utc_time = datetime.datetime.fromtimestamp(frame_time_in_utc / Gst.SECOND)
+    def frames(self, timeout: Optional[float] = None) -> Iterator[Frame]:
+        return self._primary_reader().frames(timeout)
 
-        return frame_time_in_utc
-
-    def __on_new_sample(self, sink, callback: Callable):
-        """Callback function for the new-sample signal of appsink. Internally calls `self.screen_callback(frame_stamped)`"""
-
-        # Retrieve the sample
-        sample: Gst.Sample = sink.emit("pull-sample")
-        if sample is None:
-            print("Received null sample.")
-            return Gst.FlowReturn.ERROR
-        buf: Gst.Buffer = sample.get_buffer()
-
-        # Get the caps of the sample
-        caps: Gst.Caps = sample.get_caps()
-        structure: Gst.Structure = caps.get_structure(0)
-        # This width and height may be different with Window's width and height
-        width, height, format_ = (
-            structure.get_value("width"),
-            structure.get_value("height"),
-            structure.get_value("format"),
-        )
-        assert format_ == "BGRA", f"Unsupported format: {format_}"
-
-        # Calculate time difference
-        current_time = time.time()
-        time_diff = current_time - self._last_time
-
-        # Update bandwidth every second
-        if time_diff >= 1.0:
-            bandwidth = self._bandwidth / time_diff
-            self.pbar.set_postfix(bandwidth=f"{bandwidth/1e6:.2f} MB/s", width=width, height=height, format=format_)
-            self._bandwidth = 0
-            self._last_time = current_time
-
-        # Get buffer data
-        map_result: tuple[bool, Gst.MapInfo] = buf.map(Gst.MapFlags.READ)
-        result, mapinfo = map_result
-        if result:
-            try:
-                frame_data: bytes = mapinfo.data  # This is the JPEG image data
-                frame_arr = np.frombuffer(frame_data, dtype=np.uint8).reshape((height, width, 4))
-                message = FrameStamped(frame_arr=frame_arr, timestamp_ns=self.__get_frame_time_utc(buf.pts))
-                self._bandwidth += len(frame_data)
-
-                # Publish the message data
-                callback(message)
-            finally:
-                buf.unmap(mapinfo)
-
-            # Update the tqdm progress bar
-            self.pbar.update(1)
-        else:
-            return Gst.FlowReturn.ERROR
-
-        return Gst.FlowReturn.OK
+    def aframes(self, timeout: Optional[float] = None) -> AsyncIterator[Frame]:
+        return self._primary_reader().aframes(timeout)